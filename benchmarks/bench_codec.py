@@ -0,0 +1,48 @@
+"""JSON codecs micro-benchmark: per page cost of API page decoding and JSONB encoding
+
+Usage: python benchmarks/bench_codec.py [page length] [repeats]
+"""
+
+# pylint: skip-file
+import sys
+import timeit
+import uuid
+
+from gn2pg.codec import CODECS
+
+
+def synthese_item(i: int) -> dict:
+    """A synthese_with_metadata like export item"""
+    return {
+        "id_synthese": i,
+        "id_perm_sinp": str(uuid.UUID(int=i)),
+        "nom_cite": f"Taxon {i}",
+        "cd_nom": i % 5000,
+        "date_min": "2020-01-01 00:00:00",
+        "date_max": "2020-01-01 00:00:00",
+        "observateurs": "Jean Dupont, Élise Martin",
+        "comment_description": "Observé en lisière " * 10,
+        "altitude_min": 250,
+        "geojson_4326": {"type": "Point", "coordinates": [4.1 + i / 1e6, 45.2]},
+        **{f"nomenclature_{k}": str(k) for k in range(20)},
+        "ca_data": {"uuid": str(uuid.UUID(int=10**6 + i % 3)), "name": "Acquisition framework"},
+        "jdd_data": {"uuid": str(uuid.UUID(int=10**7 + i % 21)), "name": "Dataset"},
+    }
+
+
+def main() -> None:
+    page_length = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    items = [synthese_item(i) for i in range(page_length)]
+    body = CODECS["json"].dumps({"items": items, "total_filtered": page_length}).encode()
+    print(f"Page of {page_length} items, {len(body) / 1e6:.1f} MB, best of {repeats}")
+    for name, codec in CODECS.items():
+        decode = min(timeit.repeat(lambda: codec.loads(body), number=1, repeat=repeats))
+        encode = min(
+            timeit.repeat(lambda: [codec.dumps(item) for item in items], number=1, repeat=repeats)
+        )
+        print(f"{name:8s} decode {decode * 1e3:7.2f} ms  encode {encode * 1e3:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,18 +17,28 @@ Exceptions:
 import json
 import logging
 import math
-from typing import List, Optional
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
+from typing import Dict, Iterator, List, Optional, Tuple
 from urllib.parse import urlencode
 
 import requests
 from requests.adapters import HTTPAdapter, Retry
-from requests.exceptions import HTTPError, InvalidSchema, RetryError
+from requests.exceptions import ChunkedEncodingError, HTTPError, InvalidSchema, RetryError
 
 from gn2pg import _, __version__
 from gn2pg.check_conf import Gn2PgSourceConf
+from gn2pg.codec import JsonCodec, get_codec
+from gn2pg.json_stream import ItemsStream
+from gn2pg.session_cache import SessionCache, parse_expiry
 
 logger = logging.getLogger(__name__)
 
+# HTTP status codes of an overloaded or unavailable source
+OVERLOAD_STATUS = (429, 500, 501, 502, 503, 504)
+
 
 class APIException(Exception):
     """An exception occurred while handling your request."""
@@ -38,6 +48,241 @@ class ExportModuleNotFoundError(Exception):
     """Custom exception raised when the EXPORTS module is not found."""
 
 
+class PageLengthController:
+    """Adapt page length to measured page download time, size and errors, between
+    min_page_length and max_page_length.
+
+    Page length starts from min_page_length and doubles while pages are downloaded
+    within half target_page_time and half max_page_size_mb. It is halved by a slow or
+    large page, and by a failed request. Page lengths that failed are not requested
+    again, page length only grows halfway to the smallest of them.
+    """
+
+    def __init__(self, config: Gn2PgSourceConf) -> None:
+        self._max = config.max_page_length
+        self._min = min(config.min_page_length, self._max)
+        self._target_time = config.target_page_time
+        self._max_bytes = config.max_page_size_mb * 1e6
+        self._name = config.name
+        self.length = self._min
+        self._ceiling: Optional[int] = None
+        self._lengths: List[int] = []
+        self._errors = 0
+
+    def _resize(self, length: int, reason: str) -> None:
+        length = max(self._min, min(self._max, length))
+        if length != self.length:
+            logger.info(
+                _("Page length of source %s changes from %s to %s (%s)"),
+                self._name,
+                self.length,
+                length,
+                reason,
+            )
+            self.length = length
+
+    def success(self, seconds: float, size: int, items: int) -> None:
+        """Adapt page length after a page download
+
+        Args:
+            seconds (float): page download time
+            size (int): page size, in bytes
+            items (int): number of page items
+        """
+        self._lengths.append(self.length)
+        if seconds > self._target_time or size > self._max_bytes:
+            self._resize(self.length // 2, _("%.1f s, %.1f MB") % (seconds, size / 1e6))
+        elif (
+            seconds < self._target_time / 2 and size < self._max_bytes / 2 and items >= self.length
+        ):
+            length = self.length * 2
+            if self._ceiling is not None:
+                length = min(length, (self.length + self._ceiling) // 2)
+            self._resize(length, _("%.1f s, %.1f MB") % (seconds, size / 1e6))
+
+    def failure(self, error: Exception) -> bool:
+        """Shrink page length after a failed page download
+
+        Args:
+            error (Exception): download error
+
+        Returns:
+            bool: False if page length is already min_page_length
+        """
+        self._errors += 1
+        self._ceiling = self.length if self._ceiling is None else min(self._ceiling, self.length)
+        if self.length <= self._min:
+            return False
+        self._resize(self.length // 2, str(error))
+        return True
+
+    def summary(self) -> dict:
+        """Return page lengths used, to be logged
+
+        Returns:
+            dict: bounds, last, mean page length, and errors count
+        """
+        return {
+            "min_page_length": self._min,
+            "max_page_length": self._max,
+            "last_page_length": self.length,
+            "mean_page_length": (
+                round(sum(self._lengths) / len(self._lengths)) if self._lengths else None
+            ),
+            "pages": len(self._lengths),
+            "errors": self._errors,
+        }
+
+
+class ConcurrencyController:
+    """Adapt the number of concurrent requests to a source to its health, between 1 and
+    max_concurrency, with additive increase and multiplicative decrease (AIMD), and a
+    circuit breaker.
+
+    Concurrency starts from 1 and grows by one request for each round of successful
+    requests answered within twice the usual response time. It is halved by a failed
+    request (HTTP 429 or 5xx error, timeout). After breaker_threshold consecutive failed
+    requests, the source is considered unavailable: it is not requested again before
+    unavailable_delay seconds, and then by a single request until one succeeds. Source is
+    given up after max_retry consecutive unavailability periods.
+    """
+
+    # Wait between checks of a request slot, in seconds
+    POLL_DELAY = 0.05
+    # Response time, relative to usual one, above which concurrency stops growing
+    LATENCY_TOLERANCE = 2.0
+
+    def __init__(self, config: Gn2PgSourceConf, max_concurrency: int) -> None:
+        self._max = max(1, max_concurrency)
+        self._threshold = max(1, config.breaker_threshold)
+        self._delay = config.unavailable_delay
+        self._max_openings = config.max_retry
+        self._name = config.name
+        self.limit = 1.0
+        self._in_flight = 0
+        self._latency: Optional[float] = None
+        self._failures = 0
+        self._openings = 0
+        self._open_until: Optional[float] = None
+        self._cond = threading.Condition()
+        self._stats = {"requests": 0, "errors": 0, "peak": 1, "breaker_openings": 0}
+
+    def _resize(self, limit: float, reason: str) -> None:
+        limit = max(1.0, min(float(self._max), limit))
+        if int(limit) != int(self.limit):
+            logger.info(
+                _("Concurrent requests to source %s change from %s to %s (%s)"),
+                self._name,
+                int(self.limit),
+                int(limit),
+                reason,
+            )
+        self.limit = limit
+        self._stats["peak"] = max(self._stats["peak"], int(limit))
+
+    def _try_acquire(self) -> float:
+        if self._open_until is not None:
+            if self._openings > self._max_openings:
+                raise APIException(
+                    _("Source %s is still unavailable after %s retries")
+                    % (self._name, self._max_openings)
+                )
+            wait = self._open_until - time.monotonic()
+            if wait > 0:
+                return wait
+            # Half open breaker, a single request checks source availability
+            if self._in_flight > 0:
+                return self.POLL_DELAY
+        elif self._in_flight >= int(self.limit):
+            return self.POLL_DELAY
+        self._in_flight += 1
+        self._stats["requests"] += 1
+        return 0.0
+
+    def try_acquire(self) -> float:
+        """Take a request slot if one is free, without waiting
+
+        Raises:
+            APIException: if source is given up
+
+        Returns:
+            float: 0 if a slot is taken, else seconds to wait before trying again
+        """
+        with self._cond:
+            return self._try_acquire()
+
+    def acquire(self) -> None:
+        """Wait for a free request slot, and take it
+
+        Raises:
+            APIException: if source is given up
+        """
+        with self._cond:
+            while (wait := self._try_acquire()) > 0:
+                self._cond.wait(wait)
+
+    def release(self, success: bool, seconds: float = 0, reason: str = "") -> None:
+        """Free a request slot, and adapt concurrency to the request result
+
+        Args:
+            success (bool): request succeeded
+            seconds (float, optional): request duration. Defaults to 0.
+            reason (str, optional): failure reason. Defaults to "".
+        """
+        with self._cond:
+            self._in_flight -= 1
+            if success:
+                self._success(seconds)
+            else:
+                self._failure(reason)
+            self._cond.notify_all()
+
+    def _success(self, seconds: float) -> None:
+        self._failures = 0
+        if self._open_until is not None:
+            logger.warning(_("Source %s is available again"), self._name)
+            self._open_until = None
+            self._openings = 0
+        healthy = self._latency is None or seconds <= self.LATENCY_TOLERANCE * self._latency
+        self._latency = seconds if self._latency is None else 0.8 * self._latency + 0.2 * seconds
+        if healthy:
+            self._resize(self.limit + 1 / int(self.limit), _("%.1f s response") % seconds)
+
+    def _failure(self, reason: str) -> None:
+        self._failures += 1
+        self._stats["errors"] += 1
+        self._resize(self.limit / 2, reason)
+        now = time.monotonic()
+        opened = self._open_until is not None and now < self._open_until
+        if self._failures >= self._threshold and not opened:
+            self._openings += 1
+            self._stats["breaker_openings"] += 1
+            self._open_until = now + self._delay
+            logger.warning(
+                _("Source %s is unavailable after %s failed requests (%s), next request in %s s"),
+                self._name,
+                self._failures,
+                reason,
+                self._delay,
+            )
+
+    def summary(self) -> dict:
+        """Return concurrency used, to be logged
+
+        Returns:
+            dict: bounds, last and peak concurrency, requests, errors and breaker openings
+        """
+        with self._cond:
+            return {
+                "max_concurrency": self._max,
+                "last_concurrency": int(self.limit),
+                "peak_concurrency": self._stats["peak"],
+                "requests": self._stats["requests"],
+                "errors": self._stats["errors"],
+                "breaker_openings": self._stats["breaker_openings"],
+            }
+
+
 class BaseAPI:
     """Top class, not for direct use.
     Provides internal and template methods to use GeoNature API."""
@@ -55,6 +300,15 @@ class BaseAPI:
         self._transfer_errors = 0
         self._http_status = 0
         self._ctrl = controler
+        self._codec = get_codec(config.json_codec)
+        self._concurrency: Optional[ConcurrencyController] = None
+        if config.adaptive_concurrency:
+            self._concurrency = ConcurrencyController(
+                config,
+                config.max_in_flight if config.http_client == "httpx" else config.nb_threads,
+            )
+        # page_list probe responses, by first page url
+        self._probe_pages: Dict[str, dict] = {}
         logger.debug(_("controler is %s"), self._ctrl)
         self._api_url = config.url + "/" * (not config.url.endswith("/")) + "api/"
 
@@ -70,9 +324,34 @@ class BaseAPI:
             "Content-Type": "application/json",
             "Accept": "application/json, text/plain, */*",
         }
+        self._login_lock = threading.Lock()
+        self._login_generation = 0
+        self._expires: Optional[float] = None
+        self._export_api_path = None  # Initialize the variable
+        self._session_cache = (
+            SessionCache(config.url, config.user_name) if config.session_cache else None
+        )
+        cached = self._session_cache.load() if self._session_cache is not None else None
+        if cached is not None and cached.get("export_api_path") is not None:
+            logger.info(_("Reuse cached session of GeoNature named %s"), self._config.name)
+            self._session.cookies.update(cached["cookies"])
+            self._expires = cached["expires"]
+            self._export_api_path = cached["export_api_path"]
+        else:
+            self._login()
+            self._find_export_api_path()
+            self._save_session()
+
+    def _login(self) -> None:
+        """Log into GeoNature, session cookies holding the authentication token
+
+        Raises:
+            HTTPError: if login failed
+            InvalidSchema: if source URL is invalid
+        """
         auth_payload = {
-            "login": config.user_name,
-            "password": config.user_password,
+            "login": self._config.user_name,
+            "password": self._config.user_password,
         }
 
         try:
@@ -81,6 +360,8 @@ class BaseAPI:
                 json=auth_payload,
             )
             login.raise_for_status()
+            self._login_generation += 1
+            self._expires = parse_expiry(login.json().get("expires"))
             if login.status_code == 200:
                 logger.info(
                     _("Successfully logged in into GeoNature named %s"),
@@ -100,8 +381,13 @@ class BaseAPI:
             )
             raise error
 
-        #  Find exports api path
-        self._export_api_path = None  # Initialize the variable
+    def _find_export_api_path(self) -> None:
+        """Find EXPORTS module path from GeoNature modules list
+
+        Raises:
+            ExportModuleNotFoundError: if EXPORTS module is not available to user
+            HTTPError: if modules list request failed
+        """
         try:
             modules_list = self._session.get(self._api_url + "gn_commons/modules")
             logger.info(
@@ -140,6 +426,41 @@ class BaseAPI:
             )
             raise error
 
+    def _save_session(self) -> None:
+        """Write session to session cache, if enabled"""
+        if self._session_cache is not None:
+            self._session_cache.save(
+                requests.utils.dict_from_cookiejar(self._session.cookies),
+                self._expires,
+                self._export_api_path,
+            )
+
+    @property
+    def login_generation(self) -> int:
+        """Return the number of logins of this session, to detect a new login."""
+        return self._login_generation
+
+    def session_expired(self) -> bool:
+        """Return True if session expiry date is over."""
+        return self._expires is not None and self._expires < time.time()
+
+    def relogin(self, generation: int) -> None:
+        """Log into GeoNature again after a session expiry, unless another thread already
+        did since generation
+
+        Args:
+            generation (int): login generation of the expired session
+        """
+        with self._login_lock:
+            if generation != self._login_generation:
+                return
+            logger.warning(
+                _("Session of GeoNature named %s has expired, logging in again"),
+                self._config.name,
+            )
+            self._login()
+            self._save_session()
+
     @property
     def version(self) -> str:
         """Return version."""
@@ -160,6 +481,105 @@ class BaseAPI:
         """Return the controler name."""
         return self._ctrl
 
+    @property
+    def codec(self) -> JsonCodec:
+        """Return the JSON codec used to decode pages."""
+        return self._codec
+
+    @property
+    def concurrency(self) -> Optional[ConcurrencyController]:
+        """Return concurrency controller, if adaptive_concurrency is enabled"""
+        return self._concurrency
+
+    @property
+    def config(self):
+        """Return the source configuration."""
+        return self._config
+
+    @property
+    def session(self) -> requests.Session:
+        """Return the logged in HTTP session, whose cookies and headers may be shared."""
+        return self._session
+
+    def _get(self, url: str, **kwargs) -> requests.Response:
+        """GET url, logging into GeoNature again if session has expired or is rejected
+
+        Args:
+            url (str): URL
+            **kwargs: requests get arguments
+
+        Returns:
+            requests.Response: response
+        """
+        kwargs.setdefault("timeout", self._config.timeout)
+        generation = self._login_generation
+        if self.session_expired():
+            self.relogin(generation)
+            generation = self._login_generation
+        response = self._session.get(url=url, **kwargs)
+        if response.status_code == 401:
+            response.close()
+            self.relogin(generation)
+            response = self._session.get(url=url, **kwargs)
+        return response
+
+    @contextmanager
+    def _request(self, url: str, **kwargs) -> Iterator[requests.Response]:
+        """GET url within a request slot of concurrency controller, if enabled. Requests
+        failing with HTTP 429 or 5xx status code are retried with an exponential backoff.
+
+        Args:
+            url (str): URL
+            **kwargs: requests get arguments
+
+        Raises:
+            APIException: if source still fails after max_retry retries
+
+        Yields:
+            requests.Response: response, to be read within context
+        """
+        if self._concurrency is None:
+            with self._get(url, **kwargs) as response:
+                yield response
+            return
+        for retry in range(self._config.max_retry + 1):
+            self._concurrency.acquire()
+            start = time.perf_counter()
+            try:
+                response = self._get(url, **kwargs)
+            except (RetryError, requests.ConnectionError, requests.Timeout) as error:
+                self._concurrency.release(False, reason=type(error).__name__)
+                raise
+            if response.status_code not in OVERLOAD_STATUS:
+                break
+            response.close()
+            self._concurrency.release(False, reason=_("status %s") % response.status_code)
+            if retry < self._config.max_retry:
+                delay = self._config.retry_delay * 2**retry
+                logger.warning(
+                    _("Download %s failed with status code %s, retrying in %s s"),
+                    url,
+                    response.status_code,
+                    delay,
+                )
+                time.sleep(delay)
+        else:
+            raise APIException(
+                _("Download %s failed with status code %s after %s retries")
+                % (url, response.status_code, self._config.max_retry)
+            )
+        error = None
+        try:
+            with response:
+                yield response
+        except (ChunkedEncodingError, requests.ConnectionError, requests.Timeout) as read_error:
+            error = read_error
+            raise
+        finally:
+            self._concurrency.release(
+                error is None, time.perf_counter() - start, type(error).__name__
+            )
+
     def _url(self, kind: str = "data", params: Optional[dict] = None) -> str:
         """Generate export API URL with QueryStrings if params.
 
@@ -185,36 +605,40 @@ class BaseAPI:
         params: dict,
         kind: str = "data",
         pagination_param: str = "offset",
+        keep_probe: bool = True,
     ) -> tuple[Optional[List[str]], int]:
         """List offset pages to download data, based on API "total_filtered" and "limit" values
 
+        The probe request is the first page, whose "limit" is the page length granted by
+        server. If keep_probe, its response is kept and returned by get_page for first page
+        url, instead of downloading it again.
+
         :param params: Querystrings
         :type params: dict
         :param kind: kind of data, defaults to "data"
         :type kind: str, optional
         :param pagination_param: Pagination parameter key
         :type pagination_param: str, optional
+        :param keep_probe: Keep probe response as first page, defaults to True
+        :type keep_probe: bool, optional
         :return: url page list
         :rtype: Optional[List[str]]
         """
-        # GET from API
-        session = self._session
-
         # Check kind value
         if self._url(kind) is None:
             return None, 0, None
 
         api_url = self._url(kind, params)
         try:
-            response = session.get(url=api_url, params={**params})
-            status_code = response.status_code
+            with self._request(api_url, params={**params}) as response:
+                status_code = response.status_code
+                content = response.content
             if response.status_code == 200:
-                resp = response.json()
+                resp = self._codec.loads(content)
                 total_filtered = (
                     resp["total_filtered"] if "total_filtered" in resp else resp["total"]
                 )
-                limit = resp["limit"]
-                total_pages = math.ceil(total_filtered / limit)
+                total_pages = math.ceil(total_filtered / resp["limit"])
                 logger.debug(
                     _("API %s contains %s data in %s page(s)"),
                     api_url,
@@ -232,6 +656,8 @@ class BaseAPI:
                         )
                         for p in range(total_pages)
                     )
+                    if keep_probe:
+                        self.keep_probe_page(page_list[0], resp)
                     return page_list, total_filtered, status_code
         except RetryError as e:
             last_response = e.response
@@ -240,7 +666,225 @@ class BaseAPI:
 
         return None, 0, status_code
 
-    def get_page(self, page_url: str) -> Optional[dict]:
+    def keyset_pages(
+        self,
+        params: dict,
+        kind: str = "data",
+        key: str = "id_synthese",
+        start_key: Optional[int] = None,
+        page_length: Optional[PageLengthController] = None,
+        end_key: Optional[int] = None,
+    ) -> Iterator[dict]:
+        """Generate pages of data ordered by key, each page requesting items whose key is
+        greater than the last key of previous page, instead of an offset.
+
+        Items already seen, or whose key is greater than end_key, are dropped client side,
+        so that API numeric filters may be inclusive or not. Yielded pages
+        "total_filtered" is the one of the first page.
+
+        :param params: Querystrings, including "limit"
+        :type params: dict
+        :param kind: kind of data, defaults to "data"
+        :type kind: str, optional
+        :param key: Unique numeric key to order and page data, defaults to "id_synthese"
+        :type key: str, optional
+        :param start_key: Only request items whose key is greater, defaults to None
+        :type start_key: Optional[int], optional
+        :param page_length: Page length controller, overriding params "limit" and
+            retrying failed pages with a smaller one, defaults to None
+        :type page_length: Optional[PageLengthController], optional
+        :param end_key: Only request items whose key is lower or equal, defaults to None
+        :type end_key: Optional[int], optional
+        :return: pages generator
+        :rtype: Iterator[dict]
+        """
+        params = {**params, "orderby": key}
+        if end_key is not None:
+            params[f"filter_n_lo_{key}"] = end_key + 1
+        last_key = start_key
+        total_filtered = None
+        while True:
+            page_params = (
+                {**params} if last_key is None else {**params, f"filter_n_up_{key}": last_key}
+            )
+            if page_length is None:
+                resp = self.get_page(self._url(kind, page_params))
+            else:
+                page_params["limit"] = page_length.length
+                start = time.perf_counter()
+                try:
+                    resp, size = self.get_page_sized(self._url(kind, page_params))
+                except (
+                    RetryError,
+                    requests.ConnectionError,
+                    requests.Timeout,
+                    ChunkedEncodingError,
+                    json.JSONDecodeError,
+                ) as error:
+                    if page_length.failure(error):
+                        continue
+                    raise
+                page_length.success(time.perf_counter() - start, size, len(resp["items"]))
+            items = resp["items"]
+            if total_filtered is None:
+                total_filtered = (
+                    resp["total_filtered"] if "total_filtered" in resp else resp["total"]
+                )
+            new_items = [
+                item
+                for item in items
+                if (last_key is None or item[key] > last_key)
+                and (end_key is None or item[key] <= end_key)
+            ]
+            # Upper filter may be ignored by API, or be inclusive
+            beyond_end = end_key is not None and any(item[key] > end_key for item in items)
+            limit = resp.get("limit", page_params["limit"])
+            # A full page without any new item means that filter is ignored by API
+            if len(items) >= limit and not new_items and not beyond_end:
+                raise APIException(
+                    _("API %s does not support %s keyset pagination") % (self._url(kind), key)
+                )
+            if new_items:
+                yield {**resp, "items": new_items, "total_filtered": total_filtered}
+            if len(items) < limit or beyond_end:
+                break
+            last_key = max(item[key] for item in items)
+
+    def key_ranges(
+        self, params: dict, nb_ranges: int, kind: str = "data", key: str = "id_synthese"
+    ) -> Tuple[List[Tuple[Optional[int], Optional[int]]], int]:
+        """Split data ordered by key into nb_ranges ranges of about the same number of
+        items, from the keys found at each range offset (one item pages).
+
+        :param params: Querystrings
+        :type params: dict
+        :param nb_ranges: number of ranges
+        :type nb_ranges: int
+        :param kind: kind of data, defaults to "data"
+        :type kind: str, optional
+        :param key: Unique numeric key to order and split data, defaults to "id_synthese"
+        :type key: str, optional
+        :return: ranges, as exclusive start key and inclusive end key (None for no
+            bound), and total items count
+        :rtype: Tuple[List[Tuple[Optional[int], Optional[int]]], int]
+        """
+        params = {**params, "orderby": key, "limit": 1}
+        resp = self.get_page(self._url(kind, {**params, "offset": 0}))
+        total_filtered = resp["total_filtered"] if "total_filtered" in resp else resp["total"]
+        offsets = {total_filtered * part // nb_ranges for part in range(1, nb_ranges)} - {0}
+        bounds = set()
+        if offsets:
+            # Each probe scans up to its offset, they are requested nb_threads at a time
+            with ThreadPool(min(len(offsets), max(self._config.nb_threads, 1))) as pool:
+                for resp in pool.imap_unordered(
+                    self.get_page,
+                    (self._url(kind, {**params, "offset": offset - 1}) for offset in offsets),
+                ):
+                    if resp["items"]:
+                        bounds.add(resp["items"][0][key])
+        limits = [None, *sorted(bounds), None]
+        return list(zip(limits[:-1], limits[1:])), total_filtered
+
+    def count_range(
+        self,
+        params: dict,
+        start_key: Optional[int] = None,
+        end_key: Optional[int] = None,
+        kind: str = "data",
+        key: str = "id_synthese",
+    ) -> Tuple[int, Optional[int], Optional[int]]:
+        """Count data whose key is greater than start_key and lower or equal to end_key,
+        and get their lowest and highest keys, with one item pages at first and last
+        offsets. API numeric filters are expected to be inclusive.
+
+        :param params: Querystrings
+        :type params: dict
+        :param start_key: Exclusive lower key, defaults to None
+        :type start_key: Optional[int], optional
+        :param end_key: Inclusive upper key, defaults to None
+        :type end_key: Optional[int], optional
+        :param kind: kind of data, defaults to "data"
+        :type kind: str, optional
+        :param key: Unique numeric key, defaults to "id_synthese"
+        :type key: str, optional
+        :return: data count, lowest and highest keys of range
+        :rtype: Tuple[int, Optional[int], Optional[int]]
+        """
+        params = {**params, "orderby": key, "limit": 1, "offset": 0}
+        if start_key is not None:
+            params[f"filter_n_up_{key}"] = start_key + 1
+        if end_key is not None:
+            params[f"filter_n_lo_{key}"] = end_key
+        resp = self.get_page(self._url(kind, params))
+        total_filtered = resp["total_filtered"] if "total_filtered" in resp else resp["total"]
+        if not resp["items"]:
+            return total_filtered, None, None
+        first_key = last_key = resp["items"][0][key]
+        if total_filtered > 1:
+            resp = self.get_page(self._url(kind, {**params, "offset": total_filtered - 1}))
+            last_key = resp["items"][0][key] if resp["items"] else None
+        return total_filtered, first_key, last_key
+
+    def url(self, kind: str = "data", params: Optional[dict] = None) -> Optional[str]:
+        """Generate export API URL with QueryStrings if params.
+
+        Args:
+            kind (str, optional): kind of data, "data" or "log". Defaults to "data".
+            params (dict, optional): dict of querystring parameters. Defaults to None.
+
+        Returns:
+            Optional[str]: export API URL, None for an unknown kind.
+        """
+        return self._url(kind, params)
+
+    def keep_probe_page(self, page_url: str, resp: dict) -> None:
+        """Keep a page_list probe response, to be reused as its first page
+
+        Args:
+            page_url (str): first page URL
+            resp (dict): probe response
+        """
+        self._probe_pages[page_url] = resp
+
+    def pop_probe_page(self, page_url: str) -> Optional[dict]:
+        """Get and forget page_list probe response, if page_url is its first page
+
+        Args:
+            page_url (str): page URL
+
+        Returns:
+            Optional[dict]: probe response, or None
+        """
+        return self._probe_pages.pop(page_url, None)
+
+    def stream_page(
+        self, page_url: str, raw: bool = False, chunk_size: int = 65536
+    ) -> ItemsStream:
+        """Get items from one API page as they are received, instead of decoding the
+        whole page at once
+
+        Args:
+            page_url (str): page URL
+            raw (bool, optional): get items JSON texts instead of decoded items.
+                Defaults to False.
+            chunk_size (int, optional): size of read chunks. Defaults to 65536.
+
+        Returns:
+            ItemsStream: page items iterator, other page values being in its meta
+        """
+        probe = self.pop_probe_page(page_url)
+        if probe is not None:
+            logger.info(_("Reuse probe response for page %s"), page_url)
+            return ItemsStream([self._codec.dumps(probe).encode()], raw=raw)
+
+        def chunks() -> Iterator[bytes]:
+            logger.info(_("Stream page %s"), page_url)
+            with self._request(page_url, stream=True) as response:
+                yield from response.iter_content(chunk_size=chunk_size)
+
+        return ItemsStream(chunks(), raw=raw)
+
+    def get_page(self, page_url: str) -> dict:
         """Get data from one API page
 
         Args:
@@ -248,18 +892,39 @@ class BaseAPI:
 
         Returns:
             dict: Datas as dict
+
+        Raises:
+            APIException: if server still fails after retries, or the concurrency
+                controller gave up
         """
 
+        return self.get_page_sized(page_url)[0]
+
+    def get_page_sized(self, page_url: str) -> Tuple[dict, int]:
+        """Get data from one API page, and its size
+
+        Args:
+            page_url (str): page URL
+
+        Returns:
+            Tuple[dict, int]: Datas as dict, and page size in bytes
+
+        Raises:
+            APIException: if server still fails after retries, or the concurrency
+                controller gave up
+        """
+        probe = self.pop_probe_page(page_url)
+        if probe is not None:
+            logger.info(_("Reuse probe response for page %s"), page_url)
+            return probe, 0
+        logger.info(_("Download page %s"), page_url)
         try:
-            logger.info(_("Download page %s"), page_url)
-            session = self._session
-            page_request = session.get(url=page_url)
-            resp = page_request.json()
-            return resp
-        except APIException as error:
+            with self._request(page_url) as page_request:
+                content = page_request.content
+        except APIException:
             logger.critical(_("Download data from %s failed"), page_url)
-            logger.critical(str(error))
-            return None
+            raise
+        return self._codec.loads(content), len(content)
 
 
 class DataAPI(BaseAPI):
@@ -35,6 +35,7 @@ class ImportView(ReadOnlyView):
         "data_count_upserts",
         "data_count_delete",
         "data_count_errors",
+        "data_count_skipped",
         "metadata_count_upserts",
         "metadata_count_errors",
         "xfer_filters",
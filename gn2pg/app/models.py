@@ -33,6 +33,7 @@ class ImportLog(db.Model):
     data_count_upserts = db.Column(db.Integer, index=True, nullable=False)
     data_count_delete = db.Column(db.Integer, index=True, nullable=False)
     data_count_errors = db.Column(db.Integer, index=True)
+    data_count_skipped = db.Column(db.Integer)
     metadata_count_upserts = db.Column(db.Integer, index=True)
     metadata_count_errors = db.Column(db.Integer, index=True)
     comment = db.Column(db.String)
@@ -0,0 +1,206 @@
+"""Provide asyncio python interface to GeoNature API.
+
+
+Methods, see each class
+
+Requires optional httpx package (gn2pg_client[async] extra).
+
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable, List, Optional
+
+from gn2pg import _
+from gn2pg.api import OVERLOAD_STATUS, APIException, BaseAPI
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS = (500, 501, 502, 503, 504)
+
+
+class AsyncDataAPI:
+    """Asynchronous data API, downloading pages with a single httpx client.
+
+    Login and EXPORTS module lookup are done once by the provided synchronous API,
+    whose session cookies and headers are shared with the asynchronous client.
+    get_page coroutines must be awaited inside an "async with" block.
+    """
+
+    def __init__(self, api: BaseAPI) -> None:
+        if httpx is None:
+            raise APIException(
+                _('httpx package is required by http_client "httpx", install gn2pg_client[async]')
+            )
+        self._api = api
+        self._config = api.config
+        self._max_in_flight = self._config.max_in_flight
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    @property
+    def controler(self) -> Optional[str]:
+        """Return the controler name."""
+        return self._api.controler
+
+    @property
+    def max_in_flight(self) -> int:
+        """Return the maximum number of concurrent requests."""
+        return self._max_in_flight
+
+    async def __aenter__(self):
+        """Open the HTTP client, with a connection pool of max_in_flight connections"""
+        session = self._api.session
+        self._client = httpx.AsyncClient(
+            headers=dict(session.headers),
+            cookies=session.cookies,
+            limits=httpx.Limits(
+                max_connections=self._max_in_flight,
+                max_keepalive_connections=self._max_in_flight,
+            ),
+            timeout=httpx.Timeout(self._config.timeout),
+            transport=httpx.AsyncHTTPTransport(retries=self._config.max_retry),
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Close the HTTP client."""
+        await self._client.aclose()
+        self._client = None
+
+    async def _get(self, url: str) -> "httpx.Response":
+        """GET url, retrying on server errors with an exponential backoff, as BaseAPI session.
+        With adaptive concurrency, requests wait for a slot of API concurrency controller.
+
+        Args:
+            url (str): URL
+
+        Raises:
+            APIException: if server still fails after max_retry retries
+
+        Returns:
+            httpx.Response: response
+        """
+        concurrency = self._api.concurrency
+        retry_status = RETRY_STATUS if concurrency is None else OVERLOAD_STATUS
+        for retry in range(self._config.max_retry + 1):
+            generation = self._api.login_generation
+            response = await self._get_once(url)
+            if response.status_code == 401:
+                # Session expired, log in again and share new session cookies
+                await asyncio.to_thread(self._api.relogin, generation)
+                self._client.cookies = self._api.session.cookies
+                response = await self._get_once(url)
+            if response.status_code not in retry_status:
+                return response
+            if retry < self._config.max_retry:
+                delay = self._config.retry_delay * 2**retry
+                logger.warning(
+                    _("Download %s failed with status code %s, retrying in %s s"),
+                    url,
+                    response.status_code,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+        raise APIException(
+            _("Download %s failed with status code %s after %s retries")
+            % (url, response.status_code, self._config.max_retry)
+        )
+
+    async def _get_once(self, url: str) -> "httpx.Response":
+        """GET url, within a request slot of API concurrency controller if enabled
+
+        Args:
+            url (str): URL
+
+        Returns:
+            httpx.Response: response
+        """
+        concurrency = self._api.concurrency
+        if concurrency is None:
+            return await self._client.get(url)
+        while (wait := concurrency.try_acquire()) > 0:
+            await asyncio.sleep(wait)
+        start = time.perf_counter()
+        try:
+            response = await self._client.get(url)
+        except httpx.TransportError as error:
+            concurrency.release(False, reason=type(error).__name__)
+            raise
+        concurrency.release(
+            response.status_code not in OVERLOAD_STATUS,
+            time.perf_counter() - start,
+            _("status %s") % response.status_code,
+        )
+        return response
+
+    async def get_page(self, page_url: str) -> dict:
+        """Get data from one API page
+
+        Args:
+            page_url (str): page URL
+
+        Returns:
+            dict: Datas as dict
+        """
+        probe = self._api.pop_probe_page(page_url)
+        if probe is not None:
+            logger.info(_("Reuse probe response for page %s"), page_url)
+            return probe
+        logger.info(_("Download page %s"), page_url)
+        response = await self._get(page_url)
+        return self._api.codec.loads(response.content)
+
+    async def _download_pages(
+        self, pages: List[str], consume: Callable[[dict], None], nb_consumers: int = 1
+    ) -> None:
+        """Download pages concurrently and consume them in nb_consumers worker threads"""
+        # Downloaded pages wait for consume in a bounded queue. Each download keeps its
+        # in-flight slot until its page is queued, so that downloads pause while the
+        # store stage is behind. Pages are tagged with their url.
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._max_in_flight)
+        in_flight = asyncio.Semaphore(self._max_in_flight)
+
+        async def fetch(url: str) -> None:
+            async with in_flight:
+                page = await self.get_page(url)
+                await queue.put({**page, "page_url": url})
+
+        async def store() -> None:
+            while True:
+                page = await queue.get()
+                if page is None:
+                    break
+                await asyncio.to_thread(consume, page)
+
+        async def produce() -> None:
+            await asyncio.gather(*(fetch(url) for url in pages))
+            for _consumer in range(nb_consumers):
+                await queue.put(None)
+
+        async with self:
+            tasks = [asyncio.create_task(store()) for _consumer in range(nb_consumers)]
+            tasks.append(asyncio.create_task(produce()))
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    def download_pages(
+        self, pages: List[str], consume: Callable[[dict], None], nb_consumers: int = 1
+    ) -> None:
+        """Download pages with at most max_in_flight concurrent requests, and call consume
+        on each downloaded page.
+
+        Args:
+            pages (List[str]): page urls
+            consume (Callable[[dict], None]): function storing a downloaded page
+            nb_consumers (int): number of pages consumed at the same time. Defaults to 1.
+        """
+        asyncio.run(self._download_pages(pages, consume, nb_consumers))
@@ -4,11 +4,11 @@
 
 import copy
 import logging
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from typing import Any, Dict
 from typing import Optional as TypeOptional
 
-from schema import Optional, Schema, SchemaError
+from schema import Optional, Or, Schema, SchemaError
 from toml import load
 
 from gn2pg import _, __version__
@@ -58,6 +58,7 @@ _ConfSchema = Schema(
                 Optional("data_type"): str,
                 Optional("last_action_date"): str,
                 Optional("query_strings"): dict,
+                Optional("load_mode"): Or("upsert", "copy", "raw"),
             }
         ],
         Optional("tuning"): {
@@ -68,6 +69,29 @@ _ConfSchema = Schema(
             Optional("unavailable_delay"): int,
             Optional("lru_maxsize"): int,
             Optional("nb_threads"): int,
+            Optional("load_mode"): Or("upsert", "copy", "raw"),
+            Optional("pagination"): Or("offset", "keyset", "range"),
+            Optional("http_client"): Or("requests", "httpx"),
+            Optional("max_in_flight"): int,
+            Optional("timeout"): Or(int, float),
+            Optional("nb_sources"): int,
+            Optional("max_workers"): int,
+            Optional("nb_store_threads"): int,
+            Optional("queue_size"): int,
+            Optional("stream_items"): bool,
+            Optional("stream_batch_size"): int,
+            Optional("json_codec"): Or("json", "orjson"),
+            Optional("adaptive_page_length"): bool,
+            Optional("min_page_length"): int,
+            Optional("target_page_time"): Or(int, float),
+            Optional("max_page_size_mb"): Or(int, float),
+            Optional("adaptive_concurrency"): bool,
+            Optional("breaker_threshold"): int,
+            Optional("session_cache"): bool,
+            Optional("parallel_delete"): bool,
+            Optional("reconcile_range_size"): int,
+            Optional("work_item_pages"): int,
+            Optional("work_lease"): int,
         },
     }
 )
@@ -100,6 +124,7 @@ class Source:
     enable: bool = True
     last_action_date: TypeOptional[str] = None
     query_strings: dict = field(default_factory=dict)
+    load_mode: TypeOptional[str] = None
 
 
 @dataclass
@@ -113,6 +138,29 @@ class Tuning:
     unavailable_delay: int = 600
     lru_maxsize: int = 32
     nb_threads: int = 1
+    load_mode: str = "upsert"
+    pagination: str = "offset"
+    http_client: str = "requests"
+    max_in_flight: int = 10
+    timeout: float = 300
+    nb_sources: int = 1
+    max_workers: int = 0
+    nb_store_threads: int = 0
+    queue_size: int = 10
+    stream_items: bool = False
+    stream_batch_size: int = 500
+    json_codec: str = "json"
+    adaptive_page_length: bool = False
+    min_page_length: int = 100
+    target_page_time: float = 5
+    max_page_size_mb: float = 50
+    adaptive_concurrency: bool = False
+    breaker_threshold: int = 3
+    session_cache: bool = False
+    parallel_delete: bool = False
+    reconcile_range_size: int = 1000
+    work_item_pages: int = 10
+    work_lease: int = 300
 
 
 class Gn2PgSourceConf:
@@ -134,6 +182,7 @@ class Gn2PgSourceConf:
                     "synthese_with_cd_nomenclature",
                 ),
                 query_strings=coalesce_in_dict(config["source"][source], "query_strings", {}),
+                load_mode=coalesce_in_dict(config["source"][source], "load_mode", None),
                 export_id=config["source"][source]["export_id"],
                 enable=(
                     True
@@ -162,6 +211,35 @@ class Gn2PgSourceConf:
                     unavailable_delay=coalesce_in_dict(tuning, "unavailable_delay", 600),
                     lru_maxsize=coalesce_in_dict(tuning, "lru_maxsize", 32),
                     nb_threads=coalesce_in_dict(tuning, "nb_threads", 1),
+                    load_mode=coalesce_in_dict(tuning, "load_mode", "upsert"),
+                    pagination=coalesce_in_dict(tuning, "pagination", "offset"),
+                    http_client=coalesce_in_dict(tuning, "http_client", "requests"),
+                    max_in_flight=coalesce_in_dict(tuning, "max_in_flight", 10),
+                    timeout=coalesce_in_dict(tuning, "timeout", 300),
+                    nb_sources=coalesce_in_dict(tuning, "nb_sources", 1),
+                    max_workers=coalesce_in_dict(tuning, "max_workers", 0),
+                    nb_store_threads=coalesce_in_dict(tuning, "nb_store_threads", 0),
+                    queue_size=coalesce_in_dict(tuning, "queue_size", 10),
+                    stream_items=coalesce_in_dict(tuning, "stream_items", False),
+                    stream_batch_size=coalesce_in_dict(tuning, "stream_batch_size", 500),
+                    json_codec=coalesce_in_dict(tuning, "json_codec", "json"),
+                    adaptive_page_length=coalesce_in_dict(tuning, "adaptive_page_length", False),
+                    min_page_length=coalesce_in_dict(tuning, "min_page_length", 100),
+                    target_page_time=coalesce_in_dict(tuning, "target_page_time", 5),
+                    max_page_size_mb=coalesce_in_dict(tuning, "max_page_size_mb", 50),
+                    adaptive_concurrency=coalesce_in_dict(tuning, "adaptive_concurrency", False),
+                    breaker_threshold=coalesce_in_dict(tuning, "breaker_threshold", 3),
+                    session_cache=coalesce_in_dict(tuning, "session_cache", False),
+                    parallel_delete=coalesce_in_dict(tuning, "parallel_delete", False),
+                    reconcile_range_size=coalesce_in_dict(tuning, "reconcile_range_size", 1000),
+                    work_item_pages=coalesce_in_dict(tuning, "work_item_pages", 10),
+                    work_lease=coalesce_in_dict(tuning, "work_lease", 300),
+                )
+            else:
+                self._tuning = Tuning()
+            if self._tuning.stream_items and self._tuning.http_client == "httpx":
+                logger.warning(
+                    _('stream_items is not used by "httpx" HTTP client, pages are decoded whole')
                 )
 
         except Exception:  # pragma: no cover
@@ -316,19 +394,19 @@ class Gn2PgSourceConf:
 
     @property
     def unavailable_delay(self) -> int:
-        """Return database import schema
+        """Get the delay, in seconds, before requesting again a source found unavailable
 
         Returns:
-            int: Database import schema
+            int: Delay before requesting an unavailable source
         """
         return self._tuning.unavailable_delay
 
     @property
     def lru_maxsize(self) -> int:
-        """Return database import schema
+        """Return metadata cache size
 
         Returns:
-            int: Database import schema
+            int: Metadata cache size
         """
         return self._tuning.lru_maxsize
 
@@ -341,6 +419,254 @@ class Gn2PgSourceConf:
         """
         return self._tuning.nb_threads
 
+    @property
+    def load_mode(self) -> str:
+        """Return full download load mode, "upsert" (default), "copy" to load pages
+        through a staging table using PostgreSQL COPY, or "raw" to load items JSON texts
+        without decoding them. A source value overrides tuning value.
+
+        Returns:
+            str: Load mode
+        """
+        return self._source.load_mode or self._tuning.load_mode
+
+    @property
+    def pagination(self) -> str:
+        """Return data pagination mode, "offset" (default) to list pages from API count,
+        "keyset" to page through data ordered by id_synthese, or "range" to page through
+        nb_threads id_synthese ranges at the same time.
+
+        Returns:
+            str: Pagination mode
+        """
+        return self._tuning.pagination
+
+    @property
+    def http_client(self) -> str:
+        """Return HTTP client used to download pages, "requests" (default) with nb_threads
+        threads, or "httpx" to download them asynchronously.
+
+        Returns:
+            str: HTTP client
+        """
+        return self._tuning.http_client
+
+    @property
+    def max_in_flight(self) -> int:
+        """Get the maximum number of concurrent requests of "httpx" HTTP client
+
+        Returns:
+            int: The maximum number of concurrent requests
+        """
+        return self._tuning.max_in_flight
+
+    @property
+    def timeout(self) -> TypeOptional[float]:
+        """Get the timeout of API requests, in seconds
+
+        Returns:
+            Optional[float]: The timeout, None if disabled
+        """
+        return self._tuning.timeout or None
+
+    @property
+    def nb_sources(self) -> int:
+        """Get the number of sources downloaded at the same time
+
+        Returns:
+            int: The number of sources downloaded at the same time
+        """
+        return self._tuning.nb_sources
+
+    @property
+    def max_workers(self) -> int:
+        """Get the maximum number of HTTP and database workers (nb_threads, or max_in_flight
+        with "httpx" HTTP client, plus nb_store_threads) of all sources downloaded at the same
+        time, 0 for no limit
+
+        Returns:
+            int: The maximum number of workers
+        """
+        return self._tuning.max_workers
+
+    @property
+    def nb_store_threads(self) -> int:
+        """Get the number of threads storing downloaded pages, while nb_threads threads
+        download next pages. 0 (default) to download and store each page in the same thread.
+
+        Returns:
+            int: The number of store threads
+        """
+        return self._tuning.nb_store_threads
+
+    @property
+    def queue_size(self) -> int:
+        """Get the maximum number of downloaded pages waiting to be stored
+
+        Returns:
+            int: The maximum number of pages waiting to be stored
+        """
+        return self._tuning.queue_size
+
+    @property
+    def stream_items(self) -> bool:
+        """Return flag to parse data pages items as they are received, and store them
+        by batches of stream_batch_size items, instead of decoding whole pages.
+
+        Returns:
+            bool: True if pages items are streamed
+        """
+        return self._tuning.stream_items
+
+    @property
+    def stream_batch_size(self) -> int:
+        """Get the number of streamed items stored at once
+
+        Returns:
+            int: The number of streamed items stored at once
+        """
+        return self._tuning.stream_batch_size
+
+    @property
+    def json_codec(self) -> str:
+        """Return JSON codec used to decode API pages and encode JSONB values, "json"
+        (default, python standard library) or "orjson" (gn2pg_client[fast] extra).
+
+        Returns:
+            str: JSON codec name
+        """
+        return self._tuning.json_codec
+
+    @property
+    def adaptive_page_length(self) -> bool:
+        """Return flag to adapt data pages length, from min_page_length to max_page_length,
+        to page download time, size and errors. Only used by "keyset" and "range" pagination.
+
+        Returns:
+            bool: True if page length is adaptive
+        """
+        return self._tuning.adaptive_page_length
+
+    @property
+    def min_page_length(self) -> int:
+        """Get the minimum page length of adaptive page length
+
+        Returns:
+            int: Minimum page length
+        """
+        return self._tuning.min_page_length
+
+    @property
+    def target_page_time(self) -> float:
+        """Get the page download time, in seconds, that adaptive page length should not exceed
+
+        Returns:
+            float: Target page download time
+        """
+        return self._tuning.target_page_time
+
+    @property
+    def max_page_size_mb(self) -> float:
+        """Get the page size, in MB, that adaptive page length should not exceed
+
+        Returns:
+            float: Maximum page size
+        """
+        return self._tuning.max_page_size_mb
+
+    @property
+    def adaptive_concurrency(self) -> bool:
+        """Get if concurrent API requests adapt to source health, up to nb_threads (or
+        max_in_flight with "httpx" HTTP client), with a circuit breaker
+
+        Returns:
+            bool: Adaptive concurrency
+        """
+        return self._tuning.adaptive_concurrency
+
+    @property
+    def breaker_threshold(self) -> int:
+        """Get the number of consecutive failed API requests after which source is
+        considered unavailable for unavailable_delay seconds
+
+        Returns:
+            int: Consecutive failures opening circuit breaker
+        """
+        return self._tuning.breaker_threshold
+
+    @property
+    def session_cache(self) -> bool:
+        """Get if GeoNature session cookies and EXPORTS module path are cached on disk, to
+        be reused by next runs instead of logging in again
+
+        Returns:
+            bool: Session cache
+        """
+        return self._tuning.session_cache
+
+    @property
+    def parallel_delete(self) -> bool:
+        """Get if updates download and delete deleted data while new or modified data are
+        stored, instead of after them
+
+        Returns:
+            bool: Parallel delete
+        """
+        return self._tuning.parallel_delete
+
+    @property
+    def reconcile_range_size(self) -> int:
+        """Get the mean number of data of id ranges first compared by reconciliation
+
+        Returns:
+            int: Reconciliation range size
+        """
+        return self._tuning.reconcile_range_size
+
+    @property
+    def work_item_pages(self) -> int:
+        """Get the mean number of pages of distributed download work items
+
+        Returns:
+            int: Work item pages
+        """
+        return self._tuning.work_item_pages
+
+    @property
+    def work_lease(self) -> int:
+        """Get the lease duration of distributed download work items, in seconds
+
+        Returns:
+            int: Work item lease duration
+        """
+        return self._tuning.work_lease
+
+    def limit_workers(self, workers: int) -> "Gn2PgSourceConf":
+        """Return source configuration whose download uses at most workers HTTP and
+        database workers, with fewer download and store threads if it needs more.
+
+        Args:
+            workers (int): Number of workers granted to the source
+
+        Returns:
+            Gn2PgSourceConf: This configuration, or a copy with limited threads
+        """
+        http_workers = self.max_in_flight if self.http_client == "httpx" else self.nb_threads
+        needed = http_workers + self.nb_store_threads
+        if needed <= workers:
+            return self
+        # Store threads keep their share of workers, at least one worker downloads
+        store_threads = min(self.nb_store_threads * workers // needed, workers - 1)
+        http_workers = max(workers - store_threads, 1)
+        conf = copy.copy(self)
+        conf._tuning = replace(
+            self._tuning,
+            nb_threads=min(self.nb_threads, http_workers),
+            max_in_flight=min(self.max_in_flight, http_workers),
+            nb_store_threads=store_threads,
+        )
+        return conf
+
 
 class Gn2PgConf:
     """Read config file and expose list of sources configuration"""
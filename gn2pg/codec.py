@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""JSON codecs, used to decode API pages and to encode JSONB values.
+
+"json" codec is python standard library one. "orjson" codec requires optional
+orjson package (gn2pg_client[fast] extra), and falls back to "json" if missing.
+"""
+
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Union
+
+from gn2pg import _
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class JsonCodec:
+    """JSON encoder (to str) and decoder (from str or bytes)"""
+
+    name: str
+    dumps: Callable[[Any], str]
+    loads: Callable[[Union[str, bytes]], Any]
+
+
+def _orjson_dumps(obj: Any) -> str:
+    """Encode obj with orjson, as a str like json.dumps"""
+    return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+
+CODECS: Dict[str, JsonCodec] = {"json": JsonCodec("json", json.dumps, json.loads)}
+if orjson is not None:
+    CODECS["orjson"] = JsonCodec("orjson", _orjson_dumps, orjson.loads)
+
+
+def get_codec(name: str = "json") -> JsonCodec:
+    """Return JSON codec by name, "json" codec if it is not available
+
+    Args:
+        name (str, optional): codec name. Defaults to "json".
+
+    Returns:
+        JsonCodec: JSON codec
+    """
+    if name not in CODECS:
+        logger.warning(
+            _('JSON codec "%s" is not available, install gn2pg_client[fast], using "json"'),
+            name,
+        )
+        return CODECS["json"]
+    return CODECS[name]
@@ -17,6 +17,34 @@ BEGIN;
 
 CREATE SCHEMA IF NOT EXISTS gn2pg_import;
 
+/* Trigger mode set by fct_c_set_trigger_mode, detected from enabled triggers
+ before they are created again, so that it is kept when script is run again.
+ Defaults to 'row' on first run. */
+DROP TABLE IF EXISTS pg_temp.tmp_trigger_mode;
+
+CREATE TEMPORARY TABLE tmp_trigger_mode AS
+SELECT
+    CASE WHEN bool_or(tgname = 'tri_q_insert_data_to_queue'
+        AND tgenabled <> 'D') THEN
+        'queue'
+    WHEN bool_or(tgname = 'tri_s_insert_data_to_geonature'
+        AND tgenabled <> 'D') THEN
+        'statement'
+    WHEN bool_or(tgname = 'tri_c_upsert_data_to_geonature'
+        AND tgenabled <> 'D') THEN
+        'row'
+    WHEN count(*) > 0 THEN
+        'none'
+    ELSE
+        'row'
+    END AS mode
+FROM
+    pg_trigger
+WHERE
+    tgrelid = to_regclass('gn2pg_import.data_json')
+    AND tgname IN ('tri_q_insert_data_to_queue' , 'tri_s_insert_data_to_geonature' ,
+        'tri_c_upsert_data_to_geonature');
+
 DROP FUNCTION IF EXISTS
     gn2pg_import.fct_c_get_or_insert_basic_af_from_uuid_name (_uuid uuid ,
     _name TEXT);
@@ -243,12 +271,60 @@ COMMENT ON FUNCTION gn2pg_import.fct_c_get_id_area (VARCHAR , VARCHAR) IS 'Custo
 
 
 /*  Nomenclatures */
+/* Lookup maps of nomenclatures by type mnemonique and code or label, and of
+ default nomenclatures by type mnemonique, to be refreshed with
+ fct_c_refresh_nomenclature_map() when GeoNature nomenclatures change */
+DROP MATERIALIZED VIEW IF EXISTS gn2pg_import.mv_c_nomenclature_map;
+
+CREATE MATERIALIZED VIEW gn2pg_import.mv_c_nomenclature_map AS
+SELECT
+    n.id_nomenclature
+    , t.mnemonique
+    , n.cd_nomenclature
+    , n.label_default
+FROM
+    ref_nomenclatures.t_nomenclatures n
+    JOIN ref_nomenclatures.bib_nomenclatures_types t ON n.id_type = t.id_type;
+
+CREATE UNIQUE INDEX ON gn2pg_import.mv_c_nomenclature_map (id_nomenclature);
+
+CREATE INDEX ON gn2pg_import.mv_c_nomenclature_map (mnemonique , cd_nomenclature);
+
+CREATE INDEX ON gn2pg_import.mv_c_nomenclature_map (mnemonique , label_default);
+
+COMMENT ON MATERIALIZED VIEW gn2pg_import.mv_c_nomenclature_map IS 'Nomenclatures lookup map by type mnemonique and code or label';
+
+DROP MATERIALIZED VIEW IF EXISTS gn2pg_import.mv_c_nomenclature_default;
+
+CREATE MATERIALIZED VIEW gn2pg_import.mv_c_nomenclature_default AS
+SELECT
+    t.mnemonique
+    , ref_nomenclatures.get_default_nomenclature_value (t.mnemonique) AS id_nomenclature
+FROM
+    ref_nomenclatures.bib_nomenclatures_types t;
+
+CREATE UNIQUE INDEX ON gn2pg_import.mv_c_nomenclature_default (mnemonique);
+
+COMMENT ON MATERIALIZED VIEW gn2pg_import.mv_c_nomenclature_default IS 'Default nomenclatures lookup map by type mnemonique';
+
+CREATE OR REPLACE FUNCTION gn2pg_import.fct_c_refresh_nomenclature_map ()
+    RETURNS VOID
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY gn2pg_import.mv_c_nomenclature_map;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY gn2pg_import.mv_c_nomenclature_default;
+END;
+$$;
+
+COMMENT ON FUNCTION gn2pg_import.fct_c_refresh_nomenclature_map () IS 'Refresh nomenclatures lookup maps';
+
 DROP FUNCTION IF EXISTS gn2pg_import.fct_c_get_id_nomenclature (_type TEXT ,
     _cd_nomenclature TEXT);
 
 CREATE OR REPLACE FUNCTION gn2pg_import.fct_c_get_id_nomenclature (_type
     CHARACTER VARYING , _cd_nomenclature CHARACTER VARYING)
-    RETURNS INTEGER IMMUTABLE
+    RETURNS INTEGER STABLE
     LANGUAGE plpgsql
     AS $$
 --Function which return the id_nomenclature from an mnemonique_type and an
@@ -257,14 +333,24 @@ DECLARE
     the_id_nomenclature INTEGER;
 BEGIN
     SELECT
-        id_nomenclature INTO the_id_nomenclature
+        m.id_nomenclature INTO the_id_nomenclature
     FROM
-        ref_nomenclatures.t_nomenclatures n
+        gn2pg_import.mv_c_nomenclature_map m
     WHERE
-        n.id_type = ref_nomenclatures.get_id_nomenclature_type (_type)
-        AND _cd_nomenclature = n.cd_nomenclature;
-    RETURN coalesce(the_id_nomenclature ,
-	ref_nomenclatures.get_default_nomenclature_value (_type));
+        m.mnemonique = _type
+        AND m.cd_nomenclature = _cd_nomenclature
+    ORDER BY
+        m.id_nomenclature
+    LIMIT 1;
+    IF the_id_nomenclature IS NULL THEN
+        SELECT
+            d.id_nomenclature INTO the_id_nomenclature
+        FROM
+            gn2pg_import.mv_c_nomenclature_default d
+        WHERE
+            d.mnemonique = _type;
+    END IF;
+    RETURN the_id_nomenclature;
 END;
 $$;
 
@@ -276,19 +362,21 @@ DROP FUNCTION IF EXISTS gn2pg_import.fct_c_get_id_nomenclature_from_label
 
 CREATE OR REPLACE FUNCTION gn2pg_import.fct_c_get_id_nomenclature_from_label
     (_type TEXT , _label TEXT)
-    RETURNS INTEGER
+    RETURNS INTEGER STABLE
     AS $func$
 DECLARE
     the_id_nomenclature INT;
 BEGIN
     SELECT
-        id_nomenclature INTO the_id_nomenclature
+        m.id_nomenclature INTO the_id_nomenclature
     FROM
-        ref_nomenclatures.t_nomenclatures n
-        JOIN ref_nomenclatures.bib_nomenclatures_types t ON n.id_type = t.id_type
+        gn2pg_import.mv_c_nomenclature_map m
     WHERE
-        t.mnemonique LIKE _type
-        AND n.label_default = _label;
+        m.mnemonique = _type
+        AND m.label_default = _label
+    ORDER BY
+        m.id_nomenclature
+    LIMIT 1;
     RETURN the_id_nomenclature;
 END
 $func$
@@ -1338,4 +1426,741 @@ CREATE TRIGGER tri_c_delete_data_from_geonature
     WHEN (old.type IN ('synthese_with_label' , 'synthese_with_cd_nomenclature' , 'synthese_with_metadata'))
     EXECUTE PROCEDURE gn2pg_import.fct_tri_c_delete_data_from_geonature ();
 
+-- SET-BASED SYNC
+DROP FUNCTION IF EXISTS gn2pg_import.fct_c_sync_data_to_geonature (_import_id
+    INT , _ids INT[] , _source VARCHAR);
+
+CREATE OR REPLACE FUNCTION gn2pg_import.fct_c_sync_data_to_geonature (_import_id
+    INT DEFAULT NULL , _ids INT[] DEFAULT NULL , _source VARCHAR DEFAULT NULL)
+    RETURNS INTEGER
+    LANGUAGE plpgsql
+    AS $$
+/*
+ Set-based alternative to tri_c_upsert_data_to_geonature trigger: upsert in
+ synthese the data of an import (_import_id) and/or a batch of data ids (_ids)
+ from a source (_source), or all data if no filter is given, with a single
+ INSERT ... SELECT ... ON CONFLICT statement. Sources, acquisition frameworks
+ and datasets are resolved once per distinct value, nomenclatures and areas
+ through joins.
+ */
+DECLARE
+    _local_srid INT;
+    the_count INT;
+BEGIN
+    SELECT
+        find_srid ('gn_synthese' , 'synthese' , 'the_geom_local') INTO _local_srid;
+    WITH data AS MATERIALIZED (
+        SELECT
+            d.source
+            , d.type
+            , d.type = 'synthese_with_label' AS by_label
+            , d.uuid
+            , d.item
+            , cast(d.item #>> '{ca_uuid}' AS UUID) AS ca_uuid
+            , cast(d.item #>> '{jdd_uuid}' AS UUID) AS jdd_uuid
+        FROM
+            gn2pg_import.data_json d
+        WHERE
+            d.uuid IS NOT NULL
+            AND (_import_id IS NULL
+                OR d.import_id = _import_id)
+            AND (_ids IS NULL
+                OR d.id_data IN (
+                    SELECT
+                        unnest(_ids)))
+            AND (_source IS NULL
+                OR d.source = _source))
+    , sources AS MATERIALIZED (
+        SELECT
+            s.source
+            , gn2pg_import.fct_c_get_or_insert_source (s.source) AS id_source
+        FROM (
+            SELECT DISTINCT
+                source
+            FROM
+                data) s)
+    , afs AS MATERIALIZED (
+        SELECT
+            a.type
+            , a.ca_uuid
+            , CASE a.type
+            WHEN 'synthese_with_metadata' THEN
+                gn2pg_import.fct_get_af_id_from_uuid (a.ca_uuid)
+            ELSE
+                gn2pg_import.fct_c_get_or_insert_basic_af_from_uuid_name (a.ca_uuid , a.ca_nom)
+            END AS id_af
+        FROM (
+            SELECT DISTINCT ON (type , ca_uuid)
+                type
+                , ca_uuid
+                , item #>> '{ca_nom}' AS ca_nom
+            FROM
+                data) a)
+    , datasets AS MATERIALIZED (
+        SELECT
+            ds.type
+            , ds.jdd_uuid
+            , CASE ds.type
+            WHEN 'synthese_with_metadata' THEN
+                gn2pg_import.fct_get_dataset_id_from_uuid (ds.jdd_uuid)
+            ELSE
+                gn2pg_import.fct_c_get_or_insert_basic_dataset_from_uuid_name
+                    (ds.jdd_uuid , ds.jdd_nom , afs.id_af)
+            END AS id_dataset
+        FROM (
+            SELECT DISTINCT ON (type , jdd_uuid)
+                type
+                , jdd_uuid
+                , ca_uuid
+                , item #>> '{jdd_nom}' AS jdd_nom
+            FROM
+                data) ds
+        LEFT JOIN afs ON (afs.type , afs.ca_uuid) = (ds.type , ds.ca_uuid))
+    -- Nomenclatures by code (by_label is false) or by label (by_label is true)
+    , nomenclatures AS MATERIALIZED (
+        (
+            SELECT DISTINCT ON (m.mnemonique , m.cd_nomenclature)
+                m.mnemonique
+                , FALSE AS by_label
+                , m.cd_nomenclature AS code
+                , m.id_nomenclature
+            FROM
+                gn2pg_import.mv_c_nomenclature_map m
+            ORDER BY
+                m.mnemonique
+                , m.cd_nomenclature
+                , m.id_nomenclature)
+        UNION ALL (
+            SELECT DISTINCT ON (m.mnemonique , m.label_default)
+                m.mnemonique
+                , TRUE
+                , m.label_default
+                , m.id_nomenclature
+            FROM
+                gn2pg_import.mv_c_nomenclature_map m
+            ORDER BY
+                m.mnemonique
+                , m.label_default
+                , m.id_nomenclature))
+    -- Default values, only used for nomenclatures by code
+    , defaults AS MATERIALIZED (
+        SELECT
+            jsonb_object_agg(d.mnemonique , d.id_nomenclature) AS ids
+        FROM
+            gn2pg_import.mv_c_nomenclature_default d)
+    , synthese_data AS (
+        SELECT
+            d.uuid AS unique_id_sinp
+            , cast(d.item #>> '{id_perm_grp_sinp}' AS UUID) AS unique_id_sinp_grp
+            , src.id_source
+            , cast(d.item #>> '{id_synthese}' AS INT) AS entity_source_pk_value
+            , ds.id_dataset
+            , coalesce(n_geo_object_nature.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'NAT_OBJ_GEO')::INT END) AS id_nomenclature_geo_object_nature
+            , coalesce(n_grp_typ.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'TYP_GRP')::INT END) AS id_nomenclature_grp_typ
+            , d.item #>> '{methode_regroupement}' AS grp_method
+            , coalesce(n_obs_technique.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'METH_OBS')::INT END) AS id_nomenclature_obs_technique
+            , coalesce(n_bio_status.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'STATUT_BIO')::INT END) AS id_nomenclature_bio_status
+            , coalesce(n_bio_condition.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'ETA_BIO')::INT END) AS id_nomenclature_bio_condition
+            , coalesce(n_naturalness.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'NATURALITE')::INT END) AS id_nomenclature_naturalness
+            , coalesce(n_exist_proof.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'PREUVE_EXIST')::INT END) AS id_nomenclature_exist_proof
+            , coalesce(n_valid_status.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'STATUT_VALID')::INT END) AS id_nomenclature_valid_status
+            , coalesce(n_diffusion_level.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'NIV_PRECIS')::INT END) AS id_nomenclature_diffusion_level
+            , coalesce(n_life_stage.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'STADE_VIE')::INT END) AS id_nomenclature_life_stage
+            , coalesce(n_sex.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'SEXE')::INT END) AS id_nomenclature_sex
+            , coalesce(n_obj_count.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'OBJ_DENBR')::INT END) AS id_nomenclature_obj_count
+            , coalesce(n_type_count.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'TYP_DENBR')::INT END) AS id_nomenclature_type_count
+            , coalesce(n_sensitivity.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'SENSIBILITE')::INT END) AS id_nomenclature_sensitivity
+            , coalesce(n_observation_status.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'STATUT_OBS')::INT END) AS id_nomenclature_observation_status
+            , coalesce(n_blurring.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'DEE_FLOU')::INT END) AS id_nomenclature_blurring
+            , coalesce(n_source_status.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'STATUT_SOURCE')::INT END) AS id_nomenclature_source_status
+            , coalesce(n_info_geo_type.id_nomenclature ,
+                (def.ids ->> 'TYP_INF_GEO')::INT) AS id_nomenclature_info_geo_type
+            , coalesce(n_behaviour.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'OCC_COMPORTEMENT')::INT END) AS id_nomenclature_behaviour
+            , coalesce(n_biogeo_status.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'STAT_BIOGEO')::INT END) AS id_nomenclature_biogeo_status
+            , d.item #>> '{reference_biblio}' AS reference_biblio
+            , cast(d.item #>> '{nombre_min}' AS INT) AS count_min
+            , cast(d.item #>> '{nombre_max}' AS INT) AS count_max
+            , cast(d.item #>> '{cd_nom}' AS INT) AS cd_nom
+            , cast(d.item #>> '{cd_hab}' AS INT) AS cd_hab
+            , d.item #>> '{nom_cite}' AS nom_cite
+            , d.item #>> '{version_taxref}' AS meta_v_taxref
+            , d.item #>> '{numero_preuve}' AS sample_number_proof
+            , d.item #>> '{preuve_numerique}' AS digital_proof
+            , d.item #>> '{preuve_non_numerique}' AS non_digital_proof
+            , cast(d.item #>> '{altitude_min}' AS INT) AS altitude_min
+            , cast(d.item #>> '{altitude_max}' AS INT) AS altitude_max
+            , cast(d.item #>> '{profondeur_min}' AS INT) AS depth_min
+            , cast(d.item #>> '{profondeur_max}' AS INT) AS depth_max
+            , d.item #>> '{nom_lieu}' AS place_name
+            , geom.the_geom_4326
+            , st_centroid (geom.the_geom_4326) AS the_geom_point
+            , st_transform (geom.the_geom_4326 , _local_srid) AS the_geom_local
+            , cast(d.item #>> '{precision}' AS INT) AS precision
+            , area.id_area AS id_area_attachment
+            , cast(d.item #>> '{date_debut}' AS DATE) AS date_min
+            , cast(d.item #>> '{date_fin}' AS DATE) AS date_max
+            , d.item #>> '{validateur}' AS validator
+            , d.item #>> '{comment_validation}' AS validation_comment
+            , d.item #>> '{observateurs}' AS observers
+            , d.item #>> '{determinateur}' AS determiner
+            , cast(NULL AS INT) AS id_digitiser
+            , coalesce(n_determination_method.id_nomenclature , CASE WHEN NOT d.by_label THEN
+                (def.ids ->> 'TYPE')::INT END) AS id_nomenclature_determination_method
+            , d.item #>> '{comment_releve}' AS comment_context
+            , d.item #>> '{comment_occurrence}' AS comment_description
+            , d.item #> '{donnees_additionnelles}' AS additional_data
+            , cast(NULL AS TIMESTAMP) AS meta_validation_date
+        FROM
+            data d
+            CROSS JOIN defaults def
+            CROSS JOIN LATERAL (
+                SELECT
+                    st_setsrid (st_geomfromtext (d.item #>> '{wkt_4326}') , 4326) AS the_geom_4326) geom
+            JOIN sources src ON src.source = d.source
+            LEFT JOIN datasets ds ON (ds.type , ds.jdd_uuid) = (d.type , d.jdd_uuid)
+            LEFT JOIN ref_geo.bib_areas_types area_type ON area_type.type_code = d.item
+                #>> '{area_attachment,type_code}'
+            LEFT JOIN ref_geo.l_areas area ON area.id_type = area_type.id_type
+                AND area.area_code = d.item #>> '{area_attachment,area_code}'
+            LEFT JOIN nomenclatures n_geo_object_nature ON (n_geo_object_nature.mnemonique ,
+                n_geo_object_nature.by_label , n_geo_object_nature.code) = ('NAT_OBJ_GEO' ,
+                d.by_label , d.item #>> '{nature_objet_geo}')
+            LEFT JOIN nomenclatures n_grp_typ ON (n_grp_typ.mnemonique , n_grp_typ.by_label ,
+                n_grp_typ.code) = ('TYP_GRP' , d.by_label , d.item #>> '{type_regroupement}')
+            LEFT JOIN nomenclatures n_obs_technique ON (n_obs_technique.mnemonique ,
+                n_obs_technique.by_label , n_obs_technique.code) = ('METH_OBS' , d.by_label ,
+                d.item #>> '{technique_obs}')
+            LEFT JOIN nomenclatures n_bio_status ON (n_bio_status.mnemonique ,
+                n_bio_status.by_label , n_bio_status.code) = ('STATUT_BIO' , d.by_label ,
+                d.item #>> '{statut_biologique}')
+            LEFT JOIN nomenclatures n_bio_condition ON (n_bio_condition.mnemonique ,
+                n_bio_condition.by_label , n_bio_condition.code) = ('ETA_BIO' , d.by_label ,
+                d.item #>> '{etat_biologique}')
+            LEFT JOIN nomenclatures n_naturalness ON (n_naturalness.mnemonique ,
+                n_naturalness.by_label , n_naturalness.code) = ('NATURALITE' , d.by_label ,
+                d.item #>> '{naturalite}')
+            LEFT JOIN nomenclatures n_exist_proof ON (n_exist_proof.mnemonique ,
+                n_exist_proof.by_label , n_exist_proof.code) = ('PREUVE_EXIST' , d.by_label ,
+                d.item #>> '{preuve_existante}')
+            LEFT JOIN nomenclatures n_valid_status ON (n_valid_status.mnemonique ,
+                n_valid_status.by_label , n_valid_status.code) = ('STATUT_VALID' , d.by_label ,
+                d.item #>> '{statut_validation}')
+            LEFT JOIN nomenclatures n_diffusion_level ON (n_diffusion_level.mnemonique ,
+                n_diffusion_level.by_label , n_diffusion_level.code) = ('NIV_PRECIS' ,
+                d.by_label , d.item #>> '{precision_diffusion}')
+            LEFT JOIN nomenclatures n_life_stage ON (n_life_stage.mnemonique ,
+                n_life_stage.by_label , n_life_stage.code) = ('STADE_VIE' , d.by_label ,
+                d.item #>> '{stade_vie}')
+            LEFT JOIN nomenclatures n_sex ON (n_sex.mnemonique , n_sex.by_label , n_sex.code) =
+                ('SEXE' , d.by_label , d.item #>> '{sexe}')
+            LEFT JOIN nomenclatures n_obj_count ON (n_obj_count.mnemonique ,
+                n_obj_count.by_label , n_obj_count.code) = ('OBJ_DENBR' , d.by_label ,
+                d.item #>> '{objet_denombrement}')
+            LEFT JOIN nomenclatures n_type_count ON (n_type_count.mnemonique ,
+                n_type_count.by_label , n_type_count.code) = ('TYP_DENBR' , d.by_label ,
+                d.item #>> '{type_denombrement}')
+            LEFT JOIN nomenclatures n_sensitivity ON (n_sensitivity.mnemonique ,
+                n_sensitivity.by_label , n_sensitivity.code) = ('SENSIBILITE' , d.by_label ,
+                d.item #>> '{niveau_sensibilite}')
+            LEFT JOIN nomenclatures n_observation_status ON (n_observation_status.mnemonique ,
+                n_observation_status.by_label , n_observation_status.code) = ('STATUT_OBS' ,
+                d.by_label , d.item #>> '{statut_observation}')
+            LEFT JOIN nomenclatures n_blurring ON (n_blurring.mnemonique , n_blurring.by_label
+                , n_blurring.code) = ('DEE_FLOU' , d.by_label , d.item #>> '{floutage_dee}')
+            LEFT JOIN nomenclatures n_source_status ON (n_source_status.mnemonique ,
+                n_source_status.by_label , n_source_status.code) = ('STATUT_SOURCE' ,
+                d.by_label , d.item #>> '{statut_source}')
+            -- Type of geographic information is an attachment if its area exists
+            LEFT JOIN nomenclatures n_info_geo_type ON (n_info_geo_type.mnemonique ,
+                n_info_geo_type.by_label , n_info_geo_type.code) = ('TYP_INF_GEO' , FALSE ,
+                CASE WHEN area.id_area IS NOT NULL THEN '2' ELSE '1' END)
+            LEFT JOIN nomenclatures n_behaviour ON (n_behaviour.mnemonique ,
+                n_behaviour.by_label , n_behaviour.code) = ('OCC_COMPORTEMENT' , d.by_label ,
+                d.item #>> '{comportement}')
+            LEFT JOIN nomenclatures n_biogeo_status ON (n_biogeo_status.mnemonique ,
+                n_biogeo_status.by_label , n_biogeo_status.code) = ('STAT_BIOGEO' , d.by_label
+                , d.item #>> '{statut_biogeo}')
+            LEFT JOIN nomenclatures n_determination_method ON
+                (n_determination_method.mnemonique , n_determination_method.by_label ,
+                n_determination_method.code) = ('TYPE' , d.by_label , d.item #>> '{label}')
+        -- Data do not exists or data exists from this source only
+        WHERE
+            NOT EXISTS (
+                SELECT
+                FROM
+                    gn_synthese.synthese s
+                WHERE
+                    s.unique_id_sinp = d.uuid
+                    AND s.id_source <> src.id_source))
+    INSERT INTO gn_synthese.synthese (unique_id_sinp , unique_id_sinp_grp ,
+	id_source , entity_source_pk_value , id_dataset ,
+	id_nomenclature_geo_object_nature , id_nomenclature_grp_typ ,
+	grp_method , id_nomenclature_obs_technique , id_nomenclature_bio_status
+	, id_nomenclature_bio_condition , id_nomenclature_naturalness ,
+	id_nomenclature_exist_proof , id_nomenclature_valid_status ,
+	id_nomenclature_diffusion_level , id_nomenclature_life_stage ,
+	id_nomenclature_sex , id_nomenclature_obj_count ,
+	id_nomenclature_type_count , id_nomenclature_sensitivity ,
+	id_nomenclature_observation_status , id_nomenclature_blurring ,
+	id_nomenclature_source_status , id_nomenclature_info_geo_type ,
+	id_nomenclature_behaviour , id_nomenclature_biogeo_status ,
+	reference_biblio , count_min , count_max , cd_nom , cd_hab , nom_cite ,
+	meta_v_taxref , sample_number_proof , digital_proof , non_digital_proof
+	, altitude_min , altitude_max , depth_min , depth_max , place_name ,
+	the_geom_4326 , the_geom_point , the_geom_local , precision ,
+	id_area_attachment , date_min , date_max , validator ,
+	validation_comment , observers , determiner , id_digitiser ,
+	id_nomenclature_determination_method , comment_context ,
+	comment_description , additional_data , meta_validation_date ,
+	last_action)
+    SELECT
+        unique_id_sinp , unique_id_sinp_grp , id_source , entity_source_pk_value ,
+        id_dataset , id_nomenclature_geo_object_nature , id_nomenclature_grp_typ ,
+        grp_method , id_nomenclature_obs_technique , id_nomenclature_bio_status ,
+        id_nomenclature_bio_condition , id_nomenclature_naturalness ,
+        id_nomenclature_exist_proof , id_nomenclature_valid_status ,
+        id_nomenclature_diffusion_level , id_nomenclature_life_stage ,
+        id_nomenclature_sex , id_nomenclature_obj_count , id_nomenclature_type_count ,
+        id_nomenclature_sensitivity , id_nomenclature_observation_status ,
+        id_nomenclature_blurring , id_nomenclature_source_status ,
+        id_nomenclature_info_geo_type , id_nomenclature_behaviour ,
+        id_nomenclature_biogeo_status , reference_biblio , count_min , count_max ,
+        cd_nom , cd_hab , nom_cite , meta_v_taxref , sample_number_proof ,
+        digital_proof , non_digital_proof , altitude_min , altitude_max , depth_min ,
+        depth_max , place_name , the_geom_4326 , the_geom_point , the_geom_local ,
+        precision , id_area_attachment , date_min , date_max , validator ,
+        validation_comment , observers , determiner , id_digitiser ,
+        id_nomenclature_determination_method , comment_context ,
+        comment_description , additional_data , meta_validation_date , 'I'
+    FROM
+        synthese_data
+    ON CONFLICT (unique_id_sinp)
+        DO UPDATE SET
+            unique_id_sinp_grp = excluded.unique_id_sinp_grp
+            , id_source = excluded.id_source
+            , entity_source_pk_value = excluded.entity_source_pk_value
+            , id_dataset = excluded.id_dataset
+            , id_nomenclature_geo_object_nature = excluded.id_nomenclature_geo_object_nature
+            , id_nomenclature_grp_typ = excluded.id_nomenclature_grp_typ
+            , grp_method = excluded.grp_method
+            , id_nomenclature_obs_technique = excluded.id_nomenclature_obs_technique
+            , id_nomenclature_bio_status = excluded.id_nomenclature_bio_status
+            , id_nomenclature_bio_condition = excluded.id_nomenclature_bio_condition
+            , id_nomenclature_naturalness = excluded.id_nomenclature_naturalness
+            , id_nomenclature_exist_proof = excluded.id_nomenclature_exist_proof
+            , id_nomenclature_valid_status = excluded.id_nomenclature_valid_status
+            , id_nomenclature_diffusion_level = excluded.id_nomenclature_diffusion_level
+            , id_nomenclature_life_stage = excluded.id_nomenclature_life_stage
+            , id_nomenclature_sex = excluded.id_nomenclature_sex
+            , id_nomenclature_obj_count = excluded.id_nomenclature_obj_count
+            , id_nomenclature_type_count = excluded.id_nomenclature_type_count
+            , id_nomenclature_sensitivity = excluded.id_nomenclature_sensitivity
+            , id_nomenclature_observation_status = excluded.id_nomenclature_observation_status
+            , id_nomenclature_blurring = excluded.id_nomenclature_blurring
+            , id_nomenclature_source_status = excluded.id_nomenclature_source_status
+            , id_nomenclature_info_geo_type = excluded.id_nomenclature_info_geo_type
+            , id_nomenclature_behaviour = excluded.id_nomenclature_behaviour
+            , id_nomenclature_biogeo_status = excluded.id_nomenclature_biogeo_status
+            , reference_biblio = excluded.reference_biblio
+            , count_min = excluded.count_min
+            , count_max = excluded.count_max
+            , cd_nom = excluded.cd_nom
+            , cd_hab = excluded.cd_hab
+            , nom_cite = excluded.nom_cite
+            , meta_v_taxref = excluded.meta_v_taxref
+            , sample_number_proof = excluded.sample_number_proof
+            , digital_proof = excluded.digital_proof
+            , non_digital_proof = excluded.non_digital_proof
+            , altitude_min = excluded.altitude_min
+            , altitude_max = excluded.altitude_max
+            , depth_min = excluded.depth_min
+            , depth_max = excluded.depth_max
+            , place_name = excluded.place_name
+            , the_geom_4326 = excluded.the_geom_4326
+            , the_geom_point = excluded.the_geom_point
+            , the_geom_local = excluded.the_geom_local
+            , precision = excluded.precision
+            , id_area_attachment = excluded.id_area_attachment
+            , date_min = excluded.date_min
+            , date_max = excluded.date_max
+            , validator = excluded.validator
+            , validation_comment = excluded.validation_comment
+            , observers = excluded.observers
+            , determiner = excluded.determiner
+            , id_digitiser = excluded.id_digitiser
+            , id_nomenclature_determination_method = excluded.id_nomenclature_determination_method
+            , comment_context = excluded.comment_context
+            , comment_description = excluded.comment_description
+            , additional_data = excluded.additional_data
+            , meta_validation_date = excluded.meta_validation_date
+            , last_action = 'U'
+        WHERE
+            synthese.id_source = excluded.id_source;
+    GET DIAGNOSTICS the_count = ROW_COUNT;
+    RETURN the_count;
+END;
+$$;
+
+COMMENT ON FUNCTION gn2pg_import.fct_c_sync_data_to_geonature (INT , INT[] ,
+    VARCHAR) IS 'Set-based function to upsert datas from import to synthese, by import and/or data ids';
+
+
+-- STATEMENT-LEVEL TRIGGERS
+/*
+ Alternative to row triggers: each INSERT or UPDATE statement on metadata_json
+ and data_json (eg. a downloaded page) is processed in one pass from its
+ transition table. Created disabled, see fct_c_set_trigger_mode.
+ */
+CREATE OR REPLACE FUNCTION gn2pg_import.fct_tri_s_upsert_metadata_to_geonature ()
+    RETURNS TRIGGER
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    -- Acquisition frameworks first, as datasets reference them
+    PERFORM
+        gn2pg_import.fct_c_get_or_insert_af_from_af_jsondata (n.item , n.source)
+    FROM
+        new_rows n
+    WHERE
+        n.level = 'acquisition framework';
+    PERFORM
+	gn2pg_import.fct_c_get_or_insert_dataset_from_jsondata (n.item ,
+	    gn2pg_import.fct_get_af_id_from_uuid (cast(n.item #>> '{ca_uuid}' AS
+	    UUID)) , n.source)
+    FROM
+        new_rows n
+    WHERE
+        n.level = 'dataset';
+    RETURN NULL;
+END;
+$$;
+
+COMMENT ON FUNCTION gn2pg_import.fct_tri_s_upsert_metadata_to_geonature () IS 'Statement trigger function to upsert metadata from gn2pg_import.metadata_json';
+
+DROP TRIGGER IF EXISTS tri_s_upsert_metadata_to_geonature ON gn2pg_import.metadata_json;
+
+CREATE TRIGGER tri_s_upsert_metadata_to_geonature
+    AFTER INSERT ON gn2pg_import.metadata_json
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE gn2pg_import.fct_tri_s_upsert_metadata_to_geonature ();
+
+CREATE OR REPLACE FUNCTION gn2pg_import.fct_tri_s_upsert_data_to_geonature ()
+    RETURNS TRIGGER
+    LANGUAGE plpgsql
+    AS $$
+DECLARE
+    the_source VARCHAR;
+    the_ids INT[];
+BEGIN
+    FOR the_source ,
+    the_ids IN
+    SELECT
+        n.source
+        , array_agg(n.id_data)
+    FROM
+        new_rows n
+    WHERE
+        n.uuid IS NOT NULL
+    GROUP BY
+        n.source LOOP
+            PERFORM
+                gn2pg_import.fct_c_sync_data_to_geonature (_ids => the_ids , _source => the_source);
+        END LOOP;
+    RETURN NULL;
+END;
+$$;
+
+COMMENT ON FUNCTION gn2pg_import.fct_tri_s_upsert_data_to_geonature () IS 'Statement trigger function to upsert datas from import to synthese';
+
+-- A trigger with transition tables can only handle one event
+DROP TRIGGER IF EXISTS tri_s_insert_data_to_geonature ON gn2pg_import.data_json;
+
+CREATE TRIGGER tri_s_insert_data_to_geonature
+    AFTER INSERT ON gn2pg_import.data_json
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE gn2pg_import.fct_tri_s_upsert_data_to_geonature ();
+
+DROP TRIGGER IF EXISTS tri_s_update_data_to_geonature ON gn2pg_import.data_json;
+
+CREATE TRIGGER tri_s_update_data_to_geonature
+    AFTER UPDATE ON gn2pg_import.data_json
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE gn2pg_import.fct_tri_s_upsert_data_to_geonature ();
+
+CREATE OR REPLACE FUNCTION gn2pg_import.fct_tri_s_delete_data_from_geonature ()
+    RETURNS TRIGGER
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    DELETE FROM gn_synthese.synthese
+    USING (
+        SELECT
+            o.item #>> '{id_synthese}' AS entity_source_pk_value
+            , s.id_source
+        FROM
+            old_rows o
+            JOIN gn_synthese.t_sources s ON s.name_source = o.source
+        WHERE
+            o.type IN ('synthese_with_label' , 'synthese_with_cd_nomenclature' ,
+		'synthese_with_metadata')) deleted
+    WHERE (synthese.entity_source_pk_value , synthese.id_source) =
+	(deleted.entity_source_pk_value , deleted.id_source);
+    RETURN NULL;
+END;
+$$;
+
+COMMENT ON FUNCTION gn2pg_import.fct_tri_s_delete_data_from_geonature () IS 'Statement trigger function to delete datas';
+
+DROP TRIGGER IF EXISTS tri_s_delete_data_from_geonature ON gn2pg_import.data_json;
+
+CREATE TRIGGER tri_s_delete_data_from_geonature
+    AFTER DELETE ON gn2pg_import.data_json
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE gn2pg_import.fct_tri_s_delete_data_from_geonature ();
+
+-- SYNTHESE QUEUE
+/*
+ Alternative to triggers populating GeoNature during downloads: data_json
+ changes are only queued, and synthese is populated from queue in batches by
+ fct_c_drain_synthese_queue (eg. with "gn2pg_cli db --drain-queue"), in its own
+ transactions. Queue triggers are created disabled, see fct_c_set_trigger_mode.
+ */
+CREATE TABLE IF NOT EXISTS gn2pg_import.synthese_queue (
+    id BIGSERIAL PRIMARY KEY
+    , source VARCHAR NOT NULL
+    , id_data INTEGER NOT NULL
+    , op CHARACTER(1) NOT NULL
+    , entity_source_pk_value VARCHAR
+    , queue_ts TIMESTAMP NOT NULL DEFAULT now()
+    , type VARCHAR
+);
+
+ALTER TABLE gn2pg_import.synthese_queue
+    ADD COLUMN IF NOT EXISTS type VARCHAR;
+
+COMMENT ON TABLE gn2pg_import.synthese_queue IS 'Data changes (I: insert, U: update, D: delete) waiting to be propagated to synthese';
+
+CREATE OR REPLACE FUNCTION gn2pg_import.fct_tri_q_enqueue_data ()
+    RETURNS TRIGGER
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO gn2pg_import.synthese_queue (source , id_data , type , op ,
+	    entity_source_pk_value)
+        SELECT
+            o.source
+            , o.id_data
+            , o.type
+            , 'D'
+            , o.item #>> '{id_synthese}'
+        FROM
+            old_rows o
+        WHERE
+            o.type IN ('synthese_with_label' , 'synthese_with_cd_nomenclature' ,
+		'synthese_with_metadata');
+    ELSE
+        INSERT INTO gn2pg_import.synthese_queue (source , id_data , type , op)
+        SELECT
+            n.source
+            , n.id_data
+            , n.type
+            , left(TG_OP , 1)
+        FROM
+            new_rows n
+        WHERE
+            n.uuid IS NOT NULL;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+COMMENT ON FUNCTION gn2pg_import.fct_tri_q_enqueue_data () IS 'Statement trigger function to queue datas changes';
+
+DROP TRIGGER IF EXISTS tri_q_insert_data_to_queue ON gn2pg_import.data_json;
+
+CREATE TRIGGER tri_q_insert_data_to_queue
+    AFTER INSERT ON gn2pg_import.data_json
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE gn2pg_import.fct_tri_q_enqueue_data ();
+
+DROP TRIGGER IF EXISTS tri_q_update_data_to_queue ON gn2pg_import.data_json;
+
+CREATE TRIGGER tri_q_update_data_to_queue
+    AFTER UPDATE ON gn2pg_import.data_json
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE gn2pg_import.fct_tri_q_enqueue_data ();
+
+DROP TRIGGER IF EXISTS tri_q_delete_data_to_queue ON gn2pg_import.data_json;
+
+CREATE TRIGGER tri_q_delete_data_to_queue
+    AFTER DELETE ON gn2pg_import.data_json
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE PROCEDURE gn2pg_import.fct_tri_q_enqueue_data ();
+
+DROP FUNCTION IF EXISTS gn2pg_import.fct_c_drain_synthese_queue (_batch_size INT);
+
+CREATE OR REPLACE FUNCTION gn2pg_import.fct_c_drain_synthese_queue (_batch_size
+    INT DEFAULT 10000)
+    RETURNS INTEGER
+    LANGUAGE plpgsql
+    AS $$
+/*
+ Remove up to _batch_size changes from queue, skipping the ones locked by
+ other workers, and propagate them to synthese. Each queued data is synced to
+ its current state in data_json: upserted if it still exists, deleted from
+ synthese otherwise, so that workers may process changes in any order. Data are
+ matched by source, id and type, as data_json primary key.
+ Returns the number of processed changes, 0 when queue is empty.
+ */
+DECLARE
+    the_batch JSONB;
+    the_count INT;
+    the_source VARCHAR;
+    the_changes JSONB;
+BEGIN
+    WITH batch AS (
+        DELETE FROM gn2pg_import.synthese_queue
+        WHERE id IN (
+                SELECT
+                    id
+                FROM
+                    gn2pg_import.synthese_queue
+                ORDER BY
+                    id
+                LIMIT _batch_size
+                FOR UPDATE
+                    SKIP LOCKED)
+        RETURNING
+            source
+            , id_data
+            , type
+            , entity_source_pk_value)
+    , changes AS (
+        SELECT
+            b.source
+            , array_agg(DISTINCT b.id_data) FILTER (WHERE d.id_data IS NOT NULL) AS upserted
+            , array_agg(DISTINCT b.entity_source_pk_value) FILTER (WHERE d.id_data IS NULL
+                AND b.entity_source_pk_value IS NOT NULL) AS deleted
+            , count(*) AS nb
+        FROM
+            batch b
+            -- Changes queued without type (before it was queued) match any type
+            LEFT JOIN gn2pg_import.data_json d ON (d.source , d.id_data , d.type) =
+                (b.source , b.id_data , coalesce(b.type , d.type))
+        GROUP BY
+            b.source)
+    SELECT
+        jsonb_object_agg(c.source , jsonb_build_object('upserted' , c.upserted ,
+            'deleted' , c.deleted))
+        , coalesce(sum(c.nb) , 0)
+    FROM
+        changes c INTO the_batch ,
+        the_count;
+    FOR the_source ,
+    the_changes IN
+    SELECT
+        *
+    FROM
+        jsonb_each(coalesce(the_batch , '{}'::JSONB))
+        LOOP
+            IF jsonb_typeof(the_changes -> 'upserted') = 'array' THEN
+                PERFORM
+                    gn2pg_import.fct_c_sync_data_to_geonature (_ids => ARRAY (
+                            SELECT
+                                jsonb_array_elements_text(the_changes -> 'upserted')::INT) ,
+                            _source => the_source);
+            END IF;
+            IF jsonb_typeof(the_changes -> 'deleted') = 'array' THEN
+                DELETE FROM gn_synthese.synthese
+                USING gn_synthese.t_sources s
+                WHERE synthese.id_source = s.id_source
+                    AND s.name_source = the_source
+                    AND synthese.entity_source_pk_value IN (
+                        SELECT
+                            jsonb_array_elements_text(the_changes -> 'deleted'));
+            END IF;
+        END LOOP;
+    RETURN the_count;
+END;
+$$;
+
+COMMENT ON FUNCTION gn2pg_import.fct_c_drain_synthese_queue (INT) IS 'Propagate a batch of queued datas changes to synthese';
+
+DROP FUNCTION IF EXISTS gn2pg_import.fct_c_set_trigger_mode (_mode VARCHAR);
+
+CREATE OR REPLACE FUNCTION gn2pg_import.fct_c_set_trigger_mode (_mode VARCHAR)
+    RETURNS VOID
+    LANGUAGE plpgsql
+    AS $$
+/*
+ Choose which triggers populate GeoNature: 'row' (default, one trigger call per
+ stored row), 'statement' (one trigger call per statement, set-based), 'queue'
+ (data changes are queued, see fct_c_drain_synthese_queue) or 'none' (eg. to
+ use fct_c_sync_data_to_geonature after downloads).
+ */
+DECLARE
+    the_table VARCHAR;
+    the_trigger VARCHAR;
+    the_modes VARCHAR[];
+BEGIN
+    IF _mode NOT IN ('row' , 'statement' , 'queue' , 'none') THEN
+        RAISE EXCEPTION 'Unknown trigger mode %, expected row, statement, queue or none' , _mode;
+    END IF;
+    FOR the_table ,
+    the_trigger ,
+    the_modes IN
+    VALUES ('metadata_json' , 'tri_c_upsert_metadata_to_geonature' , ARRAY['row']) ,
+        ('data_json' , 'tri_c_upsert_data_to_geonature' , ARRAY['row']) ,
+        ('data_json' , 'tri_c_delete_data_from_geonature' , ARRAY['row']) ,
+        ('metadata_json' , 'tri_s_upsert_metadata_to_geonature' , ARRAY['statement' , 'queue']) ,
+        ('data_json' , 'tri_s_insert_data_to_geonature' , ARRAY['statement']) ,
+        ('data_json' , 'tri_s_update_data_to_geonature' , ARRAY['statement']) ,
+        ('data_json' , 'tri_s_delete_data_from_geonature' , ARRAY['statement']) ,
+        ('data_json' , 'tri_q_insert_data_to_queue' , ARRAY['queue']) ,
+        ('data_json' , 'tri_q_update_data_to_queue' , ARRAY['queue']) ,
+        ('data_json' , 'tri_q_delete_data_to_queue' , ARRAY['queue'])
+        LOOP
+            EXECUTE format('ALTER TABLE gn2pg_import.%I %s TRIGGER %I' , the_table , CASE WHEN
+                _mode = ANY (the_modes) THEN 'ENABLE' ELSE 'DISABLE' END , the_trigger);
+        END LOOP;
+END;
+$$;
+
+COMMENT ON FUNCTION gn2pg_import.fct_c_set_trigger_mode (VARCHAR) IS 'Choose row, statement, queue or no triggers to populate GeoNature';
+
+SELECT
+    gn2pg_import.fct_c_set_trigger_mode (mode)
+FROM
+    tmp_trigger_mode;
+
+DROP TABLE tmp_trigger_mode;
+
+
 COMMIT;
@@ -13,19 +13,29 @@ Properties
 
 import json
 import logging
+import math
+import os
+import socket
+import time
 from datetime import datetime
 from functools import partial
+from itertools import chain
 from multiprocessing import Queue
 from multiprocessing.pool import ThreadPool
-from threading import Thread
-from typing import Callable, List, Optional
+from queue import Full
+from queue import Queue as BoundedQueue
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from requests.exceptions import HTTPError, InvalidSchema, RetryError
+from sqlalchemy.exc import SQLAlchemyError
 from urllib3.exceptions import ResponseError
 
 from gn2pg import _, __version__
-from gn2pg.api import DataAPI, ExportModuleNotFoundError
+from gn2pg.api import APIException, DataAPI, ExportModuleNotFoundError, PageLengthController
+from gn2pg.async_api import AsyncDataAPI
 from gn2pg.check_conf import Gn2PgSourceConf
+from gn2pg.json_stream import batched
 from gn2pg.store_postgresql import StorePostgresql
 from gn2pg.utils import XferStatus
 
@@ -33,6 +43,9 @@ from gn2pg.utils import XferStatus
 
 logger = logging.getLogger(__name__)
 
+# Number of sub ranges of an id range whose stored and source data counts differ
+RECONCILE_SPLIT = 16
+
 
 class DownloadGnException(Exception):
     """An exception occurred while handling download or store."""
@@ -52,6 +65,8 @@ class DownloadGn:
         self._config = config
 
         self._api_instance = api_instance
+        # Asynchronous client sharing api_instance session, if enabled
+        self._async_api = AsyncDataAPI(api_instance) if config.http_client == "httpx" else None
         self._backend = backend
         max_retry = config.max_retry
         max_requests = config.max_requests
@@ -70,6 +85,12 @@ class DownloadGn:
         self.xfer_filters = {}
         self.xfer_status = XferStatus.init
         self.xfer_comment = None
+        # Full download page numbers, by page url
+        self._page_numbers: Dict[str, int] = {}
+        # Counters updated by several threads
+        self._counters_lock = Lock()
+        # Adaptive page length, with keyset pagination
+        self._page_length: Optional[PageLengthController] = None
 
         self._limits = {
             "max_retry": max_retry,
@@ -104,14 +125,15 @@ class DownloadGn:
     # ---------------
     # Generic methods
     # ---------------
-    def launch_threads(self, nb_threads: int, func: Callable, pages: list, store=True) -> None:
+    def launch_threads(self, nb_threads: int, func: Callable, pages: Iterable, store=True) -> None:
         """
-        Launch 1 + nb_threads threads to execute a function func on a list of pages
+        Launch 1 + nb_threads threads to execute a function func on a list of pages.
+        With "httpx" HTTP client, page urls are downloaded asynchronously instead.
 
         Args:
             nb_threads (int): number of threads to compute the function on the pages
             func (Callable): function that each thread will call
-            pages (list): list of pages
+            pages (Iterable): list of pages, or pages generator
             store (bool): if True, display Storing in logger
         """
 
@@ -148,55 +170,317 @@ class DownloadGn:
                 errors.append(e)
                 self.api_count_errors += 1
 
-        # The Queue enables the report thread to get the progress from other threads
-        self.queue: Queue = Queue()
+        # The Queue enables the report thread to get the progress from other threads.
+        # Update phases may run at the same time, each one with its own queue.
+        queue: Queue = Queue()
+        self.queue = queue
         errors: List[Exception] = []
 
         # Initialize and start the report thread
-        thread = Thread(target=report, args=[self.queue])
+        thread = Thread(target=report, args=[queue])
         thread.start()
 
-        # Start the worker threads
-        with ThreadPool(nb_threads) as thread:
-            thread.map(partial(func, queue=self.queue), pages)
-
-        self.queue.put(("DONE"))
+        try:
+            if self._async_api is not None and isinstance(pages, list):
+                # Download pages asynchronously, func only stores them
+                self._async_api.download_pages(
+                    pages,
+                    partial(func, queue=queue),
+                    nb_consumers=max(self._config.nb_store_threads, 1),
+                )
+            elif self._config.nb_store_threads > 0:
+                self.pipeline(
+                    nb_threads,
+                    self._config.nb_store_threads,
+                    partial(func, queue=queue),
+                    pages,
+                )
+            else:
+                # Start the worker threads
+                # imap consumes pages generators lazily
+                with ThreadPool(nb_threads) as thread:
+                    for _result in thread.imap(partial(func, queue=queue), pages):
+                        pass
+        finally:
+            queue.put(("DONE"))
         return errors
 
-    def download(self, page: str, queue: Queue) -> None:
+    def fetch(self, page: Union[str, dict]) -> dict:
+        """
+        Download a page, tagged with its url
+
+        Args:
+            page (Union[str, dict]): url to download, or already downloaded page
+
+        Returns:
+            dict: downloaded page
+        """
+        if isinstance(page, str):
+            return {**self._api_instance.get_page(page), "page_url": page}
+        return page
+
+    def pipeline(self, nb_fetchers: int, nb_stores: int, func: Callable, pages: Iterable) -> None:
+        """
+        Download pages with nb_fetchers threads into a bounded queue of queue_size pages,
+        consumed by nb_stores threads executing func on each downloaded page, so that
+        downloads go on while pages are stored. Downloads pause while the queue is full.
+
+        Args:
+            nb_fetchers (int): number of download threads
+            nb_stores (int): number of threads executing func on downloaded pages
+            func (Callable): function that each store thread will call
+            pages (Iterable): list of pages, or pages generator
+        """
+        pages_queue: BoundedQueue = BoundedQueue(maxsize=self._config.queue_size)
+        pages_iter = iter(pages)
+        pages_lock = Lock()
+        stop = Event()
+        errors: List[Exception] = []
+        busy = {"fetch": 0.0, "store": 0.0}
+        depth = {"sum": 0, "max": 0, "count": 0}
+        stats_lock = Lock()
+
+        def count(stage: str, duration: float) -> None:
+            with stats_lock:
+                busy[stage] += duration
+
+        def fetcher() -> None:
+            try:
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    with pages_lock:
+                        page = next(pages_iter, None)
+                    if page is None:
+                        break
+                    page = self.fetch(page)
+                    count("fetch", time.perf_counter() - start)
+                    while not stop.is_set():
+                        try:
+                            pages_queue.put(page, timeout=1)
+                            break
+                        except Full:
+                            continue
+            except Exception as e:  # pylint: disable=W0718
+                errors.append(e)
+                stop.set()
+
+        def storer() -> None:
+            while True:
+                page = pages_queue.get()
+                if page is None:
+                    break
+                if stop.is_set():
+                    continue
+                with stats_lock:
+                    size = pages_queue.qsize()
+                    depth["sum"] += size
+                    depth["max"] = max(depth["max"], size)
+                    depth["count"] += 1
+                logger.debug(_("Pages queue depth is %s/%s"), size, self._config.queue_size)
+                start = time.perf_counter()
+                try:
+                    func(page)
+                except Exception as e:  # pylint: disable=W0718
+                    errors.append(e)
+                    stop.set()
+                count("store", time.perf_counter() - start)
+
+        start = time.perf_counter()
+        fetchers = [Thread(target=fetcher, name=f"fetch-{i}") for i in range(nb_fetchers)]
+        storers = [Thread(target=storer, name=f"store-{i}") for i in range(nb_stores)]
+        for thread in fetchers + storers:
+            thread.start()
+        for thread in fetchers:
+            thread.join()
+        for _thread in storers:
+            pages_queue.put(None)
+        for thread in storers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        logger.info(
+            _(
+                "Pipeline of %s %s: fetch stage busy %.1f %% (%s threads), store stage busy "
+                "%.1f %% (%s threads), pages queue depth average %.1f, max %s/%s"
+            ),
+            self._config.name,
+            self._api_instance.controler,
+            busy["fetch"] / (elapsed * nb_fetchers) * 100 if elapsed else 0,
+            nb_fetchers,
+            busy["store"] / (elapsed * nb_stores) * 100 if elapsed else 0,
+            nb_stores,
+            depth["sum"] / depth["count"] if depth["count"] else 0,
+            depth["max"],
+            self._config.queue_size,
+        )
+        if errors:
+            raise errors[0]
+
+    def merge_pages(self, streams: List[Iterable[dict]]) -> Iterator[dict]:
+        """
+        Download each pages stream in its own thread, and generate pages as they are
+        downloaded. Downloads pause while queue_size pages wait to be consumed.
+
+        Args:
+            streams (List[Iterable[dict]]): pages generators
+
+        Returns:
+            Iterator[dict]: downloaded pages generator
+        """
+        pages_queue: BoundedQueue = BoundedQueue(maxsize=self._config.queue_size)
+        stop = Event()
+
+        def put(page: Union[None, dict, Exception]) -> None:
+            while not stop.is_set():
+                try:
+                    pages_queue.put(page, timeout=1)
+                    return
+                except Full:
+                    continue
+
+        def produce(stream: Iterable[dict]) -> None:
+            try:
+                for page in stream:
+                    put(page)
+                    if stop.is_set():
+                        return
+            except Exception as e:  # pylint: disable=W0718
+                put(e)
+            put(None)
+
+        # Daemon threads, not to wait for downloads if pages are no longer consumed
+        threads = [
+            Thread(target=produce, args=[stream], name=f"range-{i}", daemon=True)
+            for i, stream in enumerate(streams)
+        ]
+        for thread in threads:
+            thread.start()
+        running = len(threads)
+        try:
+            while running:
+                page = pages_queue.get()
+                if page is None:
+                    running -= 1
+                elif isinstance(page, Exception):
+                    raise page
+                else:
+                    yield page
+        finally:
+            stop.set()
+
+    def download(self, page: Union[str, dict], queue: Queue) -> None:
         """
         Download a page and store the progress in the provided queue
 
         Args:
-            page (str): url to download
+            page (Union[str, dict]): url to download, or already downloaded page
             queue (Queue): gather the progress
         """
+        if (self._config.stream_items or self._raw_load) and isinstance(page, str):
+            self.download_stream(page, queue)
+            return
         response = self.process_progress(page=page)
+        self.store_items(response["items"])
+        if self.xfer_type == "full":
+            last_key = (
+                max(item["id_synthese"] for item in response["items"])
+                if self._config.pagination == "keyset" and response["items"]
+                else None
+            )
+            self.checkpoint(page, response["len_items"], last_key)
+        queue.put(response)
 
+    @property
+    def _raw_load(self) -> bool:
+        """Return True if items are stored as JSON texts, without being decoded"""
+        return self.xfer_type == "full" and self._config.load_mode == "raw"
+
+    def download_stream(self, page: str, queue: Queue) -> None:
+        """
+        Download a page and store its items by batches of stream_batch_size items as they
+        are received, then store the progress in the provided queue. With "raw" load mode,
+        items are not decoded, and stored by pages unless stream_items is set.
+
+        Args:
+            page (str): url to download
+            queue (Queue): gather the progress
+        """
+        stream = self._api_instance.stream_page(page, raw=self._raw_load)
+        batch_size = (
+            self._config.stream_batch_size
+            if self._config.stream_items
+            else self._config.max_page_length
+        )
+        len_items = 0
+        for items in batched(stream, batch_size):
+            self.store_items(items)
+            len_items += len(items)
+        if self.xfer_type == "full":
+            self.checkpoint(page, len_items)
+        queue.put(
+            {
+                "items": [],
+                "len_items": len_items,
+                "total_len": stream.meta.get("total_filtered", stream.meta.get("total")),
+            }
+        )
+
+    def store_items(self, items: List[Union[str, dict]]) -> None:
+        """
+        Store items, and update import log counters
+
+        Args:
+            items (List[Union[str, dict]]): items to store, or their JSON texts
+        """
+        if self._raw_load:
+            store = self._backend.store_raw
+        elif self.xfer_type == "full" and self._config.load_mode == "copy":
+            store = self._backend.store_copy
+        else:
+            store = self._backend.store_data
         (
             _threated_items,
             self.data_count_upserts,
             self.data_count_errors,
             self.metadata_count_upserts,
             self.metadata_count_errors,
-        ) = self._backend.store_data(self._api_instance.controler, response["items"])
-        queue.put(response)
+        ) = store(self._api_instance.controler, items)
+
+    def checkpoint(
+        self, page: Union[str, dict], item_count: int, last_key: Optional[int] = None
+    ) -> None:
+        """
+        Record a stored full download page, to be skipped if download is resumed
+
+        Args:
+            page (Union[str, dict]): url of stored page, or stored page
+            item_count (int): number of stored items
+            last_key (Optional[int]): last id_synthese of keyset pagination page
+        """
+        if isinstance(page, str):
+            page_no = self._page_numbers.get(page)
+        else:
+            page_no = page.get("page_no", self._page_numbers.get(page.get("page_url")))
+        if page_no is None:
+            return
+        self._backend.checkpoint(page_no, item_count, last_key)
 
-    def delete(self, page: str, queue: Queue) -> None:
+    def delete(self, page: Union[str, dict], queue: Queue) -> None:
         """
         Delete (or not) data in DB from a page download
 
         Args:
-            page (str): url to download
+            page (Union[str, dict]): url to download, or already downloaded page
             queue (Queue): gather the progress
         """
         response = self.process_progress(page=page)
 
         if response.get("total_len") > 0:
-            self.data_count_delete += self._backend.delete_data(response.get("items"))
-            logger.info(
-                "%s data have been deleted from %s", str(self.data_count_delete), self._config.name
-            )
+            deleted = self._backend.delete_data(response.get("items"))
+            # Deletes may run in several threads, at the same time as upserts
+            with self._counters_lock:
+                self.data_count_delete += deleted
+                count_delete = self.data_count_delete
+            logger.info("%s data have been deleted from %s", str(count_delete), self._config.name)
             queue.put(response)
         else:
             logger.info(
@@ -205,17 +489,17 @@ class DownloadGn:
                 self._api_instance.controler,
             )
 
-    def process_progress(self, page: str) -> dict:
+    def process_progress(self, page: Union[str, dict]) -> dict:
         """
         Compute the progress of the task
 
         Args:
-            page (str): url to download
+            page (Union[str, dict]): url to download, or already downloaded page
 
         Returns:
             dict (dict): dict containing items, len_items, total_len
         """
-        resp = self._api_instance.get_page(page)
+        resp = self._api_instance.get_page(page) if isinstance(page, str) else page
         items = resp["items"]
         len_items = len(items)
         return {
@@ -224,8 +508,138 @@ class DownloadGn:
             "total_len": resp["total_filtered"] if "total_filtered" in resp else resp["total"],
         }
 
-    def store(self) -> None:
-        """Store data into Database"""
+    def data_pages(
+        self, params: dict, checkpoints: Optional[Dict[int, Optional[int]]] = None
+    ) -> Tuple[Optional[Iterable], int]:
+        """List data pages to download, according to pagination mode.
+
+        Pages already stored, according to checkpoints, are skipped. With keyset
+        pagination, download starts after the last key of first stored pages.
+
+        Args:
+            params (dict): Querystrings
+            checkpoints (Dict[int, Optional[int]], optional): Last key of stored pages,
+                by page number. Defaults to None.
+
+        Returns:
+            Tuple[Optional[Iterable], int]: page urls or pages generator, and total items count
+        """
+        checkpoints = checkpoints or {}
+        if self._config.pagination == "range":
+            return self.range_pages(params, checkpoints)
+        if self._config.pagination == "keyset":
+            # Pages are generated from previous page last key, so that only first
+            # consecutive stored pages can be skipped
+            start_page = 0
+            while start_page in checkpoints:
+                start_page += 1
+            start_key = checkpoints[start_page - 1] if start_page else None
+            if start_page:
+                logger.info(
+                    _("Skip %s stored pages of source %s, resume after %s %s"),
+                    start_page,
+                    self._config.name,
+                    "id_synthese",
+                    start_key,
+                )
+            if self._config.adaptive_page_length:
+                self._page_length = PageLengthController(self._config)
+            pages = (
+                {**page, "page_no": page_no}
+                for page_no, page in enumerate(
+                    self._api_instance.keyset_pages(
+                        kind="data",
+                        params=params,
+                        start_key=start_key,
+                        page_length=self._page_length,
+                    ),
+                    start=start_page,
+                )
+            )
+            first_page = next(pages, None)
+            if first_page is None:
+                return None, 0
+            return chain([first_page], pages), first_page["total_filtered"]
+        if self._config.adaptive_page_length:
+            logger.warning(
+                _(
+                    "Adaptive page length of source %s requires keyset or range pagination, "
+                    "ignored"
+                ),
+                self._config.name,
+            )
+        # A streamed page is not kept in memory, nor is the probe response
+        pages, total_filtered, _xfer_http_status = self._api_instance.page_list(
+            kind="data", params=params, keep_probe=not self._config.stream_items
+        )
+        if pages:
+            self._page_numbers = {page: page_no for page_no, page in enumerate(pages)}
+            if checkpoints:
+                if 0 in checkpoints:
+                    self._api_instance.pop_probe_page(pages[0])
+                pages = [page for page in pages if self._page_numbers[page] not in checkpoints]
+                logger.info(
+                    _("Skip %s stored pages of source %s, %s pages left"),
+                    len(self._page_numbers) - len(pages),
+                    self._config.name,
+                    len(pages),
+                )
+        return pages, total_filtered
+
+    def range_pages(
+        self, params: dict, checkpoints: Optional[Dict[int, Optional[int]]] = None
+    ) -> Tuple[Optional[Iterable], int]:
+        """List data pages to download by nb_threads disjoint id_synthese ranges, each range
+        being downloaded with keyset pagination by its own thread.
+
+        Args:
+            params (dict): Querystrings
+            checkpoints (Dict[int, Optional[int]], optional): Last key of stored pages,
+                by page number, not supported. Defaults to None.
+
+        Returns:
+            Tuple[Optional[Iterable], int]: pages generator, and total items count
+        """
+        if checkpoints:
+            logger.warning(
+                _("Range pagination of source %s can not be resumed, all pages are downloaded"),
+                self._config.name,
+            )
+        ranges, total_filtered = self._api_instance.key_ranges(
+            params, max(self._config.nb_threads, 1)
+        )
+        if total_filtered == 0:
+            return None, 0
+        logger.info(
+            _("Download %s items of source %s by %s ranges of id_synthese: %s"),
+            total_filtered,
+            self._config.name,
+            len(ranges),
+            ranges,
+        )
+        if self._config.adaptive_page_length:
+            self._page_length = PageLengthController(self._config)
+        streams = [
+            self._api_instance.keyset_pages(
+                kind="data",
+                params=params,
+                start_key=start_key,
+                end_key=end_key,
+                page_length=self._page_length,
+            )
+            for start_key, end_key in ranges
+        ]
+        # Pages report progress on the whole download
+        pages = ({**page, "total_filtered": total_filtered} for page in self.merge_pages(streams))
+        return pages, total_filtered
+
+    def store(self, resume: bool = False) -> None:
+        """Store data into Database
+
+        Args:
+            resume (bool): Resume last full download if it failed, skipping its
+                stored pages. Defaults to False.
+        """
         # Store start download TimeStamp to populate increment log  after download end.
 
         params = {"limit": self._config.max_page_length}
@@ -233,15 +647,25 @@ class DownloadGn:
         # logger.info(self._config._query_strings)
         params.update(self._config.query_strings)
         logger.info(_("QueryStrings %s"), params)
+        checkpoints = {}
+        if resume:
+            # Current import takes over stored pages, it becomes the one to resume
+            self.xfer_type = "full"
+            self.xfer_filters = (json.dumps(params, default=str),)
+            self._backend.import_log(
+                controler=self._api_instance.controler,
+                values={"xfer_type": self.xfer_type, "xfer_filters": self.xfer_filters},
+            )
+            checkpoints = self._backend.resume_checkpoints(
+                self._api_instance.controler, self.xfer_filters
+            )
         pages = None
         try:
-            pages, self.api_count_items, _xfer_http_status = self._api_instance.page_list(
-                kind="data", params=params
-            )
-        except (RetryError, ResponseError) as e:
+            pages, self.api_count_items = self.data_pages(params, checkpoints)
+        except (RetryError, ResponseError, APIException) as e:
             self.xfer_status = XferStatus.failed
             self.xfer_comment = str(e)
-            logger.critical("%s %s %s", e, e.response, dir(e))
+            logger.critical("%s %s %s", e, getattr(e, "response", None), dir(e))
             logger.error(_("Could not retrieve API data from source %s"), self._config.name)
             return
 
@@ -266,8 +690,7 @@ class DownloadGn:
                 self.xfer_status = XferStatus.success
                 # Log download timestamp to download.
 
-        except (RetryError, ResponseError) as e:
-            self.queue.put(("EXIT"))
+        except (RetryError, ResponseError, APIException) as e:
             self.xfer_status = XferStatus.failed
             self.xfer_comment = str(e)
             logger.error(
@@ -279,6 +702,152 @@ class DownloadGn:
 
         self.xfer_status = XferStatus.success
 
+    def store_distributed(self) -> None:
+        """Store data into Database, sharing the download with the other processes
+        downloading the same source in distributed mode.
+
+        The first process plans the download into work items of about work_item_pages
+        pages, as id_synthese ranges written to import_work table. Each process then
+        claims items one at a time by thread, keeping them leased by a heartbeat, and
+        downloads them with keyset pagination. Items whose lease expired, because their
+        worker stopped, are claimed again by other workers.
+        """
+        controler = self._api_instance.controler
+        params = {"limit": self._config.max_page_length}
+        params.update(self._config.query_strings)
+        logger.info(_("QueryStrings %s"), params)
+        filters = (json.dumps(params, default=str),)
+
+        def plan() -> List[Tuple[Optional[int], Optional[int]]]:
+            total_filtered = self._api_instance.count_range(params)[0]
+            item_length = self._config.max_page_length * self._config.work_item_pages
+            ranges, _total = self._api_instance.key_ranges(
+                params, max(math.ceil(total_filtered / item_length), 1)
+            )
+            return ranges
+
+        try:
+            plan_id = self._backend.join_work(controler, filters, plan)
+        except (RetryError, ResponseError, APIException) as e:
+            self.xfer_status = XferStatus.failed
+            self.xfer_comment = str(e)
+            logger.error(_("Could not retrieve API data from source %s"), self._config.name)
+            return
+        if plan_id is None:
+            self.xfer_status = XferStatus.failed
+            return
+        self.xfer_type = "worker"
+        self.xfer_status = XferStatus.import_data
+        self.xfer_filters = (*filters, json.dumps({"distributed_import_id": plan_id}))
+        self._backend.import_log(
+            controler=controler,
+            values={
+                "xfer_type": self.xfer_type,
+                "xfer_status": self.xfer_status,
+                "xfer_filters": self.xfer_filters,
+            },
+        )
+        if self._config.adaptive_page_length:
+            self._page_length = PageLengthController(self._config)
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        lease = self._config.work_lease
+        stop = Event()
+
+        def heartbeat() -> None:
+            while not stop.wait(lease / 3):
+                try:
+                    self._backend.renew_leases(worker, lease)
+                except SQLAlchemyError as e:
+                    logger.warning(_("Could not renew leases of worker %s: %s"), worker, e)
+
+        heartbeat_thread = Thread(target=heartbeat, name="heartbeat", daemon=True)
+        heartbeat_thread.start()
+        try:
+            with ThreadPool(max(self._config.nb_threads, 1)) as pool:
+                self.api_count_items = sum(
+                    pool.map(
+                        partial(self._work, params, plan_id, worker),
+                        range(max(self._config.nb_threads, 1)),
+                    )
+                )
+        except Exception as e:  # pylint: disable=W0718
+            # Any error stops this worker only, its items are claimed again by other ones
+            self.xfer_status = XferStatus.failed
+            self.xfer_comment = str(e)
+            logger.error(
+                _("A problem occured on DISTRIBUTED DOWNLOAD process for source %s : %s"),
+                self._config.name,
+                e,
+            )
+        else:
+            self.xfer_status = XferStatus.success
+        finally:
+            stop.set()
+            heartbeat_thread.join()
+            status = self._backend.close_work(plan_id)
+            if status is not None:
+                logger.info(
+                    _("Distributed download %s of source %s ended: %s"),
+                    plan_id,
+                    self._config.name,
+                    status,
+                )
+
+    def _work(self, params: dict, plan_id: int, worker: str, _thread: int) -> int:
+        """Download work items of a distributed download, until none is left to claim.
+
+        Args:
+            params (dict): Querystrings
+            plan_id (int): import_log id of the distributed download
+            worker (str): Worker name
+            _thread (int): Thread number
+
+        Returns:
+            int: number of downloaded items
+        """
+        total = 0
+        while True:
+            item = self._backend.claim_work(plan_id, worker, self._config.work_lease)
+            if item is None:
+                return total
+            if item.attempts > 1:
+                logger.info(
+                    _("Work item %s of source %s claimed again (attempt %s)"),
+                    item.id,
+                    self._config.name,
+                    item.attempts,
+                )
+            item_count = 0
+            try:
+                for page in self._api_instance.keyset_pages(
+                    kind="data",
+                    params=params,
+                    start_key=item.start_key,
+                    end_key=item.end_key,
+                    page_length=self._page_length,
+                ):
+                    self.store_items(page["items"])
+                    item_count += len(page["items"])
+            except Exception:
+                self._backend.end_work(item.id, worker)
+                raise
+            if not self._backend.end_work(item.id, worker, item_count):
+                logger.warning(
+                    _("Lease of work item %s of source %s expired, it was claimed again"),
+                    item.id,
+                    self._config.name,
+                )
+            logger.info(
+                _("Stores %d datas of work item %s (id_synthese ]%s, %s]) from %s %s"),
+                item_count,
+                item.id,
+                item.start_key,
+                item.end_key,
+                self._config.name,
+                self._api_instance.controler,
+            )
+            total += item_count
+
     def update(self, since: Optional[str] = None, actions: Optional[list] = None) -> None:
         """[summary]
 
@@ -319,11 +888,34 @@ class DownloadGn:
             since,
         )
 
-        # Process UPDATE
-        try:
-            upsert_pages, self.api_count_items, _xfer_http_status = self._api_instance.page_list(
-                kind="data", params=params
+        if self._config.parallel_delete:
+            # Deleted data are downloaded and deleted while new or modified data are
+            # stored. Data deleted from source after its page was downloaded may be stored
+            # again, it is deleted by next update, which gets deletions since this one start.
+            deleted: List[bool] = []
+            delete_thread = Thread(
+                target=lambda: deleted.append(self._update_deletes(since, parallel=True)),
+                name="delete",
             )
+            delete_thread.start()
+            upserted = self._update_upserts(params)
+            delete_thread.join()
+            success = upserted and deleted == [True]
+        else:
+            success = self._update_upserts(params) and self._update_deletes(since)
+        self.xfer_status = XferStatus.success if success else XferStatus.failed
+
+    def _update_upserts(self, params: dict) -> bool:
+        """Store new or modified data of update
+
+        Args:
+            params (dict): Querystrings
+
+        Returns:
+            bool: False if update failed
+        """
+        try:
+            upsert_pages, self.api_count_items = self.data_pages(params)
             self.xfer_type = "update"
             self.xfer_status = XferStatus.import_data
             self.xfer_filters = (json.dumps(params, default=str),)
@@ -344,16 +936,26 @@ class DownloadGn:
                     pages=upsert_pages,
                 )
 
-        except (RetryError, ResponseError) as e:
-            self.queue.put(("EXIT"))
+        except (RetryError, ResponseError, APIException) as e:
             logger.critical("%s %s %s %s", dir(e), type(e), e.args, str(e))
             self.xfer_status = XferStatus.failed
             self.xfer_comment = str(e)
             logger.error(
                 _("A problem occured on UPDATE process for source %s : %s"), self._config.name, e
             )
-            return
-        # Process DELETE
+            return False
+        return True
+
+    def _update_deletes(self, since: str, parallel: bool = False) -> bool:
+        """Delete data deleted from source since last update
+
+        Args:
+            since (str): DateTime limit to update.
+            parallel (bool): Data are stored at the same time. Defaults to False.
+
+        Returns:
+            bool: False if update failed
+        """
         logger.info(
             _("Getting deleted data from source %s since %s"),
             self._config.name,
@@ -370,49 +972,203 @@ class DownloadGn:
                 pagination_param="page",
             )
             # input(f"DELETE INPUT {self._config.name}")
-            self.xfer_status = XferStatus.delete
-            self._backend.import_log(
-                controler=self._api_instance.controler,
-                values={
-                    "xfer_status": self.xfer_status,
-                },
-            )
+            if not parallel:
+                self.xfer_status = XferStatus.delete
+                self._backend.import_log(
+                    controler=self._api_instance.controler,
+                    values={
+                        "xfer_status": self.xfer_status,
+                    },
+                )
             if deleted_pages:
                 self.launch_threads(
                     nb_threads=self._config.nb_threads,
                     func=self.delete,
-                    pages=deleted_pages,
+                    # A pages generator is downloaded by threads, asynchronous client
+                    # being used by data pages at the same time
+                    pages=iter(deleted_pages) if parallel else deleted_pages,
                     store=False,
                 )
 
-        except (RetryError, ResponseError) as e:
-            self.queue.put(("EXIT"))
+        except (RetryError, ResponseError, APIException) as e:
             self.xfer_status = XferStatus.failed
             self.xfer_comment = str(e)
             logger.error(
                 "A problem occured on DELETE process for source %s : %s", self._config.name, e
             )
-            return
-
-        self.xfer_status = XferStatus.success
-
-    def exit(self):
-        """Final log on exit"""
+            return False
+        return True
+
+    def reconcile(self) -> None:
+        """Reconcile stored data with source, to repair data missed by updates.
+
+        Stored data and source data counts, lowest and highest ids are compared by
+        id_synthese ranges of about reconcile_range_size data. Ranges which differ are split
+        into RECONCILE_SPLIT ranges, down to ranges of at most max_page_length source data,
+        which are downloaded: their data are stored and their stored data missing from
+        source are deleted. Data whose id is greater than the highest stored one are then
+        downloaded. Additions and deletions compensating each other between the lowest and
+        highest ids of a range, and modified data, are not detected: next updates keep on
+        starting from last update.
+        """
+        controler = self._api_instance.controler
+        params = {**self._config.query_strings}
+        logger.info(_("Reconcile stored data with source %s"), self._config.name)
+        self.xfer_type = "reconcile"
+        self.xfer_status = XferStatus.import_data
+        self.xfer_filters = (json.dumps(params, default=str),)
         self._backend.import_log(
-            controler=self._api_instance.controler,
+            controler=controler,
             values={
-                "xfer_end_ts": datetime.now(),
-                "api_count_items": self.api_count_items,
-                "api_count_errors": self.api_count_errors,
-                "data_count_upserts": self.data_count_upserts,
-                "data_count_delete": self.data_count_delete,
-                "data_count_errors": self.data_count_errors,
-                "metadata_count_upserts": self.metadata_count_upserts,
-                "metadata_count_errors": self.metadata_count_errors,
+                "xfer_type": self.xfer_type,
                 "xfer_status": self.xfer_status,
-                "comment": self.xfer_comment,
+                "xfer_filters": self.xfer_filters,
             },
         )
+        try:
+            low_key, high_key = self._backend.data_id_bounds(controler)
+            self.api_count_items, first_key, _last_key = self._api_instance.count_range(params)
+            if high_key is not None:
+                start_key = low_key - 1 if first_key is None else min(low_key, first_key) - 1
+                # Small ranges, so that additions and deletions of a range rarely
+                # compensate each other
+                nb_ranges = min(
+                    high_key - start_key,
+                    math.ceil(self.api_count_items / self._config.reconcile_range_size),
+                )
+                bounds = [
+                    start_key + (high_key - start_key) * part // max(nb_ranges, 1)
+                    for part in range(max(nb_ranges, 1) + 1)
+                ]
+                ranges = list(zip(bounds[:-1], bounds[1:]))
+                stats = {"ranges": 0, "downloaded": 0}
+                with ThreadPool(max(self._config.nb_threads, 1)) as pool:
+                    while ranges:
+                        stats["ranges"] += len(ranges)
+                        ranges = [
+                            sub_range
+                            for sub_ranges in pool.imap_unordered(
+                                partial(self._reconcile_range, params, stats=stats), ranges
+                            )
+                            for sub_range in sub_ranges
+                        ]
+                logger.info(
+                    _(
+                        "%s id ranges of source %s compared, %s data downloaded, "
+                        "%s data deleted"
+                    ),
+                    stats["ranges"],
+                    self._config.name,
+                    stats["downloaded"],
+                    self.data_count_delete,
+                )
+            # Data above highest stored id are new ones
+            pages = self._api_instance.keyset_pages(
+                kind="data",
+                params={**params, "limit": self._config.max_page_length},
+                start_key=high_key,
+            )
+            self.launch_threads(self._config.nb_threads, self.download, pages)
+        except (RetryError, ResponseError, APIException) as e:
+            self.xfer_status = XferStatus.failed
+            self.xfer_comment = str(e)
+            logger.error(
+                _("A problem occured on RECONCILE process for source %s : %s"),
+                self._config.name,
+                e,
+            )
+            return
+        self.xfer_status = XferStatus.success
+
+    def _reconcile_range(
+        self, params: dict, id_range: Tuple[int, int], stats: dict
+    ) -> List[Tuple[int, int]]:
+        """Compare stored and source data counts, lowest and highest ids of an id range, and
+        repair it if it is small enough.
+
+        Args:
+            params (dict): Querystrings
+            id_range (Tuple[int, int]): exclusive lower id and inclusive upper id
+            stats (dict): reconciliation counters
+
+        Returns:
+            List[Tuple[int, int]]: sub ranges to compare
+        """
+        start_key, end_key = id_range
+        controler = self._api_instance.controler
+        stored = self._backend.count_data(controler, start_key, end_key)
+        source = self._api_instance.count_range(params, start_key, end_key)
+        # Same count, lowest and highest ids
+        if stored == source:
+            return []
+        stored, source = stored[0], source[0]
+        if source > self._config.max_page_length and end_key - start_key > RECONCILE_SPLIT:
+            bounds = [
+                start_key + (end_key - start_key) * part // RECONCILE_SPLIT
+                for part in range(RECONCILE_SPLIT + 1)
+            ]
+            return list(zip(bounds[:-1], bounds[1:]))
+        logger.debug(
+            _("Repair id range ]%s, %s] of source %s: %s stored data, %s source data"),
+            start_key,
+            end_key,
+            self._config.name,
+            stored,
+            source,
+        )
+        source_ids = set()
+        if source:
+            for page in self._api_instance.keyset_pages(
+                kind="data",
+                params={**params, "limit": self._config.max_page_length},
+                start_key=start_key,
+                end_key=end_key,
+            ):
+                self.store_items(page["items"])
+                source_ids.update(item["id_synthese"] for item in page["items"])
+        deleted = [
+            {"id_synthese": id_data}
+            for id_data in self._backend.data_ids(controler, start_key, end_key)
+            if id_data not in source_ids
+        ]
+        with self._counters_lock:
+            stats["downloaded"] += len(source_ids)
+            if deleted:
+                self.data_count_delete += self._backend.delete_data(deleted)
+        return []
+
+    def exit(self):
+        """Final log on exit"""
+        values = {
+            "xfer_end_ts": datetime.now(),
+            "api_count_items": self.api_count_items,
+            "api_count_errors": self.api_count_errors,
+            "data_count_upserts": self.data_count_upserts,
+            "data_count_delete": self.data_count_delete,
+            "data_count_errors": self.data_count_errors,
+            "data_count_skipped": self._backend.count_data_skipped,
+            "metadata_count_upserts": self.metadata_count_upserts,
+            "metadata_count_errors": self.metadata_count_errors,
+            "xfer_status": self.xfer_status,
+            "comment": self.xfer_comment,
+        }
+        # Page lengths and concurrency used are logged after filters
+        tuning = {}
+        if self._page_length is not None:
+            tuning["page_length"] = self._page_length.summary()
+            logger.info(
+                _("Page lengths of source %s: %s"), self._config.name, tuning["page_length"]
+            )
+        if self._api_instance.concurrency is not None:
+            tuning["concurrency"] = self._api_instance.concurrency.summary()
+            logger.info(
+                _("Concurrent requests of source %s: %s"),
+                self._config.name,
+                tuning["concurrency"],
+            )
+        if tuning:
+            values["xfer_filters"] = (*self.xfer_filters, json.dumps(tuning))
+        self._backend.import_log(controler=self._api_instance.controler, values=values)
 
 
 class Data(DownloadGn):
@@ -426,5 +1182,5 @@ class Data(DownloadGn):
     def __init__(self, config, backend):
         try:
             super().__init__(config, DataAPI(config), backend)
-        except (HTTPError, ExportModuleNotFoundError, InvalidSchema) as e:
+        except (HTTPError, ExportModuleNotFoundError, InvalidSchema, APIException) as e:
             logger.critical(e)
@@ -8,10 +8,14 @@ import os
 import shutil
 import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from os import listdir
 from os.path import isfile, join
 from pathlib import Path
-from typing import Optional
+from typing import Callable, List, Optional, Tuple
 
 from requests.exceptions import InvalidSchema
 
@@ -71,7 +75,119 @@ def init(file: str) -> None:
     sys.exit(0)
 
 
-def full_download_1source(ctrl, cfg):
+class WorkerBudget:
+    """Global budget of HTTP and database workers, shared by sources downloaded at the
+    same time. A source waits until enough workers are available to start."""
+
+    def __init__(self, max_workers: int) -> None:
+        self._max_workers = max_workers
+        self._available = max_workers
+        self._cond = threading.Condition()
+
+    def acquire(self, workers: int) -> int:
+        """Wait for and take workers from budget, no more than the whole budget
+
+        Args:
+            workers (int): Number of workers needed
+
+        Returns:
+            int: Number of workers taken, to be released
+        """
+        workers = min(workers, self._max_workers)
+        with self._cond:
+            self._cond.wait_for(lambda: self._available >= workers)
+            self._available -= workers
+        return workers
+
+    def release(self, workers: int) -> None:
+        """Give back workers to budget
+
+        Args:
+            workers (int): Number of workers taken
+        """
+        with self._cond:
+            self._available += workers
+            self._cond.notify_all()
+
+
+def source_workers(cfg) -> int:
+    """Return the number of concurrent HTTP or database workers used by a source download
+
+    Args:
+        cfg (Gn2PgSourceConf): Source configuration
+
+    Returns:
+        int: Number of workers
+    """
+    workers = cfg.max_in_flight if cfg.http_client == "httpx" else cfg.nb_threads
+    return workers + cfg.nb_store_threads
+
+
+def run_sources(job: Callable, ctrl, cfg_source_list: dict, action: str) -> None:
+    """Run job on each enabled source, nb_sources sources at the same time, within
+    max_workers workers, and log a summary of each source duration.
+
+    Args:
+        job (Callable): Function to run on each source, eg. full_download_1source
+        ctrl ([type]): Controler class
+        cfg_source_list (dict): Sources configurations, by source name
+        action (str): Action name, for logging
+    """
+    sources = []
+    for source, cfg in cfg_source_list.items():
+        if cfg.enable:
+            sources.append((source, cfg))
+        else:
+            logger.info(_("Source %s is disabled"), source)
+    if not sources:
+        return
+    tuning = sources[0][1]
+    budget = WorkerBudget(tuning.max_workers) if tuning.max_workers > 0 else None
+    summary: List[Tuple[str, str, float]] = []
+
+    def run(source: str, cfg) -> None:
+        workers = budget.acquire(source_workers(cfg)) if budget else 0
+        if budget and workers < source_workers(cfg):
+            logger.warning(
+                _("Source %s needs %s workers, more than max_workers, limited to %s"),
+                source,
+                source_workers(cfg),
+                workers,
+            )
+            cfg = cfg.limit_workers(workers)
+        start = time.perf_counter()
+        status = "done"
+        try:
+            logger.info(_("Starting %s for source %s"), action, source)
+            job(ctrl, cfg)
+            logger.info(_("Ending %s for source %s"), action, source)
+        except Exception:  # pylint: disable=broad-exception-caught
+            status = "failed"
+            logger.exception(_("%s failed for source %s"), action, source)
+        finally:
+            if budget:
+                budget.release(workers)
+            summary.append((source, status, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    nb_sources = min(tuning.nb_sources, len(sources))
+    with ThreadPoolExecutor(max_workers=nb_sources, thread_name_prefix="source") as executor:
+        for source, cfg in sources:
+            executor.submit(run, source, cfg)
+    elapsed = time.perf_counter() - start
+
+    logger.info(
+        _("%s of %s source(s) ended in %.1f s (%s at a time):"),
+        action,
+        len(sources),
+        elapsed,
+        nb_sources,
+    )
+    for source, status, duration in sorted(summary, key=lambda s: s[2], reverse=True):
+        logger.info(_("  %s: %s in %.1f s"), source, status, duration)
+
+
+def full_download_1source(ctrl, cfg, resume=False, distributed=False):
     """Downloads from a single controler."""
 
     logger.debug(cfg)
@@ -84,7 +200,10 @@ def full_download_1source(ctrl, cfg):
                 cfg.source,
                 downloader.name,
             )
-            downloader.store()
+            if distributed:
+                downloader.store_distributed()
+            else:
+                downloader.store(resume=resume)
             logger.info(
                 _("%s => Ending download using controler %s"),
                 cfg.source,
@@ -98,19 +217,45 @@ def full_download_1source(ctrl, cfg):
             return
 
 
-def full_download(cfg_ctrl):
+def full_download(cfg_ctrl, resume=False, distributed=False):
     """Performs a full download of all sites and controlers,
-    based on configuration file."""
+    based on configuration file. If resume, last failed full download of each
+    source is resumed, skipping its stored pages. If distributed, downloads are
+    shared with other processes through the database."""
 
     logger.info(cfg_ctrl)
     cfg_source_list = cfg_ctrl.source_list
     logger.info(_("Defining full download jobs"))
-    for source, cfg in cfg_source_list.items():
-        if cfg.enable:
-            logger.info(_("Starting full download for source %s"), source)
-            full_download_1source(Data, cfg)
-        else:
-            logger.info(_("Source %s is disabled"), source)
+    run_sources(
+        partial(full_download_1source, resume=resume, distributed=distributed),
+        Data,
+        cfg_source_list,
+        _("Resume full download") if resume else _("Full download"),
+    )
+
+
+def reconcile_1source(ctrl, cfg):
+    """Reconciles stored data of a single controler with its source."""
+    with StorePostgresql(cfg) as store_pg:
+        try:
+            downloader = ctrl(cfg, store_pg)
+            logger.debug(_("%s => Starting reconciliation (%s)"), cfg.source, downloader.name)
+            downloader.reconcile()
+            logger.info(_("%s => Ending reconciliation (%s)"), cfg.name, downloader.name)
+            downloader.exit()
+        except AttributeError as e:
+            logger.critical(
+                _("An error occured when trying to download data from %s: %s"), cfg.name, e
+            )
+            return
+
+
+def reconcile(cfg_ctrl):
+    """Reconciles stored data of all sources with their source, based on configuration
+    file, by comparing data counts of id ranges."""
+    cfg_source_list = cfg_ctrl.source_list
+    logger.info(_("Defining reconcile jobs"))
+    run_sources(reconcile_1source, Data, cfg_source_list, _("Reconcile"))
 
 
 def update_1source(ctrl, cfg):
@@ -152,15 +297,8 @@ def update(cfg_ctrl):
     """
     logger.info(cfg_ctrl)
     cfg_source_list = cfg_ctrl.source_list
-    logger.info(_("Defining full download jobs"))
-    for source, cfg in cfg_source_list.items():
-        if cfg.enable:
-            logger.info(_("Starting update for source %s"), source)
-            update_1source(Data, cfg)
-            logger.info(_("Ending update for source %s"), source)
-
-        else:
-            logger.info(_("Source %s is disabled"), source)
+    logger.info(_("Defining update jobs"))
+    run_sources(update_1source, Data, cfg_source_list, _("Update"))
 
 
 def edit_config(file_path: str) -> None:
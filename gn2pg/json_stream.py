@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Incremental parsing of API pages, to iterate over page items as they are received
+instead of decoding the whole page at once."""
+
+import codecs
+import json
+import re
+from itertools import islice
+from typing import Any, Iterable, Iterator, List
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class ItemsStream:
+    """Iterate over items of a JSON object page read from bytes chunks.
+
+    Only one item is decoded at a time. Other members of the page object (eg.
+    "total_filtered" or "limit") are decoded into meta, which is complete once
+    iteration ends.
+
+    If raw, items are yielded as their JSON text instead of decoded values.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], key: str = "items", raw: bool = False) -> None:
+        self._chunks = iter(chunks)
+        self._key = key
+        self._raw = raw
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self.meta: dict = {}
+
+    def _fill(self) -> bool:
+        """Read next chunk into buffer, dropping already parsed text
+
+        Returns:
+            bool: False if there is no more chunk
+        """
+        if self._eof:
+            return False
+        chunk = next(self._chunks, None)
+        self._buffer = self._buffer[self._pos :]
+        self._pos = 0
+        if chunk is None:
+            self._eof = True
+            self._buffer += self._text.decode(b"", final=True)
+            return False
+        self._buffer += self._text.decode(chunk)
+        return True
+
+    def _error(self, msg: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(msg, self._buffer, self._pos)
+
+    def _peek(self) -> str:
+        """Skip whitespaces and return next character, without consuming it"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise self._error("Unexpected end of JSON stream")
+
+    def _expect(self, chars: str) -> str:
+        """Consume next character, which must be one of chars"""
+        char = self._peek()
+        if char not in chars:
+            raise self._error(f"Expecting one of {chars!r}")
+        self._pos += 1
+        return char
+
+    def _value(self, raw: bool = False) -> Any:
+        """Decode next JSON value, reading chunks until it is complete
+
+        Args:
+            raw (bool, optional): return value JSON text instead. Defaults to False.
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A number may go on in next chunk
+                if end < len(self._buffer) or self._eof:
+                    break
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            if not self._fill():
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                break
+        # Value text is found by the C decoder, faster than any python scan
+        if raw:
+            value = self._buffer[self._pos : end]
+        self._pos = end
+        return value
+
+    def __iter__(self) -> Iterator[Any]:
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self._value()
+            self._expect(":")
+            if key == self._key:
+                self._expect("[")
+                if self._peek() == "]":
+                    self._pos += 1
+                else:
+                    while True:
+                        yield self._value(raw=self._raw)
+                        if self._expect(",]") == "]":
+                            break
+            else:
+                self.meta[key] = self._value()
+            if self._expect(",}") == "}":
+                return
+
+
+def batched(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Split iterable into lists of at most size elements
+
+    Args:
+        iterable (Iterable[Any]): elements
+        size (int): batch size
+
+    Returns:
+        Iterator[List[Any]]: batches generator
+    """
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -14,7 +14,7 @@ from toml import TomlDecodeError
 from gn2pg import _, __project__, __version__, pkg_metadata
 from gn2pg.check_conf import Gn2PgConf
 from gn2pg.env import CONFDIR
-from gn2pg.helpers import full_download, init, manage_configs, update
+from gn2pg.helpers import full_download, init, manage_configs, reconcile, update
 from gn2pg.logger import setup_logging
 from gn2pg.store_postgresql import PostgresqlUtils
 from gn2pg.utils import BColors
@@ -108,6 +108,43 @@ def arguments(args):
         help=_("Create or recreate json tables"),
         action="store_true",
     )
+    db_group.add_argument(
+        "--sync-synthese",
+        help=_(
+            """Upsert sources data into GeoNature synthese with set-based sync function
+        from "to_gnsynthese" script, eg. when its per-row data trigger is disabled"""
+        ),
+        action="store_true",
+    )
+    db_group.add_argument(
+        "--drain-queue",
+        help=_(
+            """Propagate data changes queued by "to_gnsynthese" script queue triggers
+        to GeoNature synthese"""
+        ),
+        action="store_true",
+    )
+    db_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=10000,
+        help=_("With --drain-queue, number of changes propagated per transaction"),
+    )
+    db_parser.add_argument(
+        "--drain-interval",
+        type=int,
+        default=None,
+        help=_(
+            "With --drain-queue, keep waiting for new changes, polling queue every "
+            "DRAIN_INTERVAL seconds"
+        ),
+    )
+    db_parser.add_argument(
+        "--import-id",
+        type=int,
+        default=None,
+        help=_("With --sync-synthese, only sync data from this import (see import_log)"),
+    )
 
     # Download commands
     download_group = download_parser.add_mutually_exclusive_group(required=True)
@@ -118,11 +155,33 @@ def arguments(args):
         help=_("Perform an incremental download"),
         action="store_true",
     )
+    download_group.add_argument(
+        "--resume",
+        help=_("Resume last failed full download, skipping already stored pages"),
+        action="store_true",
+    )
+    download_group.add_argument(
+        "--reconcile",
+        help=_("Repair stored data missed by updates, comparing data counts by id ranges"),
+        action="store_true",
+    )
+
+    download_parser.add_argument(
+        "--distributed",
+        help=_(
+            "With --full, share downloads with all processes started with --distributed, "
+            "on this host or others, coordinated by the database"
+        ),
+        action="store_true",
+    )
 
     for p in (db_parser, download_parser):
         p.add_argument("file", nargs="?", help="Configuration file name")
 
-    return parser.parse_args(args)
+    parsed = parser.parse_args(args)
+    if getattr(parsed, "distributed", False) and not parsed.full:
+        download_parser.error(_("--distributed is only allowed with --full"))
+    return parsed
 
 
 def main(args) -> None:
@@ -194,12 +253,20 @@ def handle_download_commands(args, cfg_ctrl) -> bool:
 
     if args.full:
         logger.info(_("Perform full action"))
-        full_download(cfg_ctrl)
+        full_download(cfg_ctrl, distributed=args.distributed)
 
     if args.update:
         logger.info(_("Perform update action"))
         update(cfg_ctrl)
 
+    if args.resume:
+        logger.info(_("Perform resume action"))
+        full_download(cfg_ctrl, resume=True)
+
+    if args.reconcile:
+        logger.info(_("Perform reconcile action"))
+        reconcile(cfg_ctrl)
+
     return True
 
 
@@ -222,6 +289,12 @@ def handle_database_commands(args, cfg_ctrl) -> None:
     if args.custom_script:
         logger.info(_("Execute custom script %s on db"), args.custom_script)
         manage_pg.custom_script(args.custom_script)
+    if args.sync_synthese:
+        for source_cfg in cfg_source_list.values():
+            if source_cfg.enable:
+                PostgresqlUtils(source_cfg).sync_synthese(args.import_id)
+    if args.drain_queue:
+        manage_pg.drain_synthese_queue(args.batch_size, args.drain_interval)
 
 
 def handle_config_commands(args) -> None:
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""On-disk cache of GeoNature sessions, so that short runs reuse the session cookies
+and EXPORTS module path of a previous run instead of logging in again.
+
+Cache files hold session cookies: they are only readable by their owner.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from gn2pg import _
+from gn2pg.env import CONFDIR
+
+logger = logging.getLogger(__name__)
+
+SESSION_DIR = CONFDIR / "session"
+"""Session cache directory (subdir of CONFDIR)"""
+
+
+def parse_expiry(value: Any) -> Optional[float]:
+    """Parse a GeoNature login "expires" value into a timestamp
+
+    Args:
+        value (Any): ISO 8601 date, naive dates being local ones
+
+    Returns:
+        Optional[float]: timestamp, or None if value is missing or invalid
+    """
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+class SessionCache:
+    """Session cache of one user on one GeoNature instance"""
+
+    # Sessions expiring sooner, in seconds, are not reused
+    EXPIRY_MARGIN = 60
+
+    def __init__(self, url: str, user_name: str, directory: Path = SESSION_DIR) -> None:
+        key = hashlib.sha256(f"{url}\n{user_name}".encode("utf-8")).hexdigest()
+        self._directory = directory
+        self._path = directory / f"{key}.json"
+
+    @property
+    def path(self) -> Path:
+        """Return the cache file path"""
+        return self._path
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Read cached session, if any and not expired
+
+        Returns:
+            Optional[Dict[str, Any]]: cookies, expires and export_api_path, or None
+        """
+        try:
+            session = json.loads(self._path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as error:
+            logger.warning(_("Session cache %s is unreadable: %s"), self._path, error)
+            return None
+        expires = session.get("expires")
+        if expires is not None and expires < time.time() + self.EXPIRY_MARGIN:
+            logger.debug(_("Cached session %s has expired"), self._path)
+            return None
+        return session
+
+    def save(
+        self, cookies: Dict[str, str], expires: Optional[float], export_api_path: Optional[str]
+    ) -> None:
+        """Write session to cache, readable by its owner only
+
+        Args:
+            cookies (Dict[str, str]): session cookies
+            expires (Optional[float]): session expiry timestamp, None if unknown
+            export_api_path (Optional[str]): EXPORTS module path
+        """
+        session = {"cookies": cookies, "expires": expires, "export_api_path": export_api_path}
+        tmp_path = self._path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            self._directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+            descriptor = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(descriptor, "w", encoding="utf-8") as cache_file:
+                json.dump(session, cache_file)
+            os.replace(tmp_path, self._path)
+        except OSError as error:
+            logger.warning(_("Session cache %s could not be written: %s"), self._path, error)
+
+    def clear(self) -> None:
+        """Remove cached session"""
+        try:
+            self._path.unlink()
+        except FileNotFoundError:
+            pass
@@ -1,17 +1,23 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 """Methods to store data to Postgresql database."""
+import csv
 import importlib.resources
+import io
 import logging
 import sys
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 import psycopg2.errors
 import sqlalchemy.engine.base
 from sqlalchemy import (
+    BigInteger,
     Column,
+    Computed,
     DateTime,
     ForeignKey,
     Integer,
@@ -21,24 +27,32 @@ from sqlalchemy import (
     Table,
     Text,
     UniqueConstraint,
+    any_,
+    cast,
     create_engine,
     exc,
     exists,
     func,
+    literal,
     select,
     text,
 )
-from sqlalchemy.dialects.postgresql import JSONB, UUID, insert
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID, insert
 from sqlalchemy.engine.url import URL
 from sqlalchemy.exc import IntegrityError, OperationalError, StatementError
-from sqlalchemy.sql import and_
+from sqlalchemy.sql import and_, or_
 
 from gn2pg import _, __version__
-from gn2pg.utils import XferStatus
+from gn2pg.codec import get_codec
+from gn2pg.utils import LruSet, WorkStatus, XferStatus, item_hash
 
 # from gn2pg.logger import logger
 logger = logging.getLogger(__name__)
 
+# Content hash of data_json and metadata_json items, generated by PostgreSQL from their
+# jsonb value, whatever the way they are loaded
+ITEM_HASH_SQL = "md5(item::text)"
+
 
 def db_url(config):
     """db connection settings"""
@@ -122,7 +136,13 @@ class PostgresqlUtils:
         if self._config.database.querystring:
             self._db_url["query"] = self._config.database.querystring
 
-        self._db = create_engine(URL.create(**self._db_url), echo=False)
+        self._codec = get_codec(self._config.json_codec)
+        self._db = create_engine(
+            URL.create(**self._db_url),
+            echo=False,
+            json_serializer=self._codec.dumps,
+            json_deserializer=self._codec.loads,
+        )
         self._db_schema = self._config.database.schema_import
         self._metadata = MetaData(schema=self._db_schema)
         try:
@@ -180,6 +200,7 @@ class PostgresqlUtils:
             Column("data_count_errors", Integer, nullable=False, server_default="0"),
             Column("metadata_count_upserts", Integer, nullable=False, server_default="0"),
             Column("metadata_count_errors", Integer, nullable=False, server_default="0"),
+            Column("data_count_skipped", Integer, nullable=False, server_default="0"),
             Column("xfer_filters", JSONB, server_default="{}"),
             Column("comment", Text, nullable=True, default=None),
         )
@@ -212,6 +233,7 @@ class PostgresqlUtils:
             Column("id_data", Integer, nullable=False, index=True),
             Column("uuid", UUID, index=True),
             Column("item", JSONB, nullable=False),
+            Column("item_hash", String(32), Computed(ITEM_HASH_SQL, persisted=True)),
             Column(
                 "update_ts",
                 DateTime,
@@ -237,6 +259,7 @@ class PostgresqlUtils:
             Column("level", String, nullable=False),
             Column("uuid", UUID, index=True),
             Column("item", JSONB, nullable=False),
+            Column("item_hash", String(32), Computed(ITEM_HASH_SQL, persisted=True)),
             Column(
                 "update_ts",
                 DateTime,
@@ -252,6 +275,72 @@ class PostgresqlUtils:
             UniqueConstraint("uuid", name="metadata_unique_uuid"),
         )
 
+    def _create_import_checkpoint(self) -> None:
+        """Create import_checkpoint table if it does not exist."""
+        self._create_table(
+            "import_checkpoint",
+            Column(
+                "import_id",
+                Integer,
+                ForeignKey("import_log.id", ondelete="CASCADE", onupdate="CASCADE"),
+                nullable=False,
+            ),
+            Column("page_no", Integer, nullable=False),
+            Column("last_key", BigInteger, nullable=True),
+            Column("item_count", Integer, nullable=False, server_default="0"),
+            Column("store_ts", DateTime, server_default=func.now(), nullable=False),
+            PrimaryKeyConstraint("import_id", "page_no", name="pk_import_checkpoint"),
+        )
+
+    def _create_import_work(self) -> None:
+        """Create import_work table if it does not exist."""
+        self._create_table(
+            "import_work",
+            Column("id", Integer, primary_key=True),
+            Column(
+                "import_id",
+                Integer,
+                ForeignKey("import_log.id", ondelete="CASCADE", onupdate="CASCADE"),
+                nullable=False,
+                index=True,
+            ),
+            Column("start_key", BigInteger, nullable=True),
+            Column("end_key", BigInteger, nullable=True),
+            Column("status", String, nullable=False, server_default=WorkStatus.pending),
+            Column("worker", String, nullable=True),
+            Column("lease_until", DateTime, nullable=True),
+            Column("attempts", Integer, nullable=False, server_default="0"),
+            Column("item_count", Integer, nullable=False, server_default="0"),
+            Column("done_ts", DateTime, nullable=True),
+        )
+
+    def _upgrade_tables(self, conn: Any) -> None:
+        """Add columns introduced by later versions to existing tables."""
+        schema = self._config.database.schema_import
+        queries = [
+            f"ALTER TABLE {schema}.import_log "
+            "ADD COLUMN IF NOT EXISTS data_count_skipped INTEGER NOT NULL DEFAULT 0",
+        ]
+        for table in ("data_json", "metadata_json"):
+            # item_hash column is generated since it is computed by PostgreSQL. Adding it
+            # rewrites the table, so that an existing column is never added again.
+            exists = conn.execute(
+                text(
+                    "SELECT 1 FROM information_schema.columns WHERE "
+                    "table_schema = :schema AND table_name = :table AND column_name = 'item_hash'"
+                ),
+                {"schema": schema, "table": table},
+            ).scalar()
+            if exists is None:
+                logger.info(_("Add item_hash column to %s.%s, rewriting it"), schema, table)
+                queries.append(
+                    f"ALTER TABLE {schema}.{table} ADD COLUMN item_hash VARCHAR(32) "
+                    f"GENERATED ALWAYS AS ({ITEM_HASH_SQL}) STORED"
+                )
+        for query in queries:
+            logger.debug(_("Execute: %s"), query)
+            conn.execute(text(query))
+
     def create_json_tables(self) -> None:
         """Create all internal and jsonb tables."""
         logger.info(
@@ -298,6 +387,9 @@ class PostgresqlUtils:
                 self._create_error_log()
                 self._create_data_json()
                 self._create_metadata_json()
+                self._create_import_checkpoint()
+                self._create_import_work()
+                self._upgrade_tables(conn)
 
                 conn.close()
 
@@ -368,6 +460,89 @@ class PostgresqlUtils:
             logger.critical(str(error))
             logger.critical("failed to apply script %s", script)
 
+    def sync_synthese(self, import_id: Optional[int] = None) -> Optional[int]:
+        """Upsert source data into GeoNature synthese with set-based
+        fct_c_sync_data_to_geonature function from to_gnsynthese script,
+        instead of tri_c_upsert_data_to_geonature row trigger.
+
+        Args:
+            import_id (Optional[int], optional): only sync data from this import.
+                Defaults to None, to sync all source data.
+
+        Returns:
+            Optional[int]: Number of upserted synthese rows, None on error
+        """
+        logger.info(
+            _("Sync source %s data from import %s to synthese"),
+            self._config.std_name,
+            import_id if import_id is not None else "*",
+        )
+        query = text(
+            f"SELECT {self._db_schema}.fct_c_sync_data_to_geonature "
+            "(_import_id => :import_id, _source => :source)"
+        )
+        try:
+            with self._db.connect() as conn:
+                with conn.begin():
+                    count = conn.execute(
+                        query, {"import_id": import_id, "source": self._config.std_name}
+                    ).scalar()
+            logger.info(
+                _("%s synthese rows upserted from source %s"), count, self._config.std_name
+            )
+            return count
+        except exc.SQLAlchemyError as error:
+            logger.critical(str(error))
+            logger.critical(
+                _("Failed to sync source %s data to synthese, is to_gnsynthese script applied?"),
+                self._config.std_name,
+            )
+            return None
+
+    def drain_synthese_queue(self, batch_size: int = 10000, interval: Optional[int] = None) -> int:
+        """Propagate queued data changes to GeoNature synthese, by batches of batch_size
+        changes, each one in its own transaction, with fct_c_drain_synthese_queue function
+        from to_gnsynthese script (used with "queue" trigger mode).
+        Several workers can drain the queue at the same time.
+
+        Args:
+            batch_size (int, optional): Number of changes per batch. Defaults to 10000.
+            interval (Optional[int], optional): if set, wait for new changes, polling queue
+                every interval seconds once empty, instead of returning. Database errors are
+                then retried after interval seconds. Defaults to None.
+
+        Returns:
+            int: Number of processed changes
+        """
+        query = text(f"SELECT {self._db_schema}.fct_c_drain_synthese_queue (:batch_size)")
+        total = 0
+        while True:
+            try:
+                # A new connection for each batch, if database restarted after an error
+                with self._db.connect() as conn, conn.begin():
+                    count = conn.execute(query, {"batch_size": batch_size}).scalar()
+            except exc.SQLAlchemyError as error:
+                logger.critical(str(error))
+                if interval is None:
+                    logger.critical(
+                        _("Failed to drain synthese queue, is to_gnsynthese script applied?")
+                    )
+                    break
+                logger.error(_("Failed to drain synthese queue, retrying in %s s"), interval)
+                time.sleep(interval)
+                continue
+            total += count
+            if count:
+                logger.info(
+                    _("%s queued changes propagated to synthese (%s in total)"), count, total
+                )
+            elif interval is None:
+                break
+            else:
+                time.sleep(interval)
+        logger.info(_("Synthese queue drained, %s changes propagated"), total)
+        return total
+
 
 class StorePostgresql:
     """Provides store to Postgresql database method."""
@@ -377,8 +552,18 @@ class StorePostgresql:
         self._db_url = db_url(self._config)
         if self._config.database.querystring:
             self._db_url["query"] = self._config.database.querystring
+        self._codec = get_codec(self._config.json_codec)
+        # One connection per download and store thread, plus main thread one and
+        # parallel delete thread one
+        pool_size = self._config.nb_threads + self._config.nb_store_threads + 1
+        if self._config.parallel_delete:
+            pool_size += 1
         self._db: sqlalchemy.engine.base.Engine = create_engine(
-            URL.create(**self._db_url), echo=False
+            URL.create(**self._db_url),
+            echo=False,
+            json_serializer=self._codec.dumps,
+            json_deserializer=self._codec.loads,
+            pool_size=pool_size,
         )
         self._db_schema = self._config.database.schema_import
         self._metadata = MetaData(schema=self._db_schema)
@@ -388,7 +573,10 @@ class StorePostgresql:
             logger.critical(_("An error occured while trying to connect to database : %s"), e)
             sys.exit(0)
 
-        self._conn = self._db.connect()
+        # Each thread gets its own connection, opened on first use
+        self._local = threading.local()
+        self._conns: List[sqlalchemy.engine.base.Connection] = []
+        self._lock = threading.Lock()
 
         self.total_errors: int = 0
         self.count_data_upserts: int = 0
@@ -396,7 +584,10 @@ class StorePostgresql:
         self.count_data_errors: int = 0
         self.count_metadata_inserts: int = 0
         self.count_metadata_errors: int = 0
+        self.count_data_skipped: int = 0
         self.import_id: int = None
+        # Metadata already stored by this import
+        self._metadata_cache = LruSet(self._config.lru_maxsize)
 
         # Map Import tables in a single dict for easy reference
         self._table_defs = {
@@ -414,14 +605,55 @@ class StorePostgresql:
         #     self._db_schema + ".data_json"
         # ]
 
+        # Unchanged items are not updated, if tables have been upgraded with a generated
+        # item_hash column
+        self._item_hash = all(
+            "item_hash" in table_def["metadata"].c
+            and table_def["metadata"].c.item_hash.computed is not None
+            for table_def in self._table_defs.values()
+        )
+        if not self._item_hash:
+            logger.warning(
+                _(
+                    "Tables of schema %s have no generated item_hash column, unchanged data "
+                    "will be updated. Run 'gn2pg_cli db --json-tables-create' to upgrade them"
+                ),
+                self._db_schema,
+            )
+
     def __enter__(self):
         logger.debug(_("Entry into StorePostgresql"))
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
         """Finalize connections."""
-        logger.debug("Closing database connection at exit from StorePostgresql")
-        self._conn.close()
+        logger.debug("Closing database connections at exit from StorePostgresql")
+        with self._lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns.clear()
+
+    @property
+    def _conn(self) -> sqlalchemy.engine.base.Connection:
+        """Return current thread database connection, so that download threads store
+        pages in their own transactions."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or conn.closed:
+            conn = self._db.connect()
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _count(self, **counters: int) -> None:
+        """Increase store counters, shared by download threads
+
+        Args:
+            counters (int): increments, by counter attribute name
+        """
+        with self._lock:
+            for name, increment in counters.items():
+                setattr(self, name, getattr(self, name) + increment)
 
     @property
     def version(self):
@@ -432,6 +664,90 @@ class StorePostgresql:
     # Internal methods
     # ----------------
 
+    @staticmethod
+    def _extract_metadata(elem: dict) -> List[Tuple[str, dict]]:
+        """Extract embedded metadata from an observation.
+
+        Nested "ca_data" and "jdd_data" dicts are popped from elem and replaced
+        by "ca_uuid" and "jdd_uuid" keys.
+
+        Args:
+            elem (dict): Single observation, modified in place
+
+        Returns:
+            List[Tuple[str, dict]]: (level, metadata item) list, acquisition framework first
+        """
+        metadata_infos = {"ca_data": "acquisition framework", "jdd_data": "dataset"}
+        extracted = []
+        for key, value in metadata_infos.items():
+            if key in elem and isinstance(elem.get(key), dict):
+                meta_data = elem.pop(key)
+                elem[f"{key.rsplit('_', maxsplit=1)[0]}_uuid"] = meta_data[
+                    "uuid"
+                ]  # Generate key "{ca,jdd}_uuid"
+                if key == "jdd_data":
+                    meta_data["ca_uuid"] = (
+                        elem["ca_data"]["uuid"] if "ca_data" in elem else elem["ca_uuid"]
+                    )
+                extracted.append((value, meta_data))
+        return extracted
+
+    def _metadata_key(self, meta_data: dict) -> Tuple[str, str, str]:
+        """Return metadata cache key
+
+        Args:
+            meta_data (dict): acquisition framework or dataset
+
+        Returns:
+            Tuple[str, str, str]: source, uuid and content hash
+        """
+        return (self._config.std_name, str(meta_data["uuid"]), item_hash(meta_data))
+
+    def _upsert(self, table: Table, rows: Any) -> Any:
+        """Build upsert statement of rows into data_json or metadata_json table.
+
+        Conflicting rows are only updated if their content hash changed or, without
+        item_hash column, for metadata, if they have not been stored by this import.
+
+        Args:
+            table (Table): Destination table
+            rows (Any): row values dict, or list of them
+
+        Returns:
+            Any: insert ... on conflict do update statement
+        """
+        insert_stmt = insert(table).values(rows)
+        set_ = {
+            "item": insert_stmt.excluded.item,
+            "update_ts": insert_stmt.excluded.update_ts,
+            "import_id": insert_stmt.excluded.import_id,
+        }
+        where = None
+        if self._item_hash:
+            where = table.c.item_hash.is_distinct_from(
+                func.md5(cast(insert_stmt.excluded.item, Text))
+            )
+        elif table is self._table_defs["meta"]["metadata"]:
+            where = table.c.import_id.is_distinct_from(insert_stmt.excluded.import_id)
+        return insert_stmt.on_conflict_do_update(
+            constraint=table.primary_key, set_=set_, where=where
+        )
+
+    def _conflict_where(self, table: Table) -> Optional[str]:
+        """Return _upsert update condition as SQL, "target" being the destination table
+
+        Args:
+            table (Table): Destination table
+
+        Returns:
+            Optional[str]: update condition
+        """
+        if self._item_hash:
+            return "target.item_hash IS DISTINCT FROM md5(excluded.item::text)"
+        if table is self._table_defs["meta"]["metadata"]:
+            return "target.import_id IS DISTINCT FROM excluded.import_id"
+        return None
+
     def store_1_metadata(
         self,
         controler: str,
@@ -442,6 +758,9 @@ class StorePostgresql:
         """Store 1 metadata item in db (using upsert statement)"""
 
         metadata = self._table_defs["meta"]["metadata"]
+        cache_key = self._metadata_key(elem)
+        if cache_key in self._metadata_cache:
+            return
         # logger.debug(elem[id_key_name])
         exists_stmt = select(
             [
@@ -455,26 +774,23 @@ class StorePostgresql:
         )
         if not self._conn.execute(exists_stmt).scalar():
             try:
-                insert_stmt = insert(metadata).values(
-                    controler=controler,
-                    type=self._config.data_type,
-                    level=level,
-                    uuid=elem[uuid_key_name],
-                    source=self._config.std_name,
-                    item=elem,
-                    update_ts=datetime.now(),
-                    import_id=self.import_id,
-                )
-                do_update_stmt = insert_stmt.on_conflict_do_update(
-                    constraint=metadata.primary_key,
-                    set_={"item": elem, "update_ts": datetime.now(), "import_id": self.import_id},
-                )
-                result = self._conn.execute(do_update_stmt)
-                self.count_metadata_inserts += result.rowcount
-                self._conn.execute("COMMIT")
+                row = {
+                    "controler": controler,
+                    "type": self._config.data_type,
+                    "level": level,
+                    "uuid": elem[uuid_key_name],
+                    "source": self._config.std_name,
+                    "item": elem,
+                    "update_ts": datetime.now(),
+                    "import_id": self.import_id,
+                }
+                do_update_stmt = self._upsert(metadata, row)
+                with self._conn.begin():
+                    result = self._conn.execute(do_update_stmt)
+                self._count(count_metadata_inserts=result.rowcount)
+                self._metadata_cache.add(cache_key)
             except (IntegrityError, exc.StatementError) as error:
                 # Check if the original exception is a UniqueViolation
-                self._conn.execute("ROLLBACK")
                 if isinstance(error.orig, psycopg2.errors.UniqueViolation):
                     self.error_log(controler, elem, str(error), uuid=elem.get(uuid_key_name, None))
                     # if logger.getEffectiveLevel() >
@@ -498,7 +814,9 @@ class StorePostgresql:
                         elem["uuid"],
                         str(error),
                     )
-                self.count_metadata_errors += 1
+                self._count(count_metadata_errors=1)
+        else:
+            self._metadata_cache.add(cache_key)
 
     def store_1_data(
         self,
@@ -517,41 +835,27 @@ class StorePostgresql:
         """
         metadata = self._table_defs[controler]["metadata"]
         logger.debug("elem[id_key_name] is %s, id_key_name is %s", elem[id_key_name], id_key_name)
-        metadata_infos = {"ca_data": "acquisition framework", "jdd_data": "dataset"}
         try:
             logger.debug("store_1_data type %s", self._config.data_type)
-            for key, value in metadata_infos.items():
-                if key in elem and isinstance(elem.get(key), dict):
-                    meta_data = elem.pop(key)
-                    elem[f"{key.rsplit('_', maxsplit=1)[0]}_uuid"] = meta_data[
-                        "uuid"
-                    ]  # Generate key "{ca,jdd}_uuid"
-                    if key == "jdd_data":
-                        meta_data["ca_uuid"] = (
-                            elem["ca_data"]["uuid"] if "ca_data" in elem else elem["ca_uuid"]
-                        )
-                    self.store_1_metadata(controler="metadata", level=value, elem=meta_data)
-
-            insert_stmt = insert(metadata).values(
-                id_data=elem[id_key_name],
-                controler=controler,
-                type=self._config.data_type,
-                uuid=elem[uuid_key_name],
-                source=self._config.std_name,
-                item=elem,
-                update_ts=datetime.now(),
-                import_id=self.import_id,
-            )
-            do_update_stmt = insert_stmt.on_conflict_do_update(
-                constraint=metadata.primary_key,
-                set_={"item": elem, "update_ts": datetime.now(), "import_id": self.import_id},
-            )
-            result = self._conn.execute(do_update_stmt)
-            self.count_data_upserts += result.rowcount
-            self._conn.execute("COMMIT")
+            for level, meta_data in self._extract_metadata(elem):
+                self.store_1_metadata(controler="metadata", level=level, elem=meta_data)
+
+            row = {
+                "id_data": elem[id_key_name],
+                "controler": controler,
+                "type": self._config.data_type,
+                "uuid": elem[uuid_key_name],
+                "source": self._config.std_name,
+                "item": elem,
+                "update_ts": datetime.now(),
+                "import_id": self.import_id,
+            }
+            do_update_stmt = self._upsert(metadata, row)
+            with self._conn.begin():
+                result = self._conn.execute(do_update_stmt)
+            self._count(count_data_upserts=result.rowcount, count_data_skipped=1 - result.rowcount)
         except (IntegrityError, exc.StatementError) as error:
             # Check if the original exception is a UniqueViolation
-            self._conn.execute("ROLLBACK")
             if isinstance(error.orig, psycopg2.errors.UniqueViolation):
                 self.error_log(controler, elem, str(error), uuid=elem.get(uuid_key_name, None))
                 logger.warning(
@@ -574,7 +878,387 @@ class StorePostgresql:
                     elem[id_key_name],
                     str(error),
                 )
-            self.count_data_errors += 1
+            self._count(count_data_errors=1)
+
+    def _prepare_rows(
+        self,
+        controler: str,
+        items: list[dict],
+        id_key_name: str = "id_synthese",
+        uuid_key_name: str = "id_perm_sinp",
+    ) -> Tuple[List[dict], List[dict]]:
+        """Build metadata_json and data_json rows from a page of items.
+
+        Input items are left untouched, rows are deduplicated on their key. Metadata
+        already stored by this import, according to metadata cache, are skipped.
+
+        Args:
+            controler (str): Destination table
+            items (list): Data returned from API call.
+            id_key_name (str, optional): Data id in source database. Defaults to "id_synthese".
+            uuid_key_name (str, optional): data UUID. Defaults to "id_perm_sinp".
+
+        Returns:
+            Tuple[List[dict], List[dict]]: metadata rows (acquisition frameworks first)
+            and data rows
+        """
+        now = datetime.now()
+        data_rows: Dict[Any, dict] = {}
+        meta_rows: Dict[Any, dict] = {}
+        for item in items:
+            elem = dict(item)
+            for level, meta_data in self._extract_metadata(elem):
+                cache_key = self._metadata_key(meta_data)
+                if meta_data["uuid"] in meta_rows or cache_key in self._metadata_cache:
+                    continue
+                meta_rows[meta_data["uuid"]] = {
+                    "controler": "metadata",
+                    "type": self._config.data_type,
+                    "level": level,
+                    "uuid": meta_data["uuid"],
+                    "source": self._config.std_name,
+                    "item": meta_data,
+                    "update_ts": now,
+                    "import_id": self.import_id,
+                }
+            # Same data twice in a page can't be upserted by a single statement, keep last
+            data_rows[elem[id_key_name]] = {
+                "id_data": elem[id_key_name],
+                "controler": controler,
+                "type": self._config.data_type,
+                "uuid": elem[uuid_key_name],
+                "source": self._config.std_name,
+                "item": elem,
+                "update_ts": now,
+                "import_id": self.import_id,
+            }
+        # Acquisition frameworks must exist before their datasets. Rows are sorted on
+        # their key too, so that concurrent stores lock common rows in the same order.
+        return (
+            sorted(
+                meta_rows.values(),
+                key=lambda row: (row["level"] != "acquisition framework", str(row["uuid"])),
+            ),
+            sorted(data_rows.values(), key=lambda row: row["id_data"]),
+        )
+
+    def _cache_metadata(self, meta_rows: List[dict]) -> None:
+        """Add committed metadata rows to metadata cache
+
+        Args:
+            meta_rows (List[dict]): metadata_json rows
+        """
+        for row in meta_rows:
+            self._metadata_cache.add(self._metadata_key(row["item"]))
+
+    def store_batch(
+        self,
+        controler: str,
+        items: list[dict],
+        id_key_name: str = "id_synthese",
+        uuid_key_name: str = "id_perm_sinp",
+    ) -> None:
+        """Store a page of items in db, using one multi-row upsert statement per table
+        within a single transaction.
+
+        Input items are left untouched, so that the page can be stored again row by row
+        if the batch fails.
+
+        Args:
+            controler (str): Destination table
+            items (list): Data returned from API call.
+            id_key_name (str, optional): Data id in source database. Defaults to "id_synthese".
+            uuid_key_name (str, optional): data UUID. Defaults to "id_perm_sinp".
+
+        Raises:
+            IntegrityError: at least one item can not be stored, the whole batch is rolled back
+        """
+        data_table = self._table_defs[controler]["metadata"]
+        meta_table = self._table_defs["meta"]["metadata"]
+        meta_rows, data_rows = self._prepare_rows(controler, items, id_key_name, uuid_key_name)
+
+        meta_count = data_count = 0
+        with self._conn.begin():
+            if meta_rows:
+                meta_count = self._conn.execute(self._upsert(meta_table, meta_rows)).rowcount
+            if data_rows:
+                data_count = self._conn.execute(self._upsert(data_table, data_rows)).rowcount
+        self._cache_metadata(meta_rows)
+        self._count(
+            count_metadata_inserts=meta_count,
+            count_data_upserts=data_count,
+            count_data_skipped=len(data_rows) - data_count,
+        )
+
+    def _copy_merge(
+        self,
+        cursor: Any,
+        table: Table,
+        rows: List[dict],
+        order_by: Optional[str] = None,
+        conflict_where: Optional[str] = None,
+    ) -> int:
+        """Load rows into a temporary staging table with COPY, then merge them into
+        table with a single INSERT ... SELECT ... ON CONFLICT statement.
+
+        Args:
+            cursor (Any): DBAPI cursor, within a transaction
+            table (Table): Destination table
+            rows (List[dict]): Rows to load
+            order_by (str, optional): Order of rows insertion into table. Defaults to None.
+            conflict_where (str, optional): Condition to update a conflicting row,
+                "target" being the destination table. Defaults to None.
+
+        Returns:
+            int: Count of inserted or updated rows
+        """
+        columns = list(rows[0].keys())
+        column_list = ", ".join(columns)
+        updated_columns = [col for col in ("item", "update_ts", "import_id") if col in columns]
+        staging = f"tmp_{table.name}"
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE IF NOT EXISTS {staging} "
+            f"(LIKE {table.schema}.{table.name} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+        )
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(
+                self._codec.dumps(row[col]) if col == "item" else row[col] for col in columns
+            )
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {staging} ({column_list}) FROM STDIN WITH (FORMAT csv)", buffer)
+        cursor.execute(
+            f"""
+            INSERT INTO {table.schema}.{table.name} AS target ({column_list})
+            SELECT {column_list} FROM {staging}
+            {f"ORDER BY {order_by}" if order_by else ""}
+            ON CONFLICT ON CONSTRAINT {table.primary_key.name} DO UPDATE
+            SET {", ".join(f"{col} = excluded.{col}" for col in updated_columns)}
+            {f"WHERE {conflict_where}" if conflict_where else ""}
+            """
+        )
+        return cursor.rowcount
+
+    def store_copy(
+        self,
+        controler: str,
+        items: list[dict],
+        id_key_name: str = "id_synthese",
+        uuid_key_name: str = "id_perm_sinp",
+    ) -> Tuple[int, int, int, int, int]:
+        """Write items to database through staging tables loaded with PostgreSQL COPY,
+        used by full downloads when load_mode is "copy".
+
+        If the page can't be merged, it is stored again with store_data.
+
+        Args:
+            controler (str): Name of API controler.
+            items (list): Data returned from API call.
+            id_key_name (str, optional): id key name from source. Defaults to "id_synthese".
+            uuid_key_name (str, optional): uuid key name from source. Defaults to "id_perm_sinp".
+
+        Returns:
+            Tuple[int, int, int, int, int]: items length and store counters, as store_data
+        """
+        data_table = self._table_defs[controler]["metadata"]
+        meta_table = self._table_defs["meta"]["metadata"]
+        meta_rows, data_rows = self._prepare_rows(controler, items, id_key_name, uuid_key_name)
+        meta_count = data_count = 0
+        try:
+            with self._conn.begin():
+                cursor = self._conn.connection.cursor()
+                if meta_rows:
+                    meta_count = self._copy_merge(
+                        cursor,
+                        meta_table,
+                        meta_rows,
+                        # Acquisition frameworks must exist before their datasets
+                        order_by="level <> 'acquisition framework', uuid::text",
+                        conflict_where=self._conflict_where(meta_table),
+                    )
+                if data_rows:
+                    data_count = self._copy_merge(
+                        cursor,
+                        data_table,
+                        data_rows,
+                        order_by="id_data",
+                        conflict_where=self._conflict_where(data_table),
+                    )
+                cursor.close()
+        except (psycopg2.Error, exc.SQLAlchemyError) as error:
+            logger.warning(
+                _("COPY load failed for a page of %s items from source %s, upserting them: %s"),
+                len(items),
+                self._config.std_name,
+                error,
+            )
+            return self.store_data(controler, items, id_key_name, uuid_key_name)
+        self._cache_metadata(meta_rows)
+        self._count(
+            count_metadata_inserts=meta_count,
+            count_data_upserts=data_count,
+            count_data_skipped=len(data_rows) - data_count,
+        )
+        return self._store_report(items)
+
+    def _raw_merge(
+        self,
+        cursor: Any,
+        controler: str,
+        items: List[str],
+        id_key_name: str = "id_synthese",
+        uuid_key_name: str = "id_perm_sinp",
+    ) -> Tuple[int, int, int]:
+        """Load raw items JSON texts into a temporary staging table with COPY, then
+        extract their metadata and merge them into metadata_json and data_json tables
+        with SQL, as _prepare_rows does in python.
+
+        Args:
+            cursor (Any): DBAPI cursor, within a transaction
+            controler (str): Name of API controler.
+            items (List[str]): Items JSON texts
+            id_key_name (str, optional): id key name from source. Defaults to "id_synthese".
+            uuid_key_name (str, optional): uuid key name from source. Defaults to "id_perm_sinp".
+
+        Returns:
+            Tuple[int, int, int]: Count of inserted or updated metadata rows, of distinct
+                data rows, and of inserted or updated data rows
+        """
+        data_table = self._table_defs[controler]["metadata"]
+        meta_table = self._table_defs["meta"]["metadata"]
+        cursor.execute(
+            "CREATE TEMPORARY TABLE IF NOT EXISTS tmp_raw_item "
+            "(ord INTEGER, item JSONB) ON COMMIT DELETE ROWS"
+        )
+        buffer = io.StringIO()
+        buffer.writelines(
+            f'{ord_},"{item.replace(chr(34), chr(34) * 2)}"\n' for ord_, item in enumerate(items)
+        )
+        buffer.seek(0)
+        cursor.copy_expert("COPY tmp_raw_item (ord, item) FROM STDIN WITH (FORMAT csv)", buffer)
+        params = {
+            "controler": controler,
+            "type": self._config.data_type,
+            "source": self._config.std_name,
+            "update_ts": datetime.now(),
+            "import_id": self.import_id,
+            "id_key": id_key_name,
+            "uuid_key": uuid_key_name,
+        }
+        # Acquisition frameworks must exist before their datasets, and datasets keep their
+        # acquisition framework uuid
+        meta_where = self._conflict_where(meta_table)
+        cursor.execute(
+            f"""
+            INSERT INTO {meta_table.schema}.{meta_table.name} AS target
+                (controler, type, level, uuid, source, item, update_ts, import_id)
+            SELECT DISTINCT ON (level <> 'acquisition framework', uuid)
+                'metadata', %(type)s, level, uuid, %(source)s, meta, %(update_ts)s,
+                %(import_id)s
+            FROM (
+                SELECT 'acquisition framework' AS level, (item #>> '{{ca_data,uuid}}')::uuid AS uuid,
+                    item -> 'ca_data' AS meta, ord
+                FROM tmp_raw_item WHERE jsonb_typeof(item -> 'ca_data') = 'object'
+                UNION ALL
+                SELECT 'dataset', (item #>> '{{jdd_data,uuid}}')::uuid,
+                    item -> 'jdd_data' || jsonb_build_object(
+                        'ca_uuid', coalesce(item #> '{{ca_data,uuid}}', item -> 'ca_uuid')
+                    ),
+                    ord
+                FROM tmp_raw_item WHERE jsonb_typeof(item -> 'jdd_data') = 'object'
+            ) AS meta_item
+            ORDER BY level <> 'acquisition framework', uuid, ord
+            ON CONFLICT ON CONSTRAINT {meta_table.primary_key.name} DO UPDATE
+            SET item = excluded.item, update_ts = excluded.update_ts,
+                import_id = excluded.import_id
+            {f"WHERE {meta_where}" if meta_where else ""}
+            """,
+            params,
+        )
+        meta_count = cursor.rowcount
+        # Same data twice in a page can't be upserted by a single statement, keep last
+        cursor.execute(
+            "SELECT count(DISTINCT (item ->> %(id_key)s)::integer) FROM tmp_raw_item", params
+        )
+        data_rows = cursor.fetchone()[0]
+        data_where = self._conflict_where(data_table)
+        cursor.execute(
+            f"""
+            INSERT INTO {data_table.schema}.{data_table.name} AS target
+                (id_data, controler, type, uuid, source, item, update_ts, import_id)
+            SELECT DISTINCT ON ((item ->> %(id_key)s)::integer)
+                (item ->> %(id_key)s)::integer, %(controler)s, %(type)s,
+                (item ->> %(uuid_key)s)::uuid, %(source)s, item, %(update_ts)s,
+                %(import_id)s
+            FROM (
+                SELECT ord, CASE WHEN jsonb_typeof(item -> 'jdd_data') = 'object'
+                    THEN item - 'jdd_data' || jsonb_build_object('jdd_uuid', item #> '{{jdd_data,uuid}}')
+                    ELSE item END AS item
+                FROM (
+                    SELECT ord, CASE WHEN jsonb_typeof(item -> 'ca_data') = 'object'
+                        THEN item - 'ca_data' || jsonb_build_object('ca_uuid', item #> '{{ca_data,uuid}}')
+                        ELSE item END AS item
+                    FROM tmp_raw_item
+                ) AS ca_item
+            ) AS data_item
+            ORDER BY (item ->> %(id_key)s)::integer, ord DESC
+            ON CONFLICT ON CONSTRAINT {data_table.primary_key.name} DO UPDATE
+            SET item = excluded.item, update_ts = excluded.update_ts,
+                import_id = excluded.import_id
+            {f"WHERE {data_where}" if data_where else ""}
+            """,
+            params,
+        )
+        return meta_count, data_rows, cursor.rowcount
+
+    def store_raw(
+        self,
+        controler: str,
+        items: List[Union[str, dict]],
+        id_key_name: str = "id_synthese",
+        uuid_key_name: str = "id_perm_sinp",
+    ) -> Tuple[int, int, int, int, int]:
+        """Write items JSON texts to database without decoding them, their metadata being
+        extracted by PostgreSQL, used by full downloads when load_mode is "raw".
+
+        Decoded items are encoded once. Metadata of each page are merged by PostgreSQL,
+        without metadata cache. If the page can't be merged, it is decoded and stored
+        again with store_data.
+
+        Args:
+            controler (str): Name of API controler.
+            items (List[Union[str, dict]]): Items JSON texts, or items.
+            id_key_name (str, optional): id key name from source. Defaults to "id_synthese".
+            uuid_key_name (str, optional): uuid key name from source. Defaults to "id_perm_sinp".
+
+        Returns:
+            Tuple[int, int, int, int, int]: items length and store counters, as store_data
+        """
+        texts = [item if isinstance(item, str) else self._codec.dumps(item) for item in items]
+        try:
+            with self._conn.begin():
+                cursor = self._conn.connection.cursor()
+                meta_count, data_rows, data_count = self._raw_merge(
+                    cursor, controler, texts, id_key_name, uuid_key_name
+                )
+                cursor.close()
+        except (psycopg2.Error, exc.SQLAlchemyError) as error:
+            logger.warning(
+                _("Raw load failed for a page of %s items from source %s, upserting them: %s"),
+                len(items),
+                self._config.std_name,
+                error,
+            )
+            return self.store_data(
+                controler, [self._codec.loads(text) for text in texts], id_key_name, uuid_key_name
+            )
+        self._count(
+            count_metadata_inserts=meta_count,
+            count_data_upserts=data_count,
+            count_data_skipped=data_rows - data_count,
+        )
+        return self._store_report(items)
 
     def store_data(
         self,
@@ -583,7 +1267,7 @@ class StorePostgresql:
         # import_log_id: int,
         id_key_name: str = "id_synthese",
         uuid_key_name: str = "id_perm_sinp",
-    ) -> Tuple[int, int, int]:
+    ) -> Tuple[int, int, int, int, int]:
         """Write items_dict to database.
 
         Args:
@@ -593,10 +1277,73 @@ class StorePostgresql:
             uuid_key_name (str, optional): uuid key name from source. Defaults to "id_perm_sinp".
 
         Returns:
-            int: items dict length
+            Tuple[int, int, int, int, int]: items length and store counters
+        """
+        try:
+            self.store_batch(controler, items, id_key_name, uuid_key_name)
+        except (IntegrityError, StatementError) as error:
+            logger.warning(
+                _(
+                    "Batch store failed for a page of %s items from source %s, "
+                    "storing them one by one: %s"
+                ),
+                len(items),
+                self._config.std_name,
+                error.orig,
+            )
+            self._store_rows(controler, items, id_key_name, uuid_key_name)
+        return self._store_report(items)
+
+    def _store_report(self, items: list[dict]) -> Tuple[int, int, int, int, int]:
+        """Log store counters after a page has been stored.
+
+        Args:
+            items (list): Stored items
+
+        Returns:
+            Tuple[int, int, int, int, int]: items length, data upserts, data errors,
+            metadata upserts and metadata errors
+        """
+        with self._lock:
+            counters = (
+                self.count_data_upserts,
+                self.count_data_errors,
+                self.count_metadata_inserts,
+                self.count_metadata_errors,
+            )
+            count_data_skipped = self.count_data_skipped
+        logger.info(
+            _(
+                "%(count_data_upserts)s data and %(count_metadata_inserts)s metadata "
+                "have been stored in db from source %(std_name)s (%(count_data_errors)s "
+                "error occurred, %(count_data_skipped)s unchanged data skipped)"
+            ),
+            {
+                "count_data_upserts": counters[0],
+                "count_metadata_inserts": counters[2],
+                "std_name": self._config.std_name,
+                "count_data_errors": counters[1] + counters[3],
+                "count_data_skipped": count_data_skipped,
+            },
+        )
+        return (len(items), *counters)
+
+    def _store_rows(
+        self,
+        controler: str,
+        items: list[dict],
+        id_key_name: str = "id_synthese",
+        uuid_key_name: str = "id_perm_sinp",
+    ) -> None:
+        """Store items one by one, routing failing rows to error_log.
+
+        Args:
+            controler (str): Name of API controler.
+            items (list): Data returned from API call.
+            id_key_name (str, optional): id key name from source. Defaults to "id_synthese".
+            uuid_key_name (str, optional): uuid key name from source. Defaults to "id_perm_sinp".
         """
         # Loop on data array to store each element to database
-        # self.import_id = import_log_id
         for elem in items:
             try:
                 # Convert to json
@@ -619,26 +1366,6 @@ class StorePostgresql:
                         "id": elem[id_key_name],
                     },
                 )
-        logger.info(
-            _(
-                "%(count_data_upserts)s data and %(count_metadata_inserts)s metadata "
-                "have been stored in db from source %(std_name)s (%(count_data_errors)s "
-                "error occurred)"
-            ),
-            {
-                "count_data_upserts": self.count_data_upserts,
-                "count_metadata_inserts": self.count_metadata_inserts,
-                "std_name": self._config.std_name,
-                "count_data_errors": self.count_data_errors + self.count_metadata_errors,
-            },
-        )
-        return (
-            len(items),
-            self.count_data_upserts,
-            self.count_data_errors,
-            self.count_metadata_inserts,
-            self.count_metadata_errors,
-        )
 
     # ----------------
     # External methods
@@ -650,7 +1377,9 @@ class StorePostgresql:
         id_key_name: str = "id_synthese",
         controler: str = "data",
     ) -> int:
-        """Delete observations stored in database.
+        """Delete observations stored in database, with a single statement whose keys
+        are an array parameter, so that statement level triggers delete them from
+        synthese at once.
 
         Args:
             items (list): items to delete
@@ -669,17 +1398,19 @@ class StorePostgresql:
             controler,
         )
         keys = [item[id_key_name] for item in items]
-        deleted_data = self._conn.execute(
-            self._table_defs["data"]["metadata"]
-            .delete()
-            .where(
-                and_(
-                    self._table_defs["data"]["metadata"].c.id_data.in_(keys),
-                    self._table_defs["data"]["metadata"].c.controler == controler,
-                    self._table_defs["data"]["metadata"].c.source == self._config.std_name,
+        with self._conn.begin():
+            deleted_data = self._conn.execute(
+                self._table_defs["data"]["metadata"]
+                .delete()
+                .where(
+                    and_(
+                        self._table_defs["data"]["metadata"].c.id_data
+                        == any_(literal(keys, ARRAY(Integer))),
+                        self._table_defs["data"]["metadata"].c.controler == controler,
+                        self._table_defs["data"]["metadata"].c.source == self._config.std_name,
+                    )
                 )
             )
-        )
         del_count += deleted_data.rowcount
         logger.debug(
             _("%s rows have been deleted from source %s (controler %s)"),
@@ -690,6 +1421,73 @@ class StorePostgresql:
 
         return del_count
 
+    def _data_range(
+        self, controler: str, start_key: Optional[int] = None, end_key: Optional[int] = None
+    ) -> list:
+        """Return conditions selecting stored data of this source, whose id is greater than
+        start_key and lower or equal to end_key (None for no bound)"""
+        table = self._table_defs["data"]["metadata"]
+        conditions = [table.c.source == self._config.std_name, table.c.controler == controler]
+        if start_key is not None:
+            conditions.append(table.c.id_data > start_key)
+        if end_key is not None:
+            conditions.append(table.c.id_data <= end_key)
+        return conditions
+
+    def count_data(
+        self, controler: str, start_key: Optional[int] = None, end_key: Optional[int] = None
+    ) -> Tuple[int, Optional[int], Optional[int]]:
+        """Count stored data of an id range, and get their lowest and highest ids.
+
+        Args:
+            controler (str): Name of API controler.
+            start_key (Optional[int], optional): Exclusive lower id. Defaults to None.
+            end_key (Optional[int], optional): Inclusive upper id. Defaults to None.
+
+        Returns:
+            Tuple[int, Optional[int], Optional[int]]: Count of stored data, their lowest and
+                highest ids.
+        """
+        table = self._table_defs["data"]["metadata"]
+        stmt = select([func.count(), func.min(table.c.id_data), func.max(table.c.id_data)]).where(
+            and_(*self._data_range(controler, start_key, end_key))
+        )
+        return tuple(self._conn.execute(stmt).fetchone())
+
+    def data_ids(
+        self, controler: str, start_key: Optional[int] = None, end_key: Optional[int] = None
+    ) -> List[int]:
+        """List ids of stored data of an id range.
+
+        Args:
+            controler (str): Name of API controler.
+            start_key (Optional[int], optional): Exclusive lower id. Defaults to None.
+            end_key (Optional[int], optional): Inclusive upper id. Defaults to None.
+
+        Returns:
+            List[int]: Ids of stored data.
+        """
+        table = self._table_defs["data"]["metadata"]
+        stmt = select([table.c.id_data]).where(
+            and_(*self._data_range(controler, start_key, end_key))
+        )
+        return [row.id_data for row in self._conn.execute(stmt)]
+
+    def data_id_bounds(self, controler: str) -> Tuple[Optional[int], Optional[int]]:
+        """Get lowest and highest ids of stored data.
+
+        Args:
+            controler (str): Name of API controler.
+
+        Returns:
+            Tuple[Optional[int], Optional[int]]: Lowest and highest ids, None if no data.
+        """
+        table = self._table_defs["data"]["metadata"]
+        stmt = select([func.min(table.c.id_data), func.max(table.c.id_data)]).where(
+            and_(*self._data_range(controler))
+        )
+        return tuple(self._conn.execute(stmt).fetchone())
+
     def import_log(self, controler: str, values: Optional[dict] = None):
         """Write download log entries to database.
 
@@ -703,6 +1501,8 @@ class StorePostgresql:
         ]
         if values is None:
             values = {}
+        # Columns added by later versions are missing until tables are upgraded
+        values = {key: value for key, value in values.items() if key in metadata.c}
         if not self.import_id:
             stmt = (
                 metadata.insert()
@@ -720,6 +1520,389 @@ class StorePostgresql:
         self.import_id = result.scalar()
         return self.import_id
 
+    def checkpoint(self, page_no: int, item_count: int, last_key: Optional[int] = None) -> None:
+        """Record a stored page of current import, so that a failed full download
+        can be resumed without downloading it again.
+
+        Args:
+            page_no (int): Page number, from 0
+            item_count (int): Number of items of the page
+            last_key (Optional[int], optional): Last key of keyset pagination page.
+                Defaults to None.
+        """
+        table = self._metadata.tables.get(self._db_schema + ".import_checkpoint")
+        if table is None:
+            return
+        stmt = insert(table).values(
+            import_id=self.import_id,
+            page_no=page_no,
+            item_count=item_count,
+            last_key=last_key,
+        )
+        # A resumed keyset download numbers its pages again after its first stored pages
+        stmt = stmt.on_conflict_do_update(
+            constraint="pk_import_checkpoint",
+            set_={
+                "item_count": stmt.excluded.item_count,
+                "last_key": stmt.excluded.last_key,
+                "store_ts": func.now(),
+            },
+        )
+        self._conn.execute(stmt)
+
+    def resume_checkpoints(self, controler: str, xfer_filters: Any) -> Dict[int, Optional[int]]:
+        """Take over stored pages checkpoints of last full download, if it did not succeed
+        and used the same filters, for current import.
+
+        With keyset pagination, download resumes after the first consecutive stored pages:
+        checkpoints of later pages are dropped, their pages being downloaded again.
+
+        Args:
+            controler (str): Controler name
+            xfer_filters (Any): Current import filters, as stored in import_log
+
+        Returns:
+            Dict[int, Optional[int]]: Last key of stored pages, by page number
+        """
+        table = self._metadata.tables.get(self._db_schema + ".import_checkpoint")
+        if table is None:
+            logger.warning(
+                _(
+                    "No import_checkpoint table, full download of source %s can not be "
+                    "resumed, please run 'gn2pg_cli db --json-tables-create'"
+                ),
+                self._config.std_name,
+            )
+            return {}
+        log_table = self._metadata.tables[self._db_schema + ".import_log"]
+        stmt = (
+            select([log_table.c.id, log_table.c.xfer_status, log_table.c.xfer_filters])
+            .where(
+                and_(
+                    log_table.c.source == self._config.std_name,
+                    log_table.c.controler == controler,
+                    log_table.c.xfer_type == "full",
+                    log_table.c.id != self.import_id,
+                )
+            )
+            .order_by(log_table.c.id.desc())
+            .limit(1)
+        )
+        last = self._conn.execute(stmt).fetchone()
+        if last is None or last.xfer_status == XferStatus.success:
+            logger.info(
+                _("No failed full download to resume for source %s"), self._config.std_name
+            )
+            return {}
+        # Only querystrings are compared, page lengths may be logged after them
+        if list(xfer_filters)[:1] != list(last.xfer_filters or [])[:1]:
+            logger.warning(
+                _("Filters of source %s changed since import %s, it can not be resumed"),
+                self._config.std_name,
+                last.id,
+            )
+            return {}
+        with self._conn.begin():
+            self._conn.execute(
+                table.update().where(table.c.import_id == last.id).values(import_id=self.import_id)
+            )
+            rows = self._conn.execute(
+                select([table.c.page_no, table.c.last_key]).where(
+                    table.c.import_id == self.import_id
+                )
+            ).fetchall()
+            if self._config.pagination == "keyset":
+                page_numbers = {row.page_no for row in rows}
+                first_gap = 0
+                while first_gap in page_numbers:
+                    first_gap += 1
+                self._conn.execute(
+                    table.delete().where(
+                        and_(table.c.import_id == self.import_id, table.c.page_no >= first_gap)
+                    )
+                )
+                rows = [row for row in rows if row.page_no < first_gap]
+        logger.info(
+            _("Resume import %s of source %s, %s pages already stored"),
+            last.id,
+            self._config.std_name,
+            len(rows),
+        )
+        return {row.page_no: row.last_key for row in rows}
+
+    def _work_table(self) -> Optional[Table]:
+        """Return import_work table, None if tables have not been upgraded"""
+        table = self._metadata.tables.get(self._db_schema + ".import_work")
+        if table is None:
+            logger.critical(
+                _(
+                    "No import_work table, distributed downloads are not available, "
+                    "please run 'gn2pg_cli db --json-tables-create'"
+                )
+            )
+        return table
+
+    def _open_work(self, controler: str, xfer_filters: Any) -> Optional[int]:
+        """Get the distributed download of this source in progress with the same filters,
+        abandoning one with other filters. To be called holding the work advisory lock.
+
+        Args:
+            controler (str): Controler name
+            xfer_filters (Any): Download filters, as stored in import_log
+
+        Returns:
+            Optional[int]: import_log id of the distributed download, None if there is none
+        """
+        log_table = self._metadata.tables[self._db_schema + ".import_log"]
+        last = self._conn.execute(
+            select([log_table.c.id, log_table.c.xfer_filters])
+            .where(
+                and_(
+                    log_table.c.source == self._config.std_name,
+                    log_table.c.controler == controler,
+                    log_table.c.xfer_type == "distributed",
+                    log_table.c.xfer_status == XferStatus.import_data,
+                )
+            )
+            .order_by(log_table.c.id.desc())
+            .limit(1)
+        ).fetchone()
+        if last is None:
+            return None
+        if list(xfer_filters)[:1] == list(last.xfer_filters or [])[:1]:
+            logger.info(
+                _("Join distributed download %s of source %s"),
+                last.id,
+                self._config.std_name,
+            )
+            return last.id
+        logger.warning(
+            _("Filters of source %s changed since distributed download %s, abandon it"),
+            self._config.std_name,
+            last.id,
+        )
+        self._conn.execute(
+            log_table.update()
+            .where(log_table.c.id == last.id)
+            .values(xfer_status=XferStatus.failed, xfer_end_ts=datetime.now())
+        )
+        return None
+
+    def join_work(
+        self,
+        controler: str,
+        xfer_filters: Any,
+        plan: Callable[[], List[Tuple[Optional[int], Optional[int]]]],
+    ) -> Optional[int]:
+        """Join the distributed download of this source in progress, or start a new one,
+        whose work items are the key ranges returned by plan. Processes starting at the
+        same time are serialized by an advisory lock. Source is requested by plan without
+        holding the lock, so that the first process planning the download is the only one
+        writing it, the other ones joining it.
+
+        Args:
+            controler (str): Controler name
+            xfer_filters (Any): Download filters, as stored in import_log
+            plan (Callable[[], List[Tuple[Optional[int], Optional[int]]]]): Returns
+                work items key ranges, as exclusive start key and inclusive end key
+
+        Returns:
+            Optional[int]: import_log id of the distributed download, None if not available
+        """
+        table = self._work_table()
+        if table is None:
+            return None
+        log_table = self._metadata.tables[self._db_schema + ".import_log"]
+        lock_key = f"gn2pg_work {self._db_schema} {self._config.std_name} {controler}"
+        lock = select([func.pg_advisory_xact_lock(func.hashtext(lock_key))])
+        with self._conn.begin():
+            self._conn.execute(lock)
+            plan_id = self._open_work(controler, xfer_filters)
+        if plan_id is not None:
+            return plan_id
+        ranges = plan()
+        with self._conn.begin():
+            self._conn.execute(lock)
+            # Another process may have planned the download meanwhile
+            plan_id = self._open_work(controler, xfer_filters)
+            if plan_id is not None:
+                return plan_id
+            plan_id = self._conn.execute(
+                insert(log_table)
+                .values(
+                    source=self._config.std_name,
+                    controler=controler,
+                    xfer_type="distributed",
+                    xfer_status=XferStatus.import_data,
+                    xfer_start_ts=datetime.now(),
+                    xfer_filters=xfer_filters,
+                )
+                .returning(log_table.c.id)
+            ).scalar()
+            self._conn.execute(
+                insert(table),
+                [
+                    {"import_id": plan_id, "start_key": start_key, "end_key": end_key}
+                    for start_key, end_key in ranges
+                ],
+            )
+        logger.info(
+            _("Distributed download %s of source %s planned, %s work items"),
+            plan_id,
+            self._config.std_name,
+            len(ranges),
+        )
+        return plan_id
+
+    def claim_work(self, plan_id: int, worker: str, lease: int) -> Optional[Any]:
+        """Lease a pending work item of a distributed download, or an item whose lease
+        expired, skipping items being claimed by other workers. Lease times use database
+        clock, shared by all hosts.
+
+        Args:
+            plan_id (int): import_log id of the distributed download
+            worker (str): Worker name
+            lease (int): Lease duration, in seconds
+
+        Returns:
+            Optional[Any]: id, start_key, end_key and attempts of claimed item, or None
+        """
+        table = self._metadata.tables[self._db_schema + ".import_work"]
+        claimable = (
+            select([table.c.id])
+            .where(
+                and_(
+                    table.c.import_id == plan_id,
+                    table.c.attempts < self._config.max_retry,
+                    or_(
+                        table.c.status == WorkStatus.pending,
+                        and_(
+                            table.c.status == WorkStatus.leased,
+                            table.c.lease_until < func.now(),
+                        ),
+                    ),
+                )
+            )
+            .order_by(table.c.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            table.update()
+            .where(table.c.id == claimable)
+            .values(
+                status=WorkStatus.leased,
+                worker=worker,
+                lease_until=func.now() + timedelta(seconds=lease),
+                attempts=table.c.attempts + 1,
+            )
+            .returning(table.c.id, table.c.start_key, table.c.end_key, table.c.attempts)
+        )
+        with self._conn.begin():
+            return self._conn.execute(stmt).fetchone()
+
+    def renew_leases(self, worker: str, lease: int) -> int:
+        """Extend leases of the work items of a worker
+
+        Args:
+            worker (str): Worker name
+            lease (int): Lease duration, in seconds
+
+        Returns:
+            int: number of renewed leases
+        """
+        table = self._metadata.tables[self._db_schema + ".import_work"]
+        stmt = (
+            table.update()
+            .where(and_(table.c.worker == worker, table.c.status == WorkStatus.leased))
+            .values(lease_until=func.now() + timedelta(seconds=lease))
+        )
+        with self._conn.begin():
+            return self._conn.execute(stmt).rowcount
+
+    def end_work(self, item_id: int, worker: str, item_count: Optional[int] = None) -> bool:
+        """Mark a work item as done, or release it to be claimed again if item_count is
+        None.
+
+        Args:
+            item_id (int): Work item id
+            worker (str): Worker name
+            item_count (Optional[int], optional): Number of stored items. Defaults to None.
+
+        Returns:
+            bool: False if item lease was taken over by another worker
+        """
+        table = self._metadata.tables[self._db_schema + ".import_work"]
+        if item_count is None:
+            values = {"status": WorkStatus.pending, "worker": None, "lease_until": None}
+        else:
+            values = {
+                "status": WorkStatus.done,
+                "item_count": item_count,
+                "done_ts": datetime.now(),
+            }
+        # An item done by another worker stays done
+        stmt = (
+            table.update()
+            .where(
+                and_(
+                    table.c.id == item_id,
+                    table.c.worker == worker,
+                    table.c.status == WorkStatus.leased,
+                )
+            )
+            .values(**values)
+        )
+        with self._conn.begin():
+            return self._conn.execute(stmt).rowcount == 1
+
+    def close_work(self, plan_id: int) -> Optional[str]:
+        """Close a distributed download if all its work items are done, or failed too
+        many times. Its import_log entry then gets the total stored items count.
+
+        Args:
+            plan_id (int): import_log id of the distributed download
+
+        Returns:
+            Optional[str]: Final transfer status, None if work items are still leased
+                or pending
+        """
+        table = self._metadata.tables[self._db_schema + ".import_work"]
+        log_table = self._metadata.tables[self._db_schema + ".import_log"]
+        # Items being downloaded, or to be claimed again
+        unfinished = and_(
+            table.c.status != WorkStatus.done,
+            or_(
+                table.c.attempts < self._config.max_retry,
+                and_(table.c.status == WorkStatus.leased, table.c.lease_until >= func.now()),
+            ),
+        )
+        with self._conn.begin():
+            row = self._conn.execute(
+                select(
+                    [
+                        func.count().filter(unfinished),
+                        func.count().filter(table.c.status != WorkStatus.done),
+                        func.coalesce(func.sum(table.c.item_count), 0),
+                    ]
+                ).where(table.c.import_id == plan_id)
+            ).fetchone()
+            if row[0]:
+                return None
+            status = XferStatus.failed if row[1] else XferStatus.success
+            self._conn.execute(
+                log_table.update()
+                .where(
+                    and_(
+                        log_table.c.id == plan_id,
+                        log_table.c.xfer_status == XferStatus.import_data,
+                    )
+                )
+                .values(xfer_status=status, xfer_end_ts=datetime.now(), api_count_items=row[2])
+            )
+        return status
+
     def import_get(self, controler: str) -> Optional[str]:
         """Get last download timestamp from database.
 
@@ -731,6 +1914,19 @@ class StorePostgresql:
         """
         row = None
         metadata = self._metadata.tables[self._config.database.schema_import + "." + "import_log"]
+        # Distributed download in progress, whose data are not all stored yet
+        distributed = (
+            select([func.min(metadata.c.xfer_start_ts)])
+            .where(
+                and_(
+                    metadata.c.source == self._config.std_name,
+                    metadata.c.controler == controler,
+                    metadata.c.xfer_type == "distributed",
+                    metadata.c.xfer_status == XferStatus.import_data,
+                )
+            )
+            .scalar_subquery()
+        )
         stmt = (
             select([metadata.c.xfer_start_ts])
             .where(
@@ -738,6 +1934,12 @@ class StorePostgresql:
                     metadata.c.source == self._config.std_name,
                     metadata.c.controler == controler,
                     metadata.c.xfer_status == XferStatus.success,
+                    # Reconciliation does not detect modified data, distributed download
+                    # workers only store a part of it
+                    func.coalesce(metadata.c.xfer_type, "").notin_(("reconcile", "worker")),
+                    # Downloads started during a distributed download in progress are
+                    # ignored, so that changes since its start are downloaded again
+                    or_(distributed.is_(None), metadata.c.xfer_start_ts < distributed),
                 )
             )
             .order_by(metadata.c.xfer_start_ts.desc())
@@ -776,7 +1978,6 @@ class StorePostgresql:
                 )
             ]
         )
-        print(exists_stmt)
         if not self._conn.execute(exists_stmt).scalar():
             insert_stmt = insert(metadata).values(
                 source=self._config.std_name,
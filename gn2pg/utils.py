@@ -2,7 +2,11 @@
 # -*- coding: utf-8 -*-
 """Some utils"""
 
-from typing import Any
+import hashlib
+import json
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable
 
 
 class XferStatus:
@@ -15,6 +19,14 @@ class XferStatus:
     failed = "failed"
 
 
+class WorkStatus:
+    """List of distributed download work item status"""
+
+    pending = "pending"
+    leased = "leased"
+    done = "done"
+
+
 class BColors:
     """Colors used for cli"""
 
@@ -72,3 +84,47 @@ def coalesce_in_dict(source: dict, key: str, default: Any) -> Any:
     if key in source:
         return source[key]
     return default
+
+
+def item_hash(item: dict) -> str:
+    """Hash json item content, whatever its keys order
+
+    Args:
+        item (dict): json item
+
+    Returns:
+        str: md5 hex digest
+    """
+    content = json.dumps(item, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.md5(content.encode("utf-8")).hexdigest()
+
+
+class LruSet:
+    """Thread-safe set keeping maxsize most recently used keys"""
+
+    def __init__(self, maxsize: int) -> None:
+        self._maxsize = maxsize
+        self._keys: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            if key not in self._keys:
+                return False
+            self._keys.move_to_end(key)
+            return True
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: Hashable) -> None:
+        """Add key as most recently used one, dropping least recently used key if full
+
+        Args:
+            key (Hashable): key
+        """
+        with self._lock:
+            self._keys[key] = None
+            self._keys.move_to_end(key)
+            if len(self._keys) > self._maxsize:
+                self._keys.popitem(last=False)
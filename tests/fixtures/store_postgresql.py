@@ -1,4 +1,5 @@
 import pytest
+from sqlalchemy import text
 
 from gn2pg.store_postgresql import PostgresqlUtils, StorePostgresql
 
@@ -14,3 +15,25 @@ def postgresql_utils(gn2pg_conf_one_source):
 def store_postgresql(gn2pg_conf_one_source, postgresql_utils):
     with StorePostgresql(gn2pg_conf_one_source) as store_pg:
         yield store_pg
+
+
+@pytest.fixture
+def to_gnsynthese(postgresql_utils):
+    """Apply to_gnsynthese script, if test database holds GeoNature schemas,
+    and drop its triggers afterwards so that other tests store data only"""
+    with postgresql_utils._db.connect() as conn:
+        if conn.execute(text("SELECT to_regclass('gn_synthese.synthese')")).scalar() is None:
+            pytest.skip("No GeoNature synthese in test database")
+    postgresql_utils.custom_script()
+    yield postgresql_utils
+    with postgresql_utils._db.connect() as conn:
+        with conn.begin():
+            triggers = conn.execute(
+                text(
+                    "SELECT tgname, tgrelid::regclass FROM pg_trigger "
+                    "WHERE tgrelid::regclass::text LIKE :tables AND NOT tgisinternal"
+                ),
+                {"tables": f"{postgresql_utils._db_schema}.%"},
+            ).all()
+            for trigger, table in triggers:
+                conn.execute(text(f"DROP TRIGGER {trigger} ON {table}"))
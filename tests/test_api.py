@@ -1,8 +1,12 @@
+import json
 import math
 import re
 from urllib.parse import urlencode
 
-from gn2pg.api import BaseAPI
+import pytest
+
+from gn2pg.api import APIException, BaseAPI, ConcurrencyController, PageLengthController
+from gn2pg.codec import JsonCodec
 
 
 class TestApi:
@@ -28,3 +32,148 @@ class TestApi:
         for i, page in enumerate(page_list):
             assert urlencode(params) in page
             assert f"offset={i}" in page
+
+    def test_keyset_pages(self, base_api):
+        _page_list, total_filtered, _status_code = base_api.page_list(params={"limit": 100})
+        ids = [
+            item["id_synthese"]
+            for page in base_api.keyset_pages(params={"limit": 100})
+            for item in page["items"]
+        ]
+
+        assert len(ids) == total_filtered
+        assert ids == sorted(set(ids))
+
+    def test_key_ranges(self, base_api):
+        ranges, total = base_api.key_ranges({}, 4)
+
+        assert 1 <= len(ranges) <= 4
+        assert ranges[0][0] is None and ranges[-1][1] is None
+        for (_start, end), (next_start, _end) in zip(ranges[:-1], ranges[1:]):
+            assert end == next_start
+        ids = [
+            item["id_synthese"]
+            for start, end in ranges
+            for page in base_api.keyset_pages(params={"limit": 1000}, start_key=start, end_key=end)
+            for item in page["items"]
+        ]
+        assert len(ids) == total
+        assert ids == sorted(set(ids))
+
+    def test_count_range(self, base_api):
+        _page_list, total_filtered, _status_code = base_api.page_list(params={"limit": 100})
+        count, first_key, last_key = base_api.count_range({})
+
+        assert count == total_filtered
+        assert first_key <= last_key
+        assert base_api.count_range({}, first_key - 1, last_key) == (count, first_key, last_key)
+        assert base_api.count_range({}, last_key, None) == (0, None, None)
+
+    def test_page_list_keeps_probe(self, base_api):
+        page_list, _total_filtered, _status_code = base_api.page_list(params={"limit": 10})
+
+        assert base_api.pop_probe_page(page_list[0])["items"]
+        assert base_api.pop_probe_page(page_list[0]) is None
+
+    def test_page_list_server_limit(self, base_api, monkeypatch):
+        # Server grants shorter pages than requested ones
+        monkeypatch.setattr(
+            base_api,
+            "_codec",
+            JsonCodec("capped", json.dumps, lambda text: {**json.loads(text), "limit": 5}),
+        )
+        page_list, total_filtered, _status_code = base_api.page_list(
+            params={"limit": 10}, keep_probe=False
+        )
+
+        assert len(page_list) == math.ceil(total_filtered / 5)
+        assert base_api.pop_probe_page(page_list[0]) is None
+
+    def test_stream_page(self, base_api):
+        page_list, _total_filtered, _status_code = base_api.page_list(
+            params={"limit": 10}, keep_probe=False
+        )
+        stream = base_api.stream_page(page_list[0])
+
+        assert list(stream) == base_api.get_page(page_list[0])["items"]
+        assert stream.meta["limit"] == 10
+
+
+class TestPageLengthController:
+    @pytest.fixture
+    def page_length(self, gn2pg_conf_one_source, monkeypatch):
+        monkeypatch.setattr(gn2pg_conf_one_source._tuning, "min_page_length", 100)
+        monkeypatch.setattr(gn2pg_conf_one_source._tuning, "max_page_length", 1000)
+        monkeypatch.setattr(gn2pg_conf_one_source._tuning, "target_page_time", 10)
+        return PageLengthController(gn2pg_conf_one_source)
+
+    def test_grows_to_max(self, page_length):
+        lengths = []
+        for _page in range(5):
+            page_length.success(1, 1000, page_length.length)
+            lengths.append(page_length.length)
+
+        assert lengths == [200, 400, 800, 1000, 1000]
+        assert page_length.summary()["pages"] == 5
+
+    def test_shrinks_below_failed_length(self, page_length):
+        page_length.length = 800
+        page_length.success(20, 1000, 800)
+        assert page_length.length == 400
+
+        assert page_length.failure(TimeoutError())
+        assert page_length.length == 200
+        # Page length grows halfway to the smallest failed length
+        page_length.success(1, 1000, 200)
+        assert page_length.length == 300
+
+    def test_failure_at_min_length(self, page_length):
+        page_length.length = 100
+
+        assert not page_length.failure(TimeoutError())
+        assert page_length.length == 100
+
+
+class TestConcurrencyController:
+    def test_grows_and_halves(self, gn2pg_conf_one_source):
+        concurrency = ConcurrencyController(gn2pg_conf_one_source, 4)
+        for _request in range(6):
+            concurrency.acquire()
+            concurrency.release(True, 0.01)
+        assert int(concurrency.limit) == 4
+
+        concurrency.acquire()
+        concurrency.release(False, reason="status 503")
+        assert int(concurrency.limit) == 2
+        assert concurrency.summary()["peak_concurrency"] == 4
+
+    def test_limits_requests_in_flight(self, gn2pg_conf_one_source):
+        concurrency = ConcurrencyController(gn2pg_conf_one_source, 4)
+        concurrency.acquire()
+
+        assert concurrency.try_acquire() > 0
+        concurrency.release(True, 0.01)
+        assert concurrency.try_acquire() == 0
+
+    def test_breaker(self, gn2pg_conf_one_source, monkeypatch):
+        monkeypatch.setattr(gn2pg_conf_one_source._tuning, "breaker_threshold", 2)
+        monkeypatch.setattr(gn2pg_conf_one_source._tuning, "unavailable_delay", 60)
+        concurrency = ConcurrencyController(gn2pg_conf_one_source, 4)
+        for _request in range(2):
+            concurrency.acquire()
+            concurrency.release(False, reason="status 503")
+
+        assert concurrency.try_acquire() > 1
+        assert concurrency.summary()["breaker_openings"] == 1
+
+    def test_gives_up(self, gn2pg_conf_one_source, monkeypatch):
+        monkeypatch.setattr(gn2pg_conf_one_source._tuning, "breaker_threshold", 1)
+        monkeypatch.setattr(gn2pg_conf_one_source._tuning, "unavailable_delay", 0)
+        monkeypatch.setattr(gn2pg_conf_one_source._tuning, "max_retry", 1)
+        concurrency = ConcurrencyController(gn2pg_conf_one_source, 4)
+        for _request in range(2):
+            concurrency.acquire()
+            concurrency.release(False, reason="status 503")
+
+        with pytest.raises(APIException):
+            concurrency.acquire()
@@ -1,3 +1,27 @@
+import copy
+
+from gn2pg.check_conf import Gn2PgSourceConf
+
+
 class TestCheckConf:
     def test_gn2pg_conf(self, gn2pg_conf):
         assert gn2pg_conf
+
+    def test_limit_workers(self, gn2pg_conf_one_source, monkeypatch):
+        monkeypatch.setattr(gn2pg_conf_one_source._tuning, "nb_threads", 6)
+        monkeypatch.setattr(gn2pg_conf_one_source._tuning, "nb_store_threads", 2)
+
+        assert gn2pg_conf_one_source.limit_workers(8) is gn2pg_conf_one_source
+        conf = gn2pg_conf_one_source.limit_workers(4)
+        assert (conf.nb_threads, conf.nb_store_threads) == (3, 1)
+        assert conf.std_name == gn2pg_conf_one_source.std_name
+        assert gn2pg_conf_one_source.nb_threads == 6
+        conf = gn2pg_conf_one_source.limit_workers(1)
+        assert (conf.nb_threads, conf.nb_store_threads) == (1, 0)
+
+    def test_stream_items_httpx(self, gn2pg_conf, caplog):
+        config = copy.deepcopy(gn2pg_conf._config)
+        config["tuning"].update(http_client="httpx", stream_items=True)
+
+        Gn2PgSourceConf(0, config)
+        assert "stream_items is not used" in caplog.text
@@ -0,0 +1,25 @@
+"""Test codec"""
+
+import json
+
+import pytest
+
+from gn2pg.codec import CODECS, get_codec
+
+ITEM = {"id_synthese": 1, "nom_cite": "Taxon é", "ca_data": {"uuid": "1"}, "count": 1.5}
+
+
+class TestCodec:
+    @pytest.mark.parametrize("name", sorted(CODECS))
+    def test_round_trip(self, name):
+        codec = get_codec(name)
+        text = codec.dumps(ITEM)
+
+        assert isinstance(text, str)
+        assert json.loads(text) == ITEM
+        assert codec.loads(json.dumps(ITEM)) == ITEM
+        assert codec.loads(json.dumps(ITEM).encode()) == ITEM
+
+    def test_unknown_codec(self, caplog):
+        assert get_codec("unknown") is CODECS["json"]
+        assert 'JSON codec "unknown" is not available' in caplog.text
@@ -1,6 +1,25 @@
 """Test download"""
 
 import datetime
+import io
+from functools import partial
+from multiprocessing.pool import ThreadPool
+from queue import Queue
+
+import pytest
+import requests
+
+from gn2pg.download import RECONCILE_SPLIT, Data
+from gn2pg.utils import XferStatus
+from tests.test_store_postgresql import BASE_ID, synthese_item
+
+
+def unavailable_response():
+    """HTTP 503 response, as sent by an overloaded source"""
+    response = requests.Response()
+    response.status_code = 503
+    response.raw = io.BytesIO(b"")
+    return response
 
 
 class TestDownload:
@@ -15,3 +34,147 @@ class TestDownload:
         assert now.strftime("%d/%m/%Y %H") == increment.strftime("%d/%m/%Y %H")
         assert "items have been stored in db from" in caplog.text
         assert "100.00 %" in caplog.text
+
+    def test_update_parallel_delete(self, data, gn2pg_conf_one_source, monkeypatch):
+        """Test update deleting data while storing new ones"""
+        monkeypatch.setattr(gn2pg_conf_one_source._tuning, "parallel_delete", True)
+        data.update(since="2000-01-01 00:00:00")
+
+        assert data.xfer_status == XferStatus.success
+
+    def test_store_fails_when_source_given_up(
+        self, gn2pg_conf_one_source, store_postgresql, monkeypatch
+    ):
+        """Test store marks import failed when concurrency controller gives up source"""
+        tuning = gn2pg_conf_one_source._tuning
+        monkeypatch.setattr(tuning, "adaptive_concurrency", True)
+        monkeypatch.setattr(tuning, "max_page_length", 100)
+        monkeypatch.setattr(tuning, "max_retry", 1)
+        monkeypatch.setattr(tuning, "retry_delay", 0)
+        monkeypatch.setattr(tuning, "breaker_threshold", 1)
+        monkeypatch.setattr(tuning, "unavailable_delay", 0)
+        data = Data(config=gn2pg_conf_one_source, backend=store_postgresql)
+        api = data._api_instance
+        get = api._get
+
+        # Source answers the first page, then is unavailable
+        def unavailable_get(url, **kwargs):
+            if "offset=" in url and "offset=0" not in url:
+                return unavailable_response()
+            return get(url, **kwargs)
+
+        monkeypatch.setattr(api, "_get", unavailable_get)
+        data.store()
+        data.exit()
+
+        assert data.xfer_status == XferStatus.failed
+        assert api.concurrency.summary()["breaker_openings"] > 1
+
+    def test_concurrent_deletes(self, data):
+        """Test delete counter of pages deleted by several threads"""
+        start = BASE_ID + 1300
+        data.store_items([synthese_item(start + i) for i in range(1, 21)])
+        pages = [
+            {"items": [{"id_synthese": start + i} for i in range(first, first + 5)], "total": 20}
+            for first in range(1, 21, 5)
+        ]
+        with ThreadPool(4) as pool:
+            pool.map(partial(data.delete, queue=Queue()), pages)
+
+        assert data.data_count_delete == 20
+        assert data._backend.data_ids("data", start, start + 20) == []
+
+
+class TestPipeline:
+    """Test download pipeline"""
+
+    def test_pipeline(self, data, monkeypatch):
+        monkeypatch.setattr(data, "fetch", lambda page: {"page_no": page})
+        stored = []
+
+        data.pipeline(2, 3, lambda page: stored.append(page["page_no"]), iter(range(50)))
+        assert sorted(stored) == list(range(50))
+
+    def test_pipeline_store_error(self, data, monkeypatch):
+        monkeypatch.setattr(data, "fetch", lambda page: {"page_no": page})
+
+        def store(page):
+            if page["page_no"] == 5:
+                raise ValueError("store failed")
+
+        with pytest.raises(ValueError):
+            data.pipeline(2, 2, store, iter(range(50)))
+
+
+class TestReconcile:
+    """Test reconciliation of id ranges, above source ids"""
+
+    def test_same_range(self, data, monkeypatch):
+        start = BASE_ID + 1000
+        data.store_items([synthese_item(start + i) for i in range(1, 11)])
+        monkeypatch.setattr(
+            data._api_instance,
+            "count_range",
+            lambda params, start_key, end_key: (10, start + 1, start + 10),
+        )
+        stats = {"downloaded": 0}
+
+        assert data._reconcile_range({}, (start, start + 20), stats) == []
+        assert stats["downloaded"] == 0
+
+    def test_repair_range(self, data, monkeypatch):
+        start = BASE_ID + 1100
+        data.store_items([synthese_item(start + i) for i in range(1, 11)])
+        # Source deleted 5th data
+        items = [synthese_item(start + i) for i in range(1, 11) if i != 5]
+        monkeypatch.setattr(
+            data._api_instance,
+            "count_range",
+            lambda params, start_key, end_key: (9, start + 1, start + 10),
+        )
+        monkeypatch.setattr(
+            data._api_instance, "keyset_pages", lambda **kwargs: iter([{"items": items}])
+        )
+        stats = {"downloaded": 0}
+
+        assert data._reconcile_range({}, (start, start + 20), stats) == []
+        assert stats["downloaded"] == 9
+        assert data.data_count_delete == 1
+        assert data._backend.data_ids("data", start, start + 20) == [
+            item["id_synthese"] for item in items
+        ]
+
+    def test_compensated_range(self, data, monkeypatch):
+        start = BASE_ID + 1400
+        data.store_items([synthese_item(start + i) for i in range(1, 11)])
+        # Same count and lowest id: source deleted 5th data and added a 15th one
+        items = [synthese_item(start + i) for i in [*range(1, 5), *range(6, 11), 15]]
+        monkeypatch.setattr(
+            data._api_instance,
+            "count_range",
+            lambda params, start_key, end_key: (10, start + 1, start + 15),
+        )
+        monkeypatch.setattr(
+            data._api_instance, "keyset_pages", lambda **kwargs: iter([{"items": items}])
+        )
+        stats = {"downloaded": 0}
+
+        assert data._reconcile_range({}, (start, start + 20), stats) == []
+        assert stats["downloaded"] == 10
+        assert data.data_count_delete == 1
+        assert data._backend.count_data("data", start, start + 20) == (10, start + 1, start + 15)
+
+    def test_split_range(self, data, gn2pg_conf_one_source, monkeypatch):
+        monkeypatch.setattr(gn2pg_conf_one_source._tuning, "max_page_length", 5)
+        start = BASE_ID + 1200
+        monkeypatch.setattr(
+            data._api_instance,
+            "count_range",
+            lambda params, start_key, end_key: (10, start + 1, start + 10),
+        )
+        stats = {"downloaded": 0}
+
+        sub_ranges = data._reconcile_range({}, (start, start + 320), stats)
+        assert len(sub_ranges) == RECONCILE_SPLIT
+        assert sub_ranges[0][0] == start and sub_ranges[-1][1] == start + 320
+        assert stats["downloaded"] == 0
@@ -0,0 +1,68 @@
+"""Test helpers"""
+
+from threading import Thread
+from types import SimpleNamespace
+
+from gn2pg.helpers import WorkerBudget, run_sources
+
+
+class TestWorkerBudget:
+    def test_acquire_whole_budget(self):
+        budget = WorkerBudget(4)
+
+        assert budget.acquire(10) == 4
+        budget.release(4)
+        assert budget.acquire(3) == 3
+
+    def test_acquire_waits_for_release(self):
+        budget = WorkerBudget(4)
+        budget.acquire(3)
+        acquired = []
+        thread = Thread(target=lambda: acquired.append(budget.acquire(2)))
+        thread.start()
+        thread.join(0.2)
+        assert not acquired
+
+        budget.release(3)
+        thread.join(5)
+        assert acquired == [2]
+
+
+class TestRunSources:
+    def test_run_enabled_sources(self, caplog):
+        def source(enable=True):
+            return SimpleNamespace(
+                enable=enable,
+                max_workers=2,
+                nb_sources=2,
+                nb_threads=2,
+                nb_store_threads=0,
+                http_client="requests",
+            )
+
+        done = []
+
+        def job(ctrl, cfg):
+            if cfg is sources["failing"]:
+                raise ValueError("failing source")
+            done.append(cfg)
+
+        sources = {"a": source(), "failing": source(), "disabled": source(False), "b": source()}
+        run_sources(job, None, sources, "Test")
+
+        assert sorted(done, key=id) == sorted([sources["a"], sources["b"]], key=id)
+        assert "Test failed for source failing" in caplog.text
+
+    def test_limit_source_workers(self, gn2pg_conf_one_source, monkeypatch, caplog):
+        monkeypatch.setattr(gn2pg_conf_one_source._tuning, "max_workers", 2)
+        monkeypatch.setattr(gn2pg_conf_one_source._tuning, "nb_threads", 4)
+        workers = []
+
+        run_sources(
+            lambda ctrl, cfg: workers.append(cfg.nb_threads + cfg.nb_store_threads),
+            None,
+            {"source": gn2pg_conf_one_source},
+            "Test",
+        )
+        assert workers == [2]
+        assert "more than max_workers, limited to 2" in caplog.text
@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from gn2pg.json_stream import ItemsStream, batched
+
+PAGE = {
+    "items": [{"id_synthese": i, "nom_cite": 'Écureuil "roux"', "count": 1.5} for i in range(5)],
+    "limit": 5,
+    "total_filtered": 12345,
+}
+
+
+class TestJsonStream:
+    @pytest.mark.parametrize("chunk_size", [1, 3, 64, 100000])
+    def test_items_stream(self, chunk_size):
+        raw = json.dumps(PAGE, ensure_ascii=False).encode()
+        stream = ItemsStream(raw[i : i + chunk_size] for i in range(0, len(raw), chunk_size))
+
+        assert list(stream) == PAGE["items"]
+        assert stream.meta == {"limit": 5, "total_filtered": 12345}
+
+    def test_items_stream_raw(self):
+        raw = json.dumps(PAGE).encode()
+        stream = ItemsStream([raw[:50], raw[50:]], raw=True)
+
+        assert [json.loads(item) for item in stream] == PAGE["items"]
+        assert stream.meta["total_filtered"] == 12345
+
+    def test_items_stream_truncated(self):
+        with pytest.raises(json.JSONDecodeError):
+            list(ItemsStream([b'{"items": [{"id_synthese": 1}, {"id_syn']))
+
+    def test_batched(self):
+        assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
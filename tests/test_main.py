@@ -36,3 +36,11 @@ class TestMain(object):
         assert all(elm in out for elm in [__project__, __version__])
         # Should exit with zero return code.
         assert exc_info.value.code == 0
+
+    def test_distributed_without_full(self, capsys):
+        with raises(SystemExit) as exc_info:
+            main(["download", "--update", "--distributed", "config.toml"])
+        out, err = capsys.readouterr()
+        assert "--distributed" in err
+        # Should exit with usage error return code.
+        assert exc_info.value.code == 2
@@ -0,0 +1,48 @@
+import json
+import stat
+import time
+
+from gn2pg.session_cache import SessionCache, parse_expiry
+
+
+class TestSessionCache:
+    def test_save_load(self, tmp_path):
+        cache = SessionCache("https://geonature.example.org", "user", tmp_path / "session")
+        cache.save({"token": "abc"}, time.time() + 3600, "exports")
+
+        assert stat.S_IMODE(cache.path.stat().st_mode) == 0o600
+        assert cache.load()["cookies"] == {"token": "abc"}
+        assert cache.load()["export_api_path"] == "exports"
+
+    def test_key(self, tmp_path):
+        cache = SessionCache("https://geonature.example.org", "user", tmp_path)
+
+        assert SessionCache("https://geonature.example.org", "other", tmp_path).path != cache.path
+        assert "user" not in cache.path.name
+
+    def test_expired(self, tmp_path):
+        cache = SessionCache("https://geonature.example.org", "user", tmp_path)
+        cache.save({"token": "abc"}, time.time() + 10, "exports")
+
+        assert cache.load() is None
+
+    def test_unreadable(self, tmp_path):
+        cache = SessionCache("https://geonature.example.org", "user", tmp_path)
+        cache.path.write_text("{")
+
+        assert cache.load() is None
+        cache.clear()
+        assert not cache.path.exists()
+
+    def test_no_expiry(self, tmp_path):
+        cache = SessionCache("https://geonature.example.org", "user", tmp_path)
+        cache.save({"token": "abc"}, None, "exports")
+
+        assert json.loads(cache.path.read_text())["expires"] is None
+        assert cache.load() is not None
+
+    def test_parse_expiry(self):
+        assert parse_expiry("2099-01-01T00:00:00") > time.time()
+        assert parse_expiry("2099-01-01T00:00:00+00:00") > time.time()
+        assert parse_expiry(None) is None
+        assert parse_expiry("tomorrow") is None
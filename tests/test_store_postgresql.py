@@ -0,0 +1,541 @@
+"""Test store_postgresql"""
+
+import json
+import uuid
+from datetime import datetime
+from functools import partial
+from multiprocessing.pool import ThreadPool
+
+import pytest
+from sqlalchemy import and_, select, text
+
+from gn2pg.utils import XferStatus
+
+# Ids of stored data, above source ones
+BASE_ID = 2 * 10**9
+
+FRAMEWORK = {"uuid": str(uuid.UUID(int=1)), "name": "Framework"}
+DATASET = {"uuid": str(uuid.UUID(int=2)), "name": "Dataset"}
+
+
+def synthese_item(id_synthese, **fields):
+    """synthese_with_metadata like export item"""
+    return {
+        "id_synthese": id_synthese,
+        "id_perm_sinp": str(uuid.UUID(int=id_synthese)),
+        "nom_cite": f"Taxon {id_synthese}",
+        "ca_data": dict(FRAMEWORK),
+        "jdd_data": dict(DATASET),
+        **fields,
+    }
+
+
+def start_import(store, controler="data"):
+    """Log a new download of controler, whose data are then stored"""
+    store.import_id = None
+    store.import_log(controler, {"xfer_start_ts": datetime.now()})
+
+
+def failed_import(store, controler, pages=None):
+    """Log a failed full download of controler, with checkpoints of its stored pages"""
+    store.import_id = None
+    store.import_log(
+        controler,
+        {
+            "xfer_type": "full",
+            "xfer_status": XferStatus.failed,
+            "xfer_start_ts": datetime.now(),
+            "xfer_filters": ['{"limit": 10}'],
+        },
+    )
+    for page_no, last_key in (pages or {}).items():
+        store.checkpoint(page_no, 10, last_key)
+
+
+def stored_items(store, start_key, end_key):
+    """Stored data items of source, whose id is in ]start_key, end_key], by id"""
+    table = store._table_defs["data"]["metadata"]
+    rows = store._conn.execute(
+        select([table.c.id_data, table.c.item]).where(
+            and_(
+                table.c.source == store._config.std_name,
+                table.c.id_data > start_key,
+                table.c.id_data <= end_key,
+            )
+        )
+    )
+    return {row.id_data: row.item for row in rows}
+
+
+def synthese_ids(utils, start_key, end_key):
+    """Ids of source data found in GeoNature synthese, in ]start_key, end_key]"""
+    with utils._db.connect() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT cast(entity_source_pk_value AS BIGINT) AS id FROM gn_synthese.synthese "
+                "WHERE cast(entity_source_pk_value AS BIGINT) > :start "
+                "AND cast(entity_source_pk_value AS BIGINT) <= :end ORDER BY id"
+            ),
+            {"start": start_key, "end": end_key},
+        )
+        return [row.id for row in rows]
+
+
+def set_trigger_mode(utils, mode):
+    """Choose triggers populating GeoNature synthese, with to_gnsynthese script"""
+    with utils._db.connect() as conn:
+        with conn.begin():
+            conn.execute(text("SELECT gn2pg_import.fct_c_set_trigger_mode(:mode)"), {"mode": mode})
+
+
+def geonature_item(id_synthese, **fields):
+    """synthese_item with fields read by to_gnsynthese script"""
+    return synthese_item(
+        id_synthese,
+        ca_uuid=FRAMEWORK["uuid"],
+        jdd_uuid=DATASET["uuid"],
+        date_debut="2020-05-01 00:00:00",
+        date_fin="2020-05-01 00:00:00",
+        wkt_4326="POINT(2 48)",
+        **fields,
+    )
+
+
+class TestStoreBatch:
+    def test_store_page(self, store_postgresql):
+        start_import(store_postgresql)
+        items = [synthese_item(BASE_ID + i) for i in range(1, 4)]
+        store_postgresql.store_data("data", items)
+
+        stored = stored_items(store_postgresql, BASE_ID, BASE_ID + 3)
+        assert sorted(stored) == [BASE_ID + 1, BASE_ID + 2, BASE_ID + 3]
+        assert stored[BASE_ID + 1]["nom_cite"] == items[0]["nom_cite"]
+
+    def test_store_rows_after_batch_error(self, store_postgresql, caplog):
+        start = BASE_ID + 10
+        start_import(store_postgresql)
+        store_postgresql.store_data("data", [synthese_item(start + 1)])
+        errors = store_postgresql.count_data_errors
+
+        # Another data with the uuid of a stored one
+        duplicate = synthese_item(start + 3, id_perm_sinp=str(uuid.UUID(int=start + 1)))
+        store_postgresql.store_data("data", [synthese_item(start + 2), duplicate])
+        assert "storing them one by one" in caplog.text
+        assert store_postgresql.count_data_errors == errors + 1
+        assert sorted(stored_items(store_postgresql, start, start + 3)) == [start + 1, start + 2]
+
+
+class TestStoreCopy:
+    def test_store_and_update_page(self, store_postgresql):
+        start = BASE_ID + 20
+        start_import(store_postgresql)
+        items = [synthese_item(start + i) for i in range(1, 4)]
+        store_postgresql.store_copy("data", items)
+        store_postgresql.store_copy("data", [synthese_item(start + 1, nom_cite="Other")])
+
+        stored = stored_items(store_postgresql, start, start + 3)
+        assert sorted(stored) == [start + 1, start + 2, start + 3]
+        assert stored[start + 1]["nom_cite"] == "Other"
+
+    def test_upsert_after_copy_error(self, store_postgresql, caplog):
+        start = BASE_ID + 30
+        start_import(store_postgresql)
+        store_postgresql.store_copy("data", [synthese_item(start + 1)])
+
+        duplicate = synthese_item(start + 3, id_perm_sinp=str(uuid.UUID(int=start + 1)))
+        store_postgresql.store_copy("data", [synthese_item(start + 2), duplicate])
+        assert "COPY load failed" in caplog.text
+        assert sorted(stored_items(store_postgresql, start, start + 3)) == [start + 1, start + 2]
+
+
+class TestThreadConnections:
+    def test_concurrent_stores(self, store_postgresql):
+        start = BASE_ID + 40
+        start_import(store_postgresql)
+        upserts = store_postgresql.count_data_upserts
+        pages = [[synthese_item(start + page * 10 + i) for i in range(1, 11)] for page in range(4)]
+        with ThreadPool(4) as pool:
+            pool.map(partial(store_postgresql.store_data, "data"), pages)
+
+        assert len(stored_items(store_postgresql, start, start + 40)) == 40
+        assert store_postgresql.count_data_upserts == upserts + 40
+        # Threads store pages with their own connection
+        assert len(store_postgresql._conns) > 1
+
+
+class TestMetadataCache:
+    def test_skip_cached_metadata(self, store_postgresql):
+        start = BASE_ID + 90
+        start_import(store_postgresql)
+        store_postgresql.store_data("data", [synthese_item(start + 1)])
+        inserts = store_postgresql.count_metadata_inserts
+
+        # Metadata of another import would be updated, if not cached
+        start_import(store_postgresql)
+        store_postgresql.store_data("data", [synthese_item(start + 2)])
+        assert store_postgresql.count_metadata_inserts == inserts
+        assert len(store_postgresql._metadata_cache) == 2
+
+
+class TestItemHash:
+    def test_skip_unchanged_data(self, store_postgresql):
+        start = BASE_ID + 100
+        start_import(store_postgresql)
+        items = [synthese_item(start + i) for i in range(1, 4)]
+        store_postgresql.store_data("data", items)
+        upserts = store_postgresql.count_data_upserts
+        skipped = store_postgresql.count_data_skipped
+
+        start_import(store_postgresql)
+        store_postgresql.store_data("data", items)
+        store_postgresql.store_copy("data", items)
+        assert store_postgresql.count_data_upserts == upserts
+        assert store_postgresql.count_data_skipped == skipped + 6
+
+        store_postgresql.store_data("data", [synthese_item(start + 1, nom_cite="Other")])
+        assert store_postgresql.count_data_upserts == upserts + 1
+        assert stored_items(store_postgresql, start, start + 1)[start + 1]["nom_cite"] == "Other"
+
+    def test_raw_then_upsert_skips_unchanged(self, store_postgresql):
+        start = BASE_ID + 170
+        start_import(store_postgresql)
+        items = [synthese_item(start + i) for i in range(1, 6)]
+        store_postgresql.store_raw("data", [json.dumps(item) for item in items])
+        skipped = store_postgresql.count_data_skipped
+
+        store_postgresql.store_data("data", items)
+        store_postgresql.store_copy("data", items)
+        assert store_postgresql.count_data_skipped == skipped + 10
+
+        store_postgresql.store_data("data", [synthese_item(start + 1, nom_cite="Other")])
+        assert store_postgresql.count_data_skipped == skipped + 10
+
+    def test_upgrade_keeps_item_hash(self, postgresql_utils):
+        query = text(
+            "SELECT relname, relfilenode FROM pg_class "
+            "WHERE oid IN ('gn2pg_import.data_json'::regclass, 'gn2pg_import.metadata_json'::regclass)"
+        )
+        with postgresql_utils._db.connect() as conn:
+            before = conn.execute(query).fetchall()
+            with conn.begin():
+                postgresql_utils._upgrade_tables(conn)
+            # Tables have not been rewritten
+            assert sorted(conn.execute(query).fetchall()) == sorted(before)
+
+
+class TestStoreRaw:
+    def test_raw_merge(self, store_postgresql):
+        start = BASE_ID + 140
+        start_import(store_postgresql)
+        items = [synthese_item(start + i) for i in range(1, 6)]
+        store_postgresql.store_raw("data", [json.dumps(item) for item in items])
+
+        stored = stored_items(store_postgresql, start, start + 5)
+        assert sorted(stored) == [item["id_synthese"] for item in items]
+        assert stored[start + 1]["nom_cite"] == items[0]["nom_cite"]
+        meta_table = store_postgresql._table_defs["meta"]["metadata"]
+        stored_uuids = store_postgresql._conn.execute(
+            select([meta_table.c.uuid]).where(
+                meta_table.c.uuid.in_([FRAMEWORK["uuid"], DATASET["uuid"]])
+            )
+        ).fetchall()
+        assert {str(row.uuid) for row in stored_uuids} == {FRAMEWORK["uuid"], DATASET["uuid"]}
+
+    def test_raw_merge_duplicates(self, store_postgresql):
+        start = BASE_ID + 180
+        start_import(store_postgresql)
+        upserts = store_postgresql.count_data_upserts
+        skipped = store_postgresql.count_data_skipped
+        items = [
+            synthese_item(start + 1),
+            synthese_item(start + 2),
+            synthese_item(start + 1, nom_cite="Other"),
+        ]
+        store_postgresql.store_raw("data", [json.dumps(item) for item in items])
+
+        # Last one of the same data in a page is stored, earlier ones are not skipped data
+        assert store_postgresql.count_data_upserts == upserts + 2
+        assert store_postgresql.count_data_skipped == skipped
+        assert stored_items(store_postgresql, start, start + 2)[start + 1]["nom_cite"] == "Other"
+
+    def test_raw_merge_fallback(self, store_postgresql, caplog):
+        start = BASE_ID + 150
+        start_import(store_postgresql)
+        store_postgresql.store_raw("data", [json.dumps(synthese_item(start + 1))])
+        items = [
+            synthese_item(start + 2),
+            synthese_item(start + 3, id_perm_sinp=str(uuid.UUID(int=start + 1))),
+        ]
+        store_postgresql.store_raw("data", [json.dumps(item) for item in items])
+
+        assert "Raw load failed" in caplog.text
+        assert sorted(stored_items(store_postgresql, start, start + 3)) == [start + 1, start + 2]
+
+
+class TestDeleteData:
+    def test_delete_ids(self, store_postgresql):
+        start = BASE_ID + 160
+        start_import(store_postgresql)
+        store_postgresql.store_data("data", [synthese_item(start + i) for i in range(1, 4)])
+
+        deleted = store_postgresql.delete_data(
+            [{"id_synthese": start + 1}, {"id_synthese": start + 3}, {"id_synthese": start + 4}]
+        )
+        assert deleted == 2
+        assert sorted(stored_items(store_postgresql, start, start + 4)) == [start + 2]
+
+
+class TestResume:
+    def test_resume_checkpoints(self, store_postgresql):
+        failed_import(store_postgresql, "resume", {0: 10, 1: 20, 3: 40})
+
+        start_import(store_postgresql, "resume")
+        checkpoints = store_postgresql.resume_checkpoints("resume", ['{"limit": 10}'])
+        assert checkpoints == {0: 10, 1: 20, 3: 40}
+
+    def test_no_resume(self, store_postgresql):
+        failed_import(store_postgresql, "resume_filters", {0: 10})
+        start_import(store_postgresql, "resume_filters")
+        assert store_postgresql.resume_checkpoints("resume_filters", ['{"limit": 20}']) == {}
+
+        failed_import(store_postgresql, "resume_success", {0: 10})
+        store_postgresql.import_log("resume_success", {"xfer_status": XferStatus.success})
+        start_import(store_postgresql, "resume_success")
+        assert store_postgresql.resume_checkpoints("resume_success", ['{"limit": 10}']) == {}
+
+    def test_resume_keyset_after_gap(self, store_postgresql, gn2pg_conf_one_source, monkeypatch):
+        monkeypatch.setattr(gn2pg_conf_one_source._tuning, "pagination", "keyset")
+        failed_import(store_postgresql, "resume_gap", {0: 10, 1: 20, 3: 40})
+
+        start_import(store_postgresql, "resume_gap")
+        checkpoints = store_postgresql.resume_checkpoints("resume_gap", ['{"limit": 10}'])
+        assert checkpoints == {0: 10, 1: 20}
+
+        # Resumed download stores pages after the first ones, with new page lengths
+        for page_no, last_key in ((2, 25), (3, 35)):
+            store_postgresql.checkpoint(page_no, 10, last_key)
+        store_postgresql.import_log(
+            "resume_gap",
+            {
+                "xfer_type": "full",
+                "xfer_status": XferStatus.failed,
+                "xfer_filters": ['{"limit": 10}'],
+            },
+        )
+
+        start_import(store_postgresql, "resume_gap")
+        checkpoints = store_postgresql.resume_checkpoints("resume_gap", ['{"limit": 10}'])
+        assert checkpoints == {0: 10, 1: 20, 2: 25, 3: 35}
+
+
+class TestWork:
+    FILTERS = ['{"limit": 10}']
+
+    def test_join_work(self, store_postgresql):
+        plans = []
+
+        def plan():
+            plans.append(len(plans))
+            return [(None, 10), (10, None)]
+
+        plan_id = store_postgresql.join_work("work_join", self.FILTERS, plan)
+        assert store_postgresql.join_work("work_join", self.FILTERS, plan) == plan_id
+        assert plans == [0]
+
+        # Download with other filters is abandoned
+        other_id = store_postgresql.join_work("work_join", ['{"limit": 20}'], plan)
+        assert other_id not in (None, plan_id)
+        assert plans == [0, 1]
+
+    def test_concurrent_joins(self, store_postgresql):
+        # Processes planning the same download at the same time join the first plan
+        with ThreadPool(4) as pool:
+            plan_ids = pool.map(
+                lambda _process: store_postgresql.join_work(
+                    "work_concurrent", self.FILTERS, lambda: [(None, None)]
+                ),
+                range(4),
+            )
+        assert len(set(plan_ids)) == 1 and plan_ids[0] is not None
+
+    def test_import_get_during_work(self, store_postgresql):
+        def success_import(xfer_type):
+            store_postgresql.import_id = None
+            store_postgresql.import_log(
+                "work_since",
+                {
+                    "xfer_type": xfer_type,
+                    "xfer_status": XferStatus.success,
+                    "xfer_start_ts": datetime.now(),
+                },
+            )
+
+        success_import("full")
+        since = store_postgresql.import_get("work_since")
+        plan_id = store_postgresql.join_work("work_since", self.FILTERS, lambda: [(None, None)])
+        success_import("worker")
+        success_import("update")
+        assert store_postgresql.import_get("work_since") == since
+
+        item = store_postgresql.claim_work(plan_id, "worker1", 60)
+        assert store_postgresql.end_work(item.id, "worker1", 0)
+        assert store_postgresql.close_work(plan_id) == XferStatus.success
+        assert store_postgresql.import_get("work_since") > since
+
+    def test_claim_renew_close(self, store_postgresql):
+        plan_id = store_postgresql.join_work(
+            "work_lease", self.FILTERS, lambda: [(None, 10), (10, None)]
+        )
+        first = store_postgresql.claim_work(plan_id, "worker1", 60)
+        second = store_postgresql.claim_work(plan_id, "worker2", 60)
+        assert (first.start_key, first.end_key, first.attempts) == (None, 10, 1)
+        assert (second.start_key, second.end_key, second.attempts) == (10, None, 1)
+        assert store_postgresql.claim_work(plan_id, "worker3", 60) is None
+        assert store_postgresql.renew_leases("worker1", 60) == 1
+
+        assert store_postgresql.end_work(first.id, "worker1", 10)
+        # Released item is claimed again
+        assert store_postgresql.end_work(second.id, "worker2")
+        assert store_postgresql.close_work(plan_id) is None
+        again = store_postgresql.claim_work(plan_id, "worker3", 60)
+        assert (again.id, again.attempts) == (second.id, 2)
+        assert not store_postgresql.end_work(again.id, "worker2", 5)
+        assert store_postgresql.end_work(again.id, "worker3", 5)
+
+        assert store_postgresql.close_work(plan_id) == XferStatus.success
+
+    def test_expired_lease(self, store_postgresql):
+        plan_id = store_postgresql.join_work("work_expired", self.FILTERS, lambda: [(None, None)])
+        item = store_postgresql.claim_work(plan_id, "worker1", -1)
+        assert store_postgresql.close_work(plan_id) is None
+
+        again = store_postgresql.claim_work(plan_id, "worker2", 60)
+        assert (again.id, again.attempts) == (item.id, 2)
+        # Item claimed again is not ended by its first worker
+        assert not store_postgresql.end_work(item.id, "worker1", 5)
+        assert store_postgresql.end_work(again.id, "worker2", 5)
+        assert store_postgresql.close_work(plan_id) == XferStatus.success
+
+
+class TestPostgresqlUtils:
+    def test_sync_synthese_without_script(self, postgresql_utils, caplog):
+        assert postgresql_utils.sync_synthese(import_id=1) is None
+        assert "is to_gnsynthese script applied?" in caplog.text
+
+    def test_drain_queue_once(self, postgresql_utils, caplog):
+        # No fct_c_drain_synthese_queue function without to_gnsynthese script
+        assert postgresql_utils.drain_synthese_queue() == 0
+        assert "is to_gnsynthese script applied?" in caplog.text
+
+    def test_drain_queue_retries(self, postgresql_utils, monkeypatch):
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 3:
+                raise KeyboardInterrupt
+
+        monkeypatch.setattr("gn2pg.store_postgresql.time.sleep", sleep)
+        with pytest.raises(KeyboardInterrupt):
+            postgresql_utils.drain_synthese_queue(interval=5)
+        assert sleeps == [5, 5, 5]
+
+    def test_sync_synthese(self, to_gnsynthese, store_postgresql):
+        start = BASE_ID + 110
+        with to_gnsynthese._db.connect() as conn:
+            conn.execute(
+                text(
+                    "ALTER TABLE gn2pg_import.data_json "
+                    "DISABLE TRIGGER tri_c_upsert_data_to_geonature"
+                )
+            )
+        start_import(store_postgresql)
+        store_postgresql.store_data("data", [geonature_item(start + i) for i in range(1, 4)])
+        assert synthese_ids(to_gnsynthese, start, start + 3) == []
+        assert to_gnsynthese.sync_synthese(import_id=store_postgresql.import_id) == 3
+        assert synthese_ids(to_gnsynthese, start, start + 3) == [start + 1, start + 2, start + 3]
+
+    def test_nomenclature_maps(self, to_gnsynthese):
+        with to_gnsynthese._db.connect() as conn:
+            expected = conn.execute(
+                text(
+                    "SELECT n.id_nomenclature, n.label_default, "
+                    "ref_nomenclatures.get_default_nomenclature_value('SEXE') AS id_default "
+                    "FROM ref_nomenclatures.t_nomenclatures n "
+                    "WHERE n.id_type = ref_nomenclatures.get_id_nomenclature_type('SEXE') "
+                    "ORDER BY n.id_nomenclature LIMIT 1"
+                )
+            ).one()
+            code = conn.execute(
+                text(
+                    "SELECT cd_nomenclature FROM ref_nomenclatures.t_nomenclatures "
+                    "WHERE id_nomenclature = :id"
+                ),
+                {"id": expected.id_nomenclature},
+            ).scalar()
+            conn.execute(text("SELECT gn2pg_import.fct_c_refresh_nomenclature_map()"))
+            assert (
+                conn.execute(
+                    text("SELECT gn2pg_import.fct_c_get_id_nomenclature('SEXE', :code)"),
+                    {"code": code},
+                ).scalar()
+                == expected.id_nomenclature
+            )
+            assert (
+                conn.execute(
+                    text(
+                        "SELECT gn2pg_import.fct_c_get_id_nomenclature_from_label('SEXE', :label)"
+                    ),
+                    {"label": expected.label_default},
+                ).scalar()
+                == expected.id_nomenclature
+            )
+            assert (
+                conn.execute(
+                    text("SELECT gn2pg_import.fct_c_get_id_nomenclature('SEXE', 'unknown')")
+                ).scalar()
+                == expected.id_default
+            )
+
+    def test_statement_triggers(self, to_gnsynthese, store_postgresql):
+        start = BASE_ID + 120
+        set_trigger_mode(to_gnsynthese, "statement")
+        start_import(store_postgresql)
+        store_postgresql.store_data("data", [geonature_item(start + i) for i in range(1, 4)])
+        assert synthese_ids(to_gnsynthese, start, start + 3) == [start + 1, start + 2, start + 3]
+
+        store_postgresql.store_data("data", [geonature_item(start + 1, nom_cite="Other")])
+        store_postgresql.delete_data([{"id_synthese": start + 2}])
+        assert synthese_ids(to_gnsynthese, start, start + 3) == [start + 1, start + 3]
+        with to_gnsynthese._db.connect() as conn:
+            nom_cite = conn.execute(
+                text(
+                    "SELECT nom_cite FROM gn_synthese.synthese "
+                    "WHERE entity_source_pk_value = :id"
+                ),
+                {"id": str(start + 1)},
+            ).scalar()
+        assert nom_cite == "Other"
+
+    def test_script_keeps_trigger_mode(self, to_gnsynthese, store_postgresql):
+        start = BASE_ID + 190
+        set_trigger_mode(to_gnsynthese, "queue")
+        to_gnsynthese.custom_script()
+        start_import(store_postgresql)
+        store_postgresql.store_data("data", [geonature_item(start + 1)])
+        assert synthese_ids(to_gnsynthese, start, start + 1) == []
+
+        assert to_gnsynthese.drain_synthese_queue() == 1
+        assert synthese_ids(to_gnsynthese, start, start + 1) == [start + 1]
+
+    def test_drain_queue(self, to_gnsynthese, store_postgresql):
+        start = BASE_ID + 130
+        set_trigger_mode(to_gnsynthese, "queue")
+        start_import(store_postgresql)
+        store_postgresql.store_data("data", [geonature_item(start + i) for i in range(1, 4)])
+        store_postgresql.delete_data([{"id_synthese": start + 2}])
+        assert synthese_ids(to_gnsynthese, start, start + 3) == []
+
+        assert to_gnsynthese.drain_synthese_queue(batch_size=2) == 4
+        assert synthese_ids(to_gnsynthese, start, start + 3) == [start + 1, start + 3]
+        assert to_gnsynthese.drain_synthese_queue() == 0
@@ -0,0 +1,28 @@
+from gn2pg.utils import LruSet, item_hash
+
+
+class TestLruSet:
+    def test_drops_least_recently_used(self):
+        keys = LruSet(2)
+        keys.add("a")
+        keys.add("b")
+        assert "a" in keys
+        keys.add("c")
+
+        assert len(keys) == 2
+        assert "a" in keys and "c" in keys
+        assert "b" not in keys
+
+    def test_add_existing_key(self):
+        keys = LruSet(2)
+        for key in ("a", "b", "a", "c"):
+            keys.add(key)
+
+        assert "a" in keys and "c" in keys
+        assert "b" not in keys
+
+
+class TestItemHash:
+    def test_keys_order(self):
+        assert item_hash({"a": 1, "b": [1, 2]}) == item_hash({"b": [1, 2], "a": 1})
+        assert item_hash({"a": 1}) != item_hash({"a": 2})